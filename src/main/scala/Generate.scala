@@ -5,15 +5,36 @@ import click._
 import examples._
 
 import java.io.{BufferedWriter, File, FileWriter, RandomAccessFile}
+import java.nio.file.{Files, Paths, StandardCopyOption}
+import java.security.MessageDigest
 import scala.io.Source
 
 /**
  * Calling this class will generate all of the Verilog files necessary for testing with
- * cocotb and Icarus Verilog. The make target `make gen` will call this and generate the files
+ * cocotb and Icarus Verilog. The make target `make gen` will call this and generate the files.
+ *
+ * Targets are only regenerated when the Scala sources they are built from or the [[ClickConfig]] have changed,
+ * and generated files are only rewritten when their contents change. A subset of the targets can be generated by
+ * naming them, e.g. `sbt "runMain Generate GCD Fifo"`. Pass `--force` to regenerate regardless of the cache.
+ *
+ * For each target `<name>`, `gen/<name>.mk` lists the Verilog files the target consists of and the Scala sources it
+ * is built from, for the test Makefiles to include. `gen/<name>.fir` holds the CHIRRTL of the target, the netlist
+ * analyzed by `click_tb.cycletime`.
  */
 object Generate extends App {
-  def addVcd(name: String): Unit = {
-    val f = new RandomAccessFile(s"gen/$name.v", "rw")
+  /**
+   * Appends a waveform dump block to the top module in `<dir>/<name>.v`.
+   * The block is only compiled when simulating with cocotb, and nothing is dumped unless the simulation
+   * is started with the `+dump_waves` plusarg. Further plusargs select what is dumped:
+   *  - `+dump_file=<file>`: File to dump to. Defaults to dump.vcd. With Icarus, pass `-fst` to vvp to write FST
+   *  - `+dump_depth=<n>`: Number of hierarchy levels to dump, 0 (the default) dumps all of them
+   *  - `+dump_start=<t>`/`+dump_stop=<t>`: Time window to dump, in simulator time units
+   * The dumped scope defaults to the top module, and may be changed by compiling with `-DDUMP_SCOPE=<scope>`
+   * @param name Name of the top module and the file it is in
+   * @param dir Directory holding the file
+   */
+  def addVcd(name: String, dir: String = "gen"): Unit = {
+    val f = new RandomAccessFile(s"$dir/$name.v", "rw")
     var pos = f.length()-5
     f.seek(pos)
 
@@ -23,79 +44,327 @@ object Generate extends App {
       f.seek(pos)
     }
     f.writeBytes(s"""`ifdef COCOTB_SIM
-                    |initial begin
-                    |  $$dumpfile("dump.vcd");
-                    |  $$dumpvars(0, $name);
-                    |  #1;
+                    |initial begin : dump_waves
+                    |  reg [8*256-1:0] file;
+                    |  integer depth, start, stop;
+                    |  if ($$test$$plusargs("dump_waves")) begin
+                    |    if (!$$value$$plusargs("dump_file=%s", file)) file = "dump.vcd";
+                    |    if (!$$value$$plusargs("dump_depth=%d", depth)) depth = 0;
+                    |    if (!$$value$$plusargs("dump_start=%d", start)) start = 0;
+                    |    if (!$$value$$plusargs("dump_stop=%d", stop)) stop = -1;
+                    |    #(start);
+                    |    $$dumpfile(file);
+                    |`ifdef DUMP_SCOPE
+                    |    $$dumpvars(depth, `DUMP_SCOPE);
+                    |`else
+                    |    $$dumpvars(depth, $name);
+                    |`endif
+                    |    if (stop >= start) begin
+                    |      #(stop - start);
+                    |      $$dumpoff;
+                    |    end
+                    |  end
                     |end
                     |`endif
                     |endmodule""".stripMargin)
     f.close()
   }
 
-  def renameModule(oldName: String, newName: String): Unit = {
-    val src = Source.fromFile(s"gen/$oldName.v")
-    val bw = new BufferedWriter(new FileWriter(s"gen/$newName.v"))
+  def renameModule(oldName: String, newName: String, dir: String = "gen"): Unit = {
+    val src = Source.fromFile(s"$dir/$oldName.v")
+    val bw = new BufferedWriter(new FileWriter(s"$dir/$newName.v"))
     src.getLines().map{l =>
       if (l.contains(s"module $oldName(")) s"module $newName(" else l
     }.foreach(l => bw.write(s"$l\n"))
     src.close()
     bw.close()
-    new File(s"gen/$oldName.v").deleteOnExit()
-  }
-
-  def gen(x: => RawModule): Unit = {
-    val params = Array("-td", "gen", "--emission-options", "disableRegisterRandomization", "--no-check-comb-loops")
-    (new ChiselStage).emitVerilog(x, params)
-  }
-
-  implicit val cc = ClickConfig()
-
-  //GENERATE FILES
-  gen(Adder(8)(cc))
-  gen(new CDC()(cc))
-  gen(new Demultiplexer(UInt(8.W))(cc))
-  gen(new Fib(8)(cc))
-  gen(Fifo(5, 0.U(8.W), false)(cc))
-  gen(Fork(UInt(8.W))(cc))
-  gen(new Fib(8)(cc))
-  gen(new GCD(8)(cc))
-  gen(Join(8)(cc))
-  gen(JoinReg(8, 4, ro = true)(cc))
-  //Simple join-reg-fork block
-  gen(JoinRegFork(widthIn=8, valueOut=0, ro=false)(cc))
-  renameModule("JoinRegFork", "JRF_simple")
-  //The complex JRF uses different phases on the output ports and performs bit-moving between the inputs and outputs
-  gen(new JoinRegFork(UInt(8.W), UInt(10.W), 0.U(4.W), 4.U(14.W), false, true)((a: UInt, b: UInt) => {
-    val c = Cat(a, b)
-    (c(17,14), c(13, 0))
-  })(cc))
-  renameModule("JoinRegFork", "JRF_complex")
-
-  gen(new Merge(UInt(8.W))(cc))
-  gen(new Multiplexer(UInt(8.W))(cc))
-  gen(RegFork(4.U(8.W), false)(cc))
-  gen(new BistableMutex()(cc))
-  gen(new RGDMutex()(cc))
-  gen(new Arbiter(UInt(8.W)))
-
-
-
-  //Add VCD footers for simulation
-  addVcd("Adder")
-  addVcd("CDC")
-  addVcd("Demultiplexer")
-  addVcd("Fib")
-  addVcd("Fifo")
-  addVcd("GCD")
-  addVcd("Join")
-  addVcd("JoinReg")
-  addVcd("JRF_complex")
-  addVcd("JRF_simple")
-  addVcd("Merge")
-  addVcd("Multiplexer")
-  addVcd("RegFork")
-  addVcd("BistableMutex")
-  addVcd("RGDMutex")
-  addVcd("Arbiter")
+    new File(s"$dir/$oldName.v").deleteOnExit()
+  }
+
+  /**
+   * Writes the configuration object used for generation to `<dir>/ClickConfig.json`,
+   * such that testbenches and benchmarks know which delays the generated files use
+   * @param conf The configuration object to write
+   * @param dir The output directory
+   */
+  def writeConfig(conf: ClickConfig, dir: String = "gen"): Unit = {
+    val fields = conf.productElementNames.zip(conf.productIterator).map{case (k, v) => s"""  "$k": $v"""}
+    write(s"$dir/ClickConfig.json", fields.mkString("{\n", ",\n", "\n}\n"))
+  }
+
+  /**
+   * Design parameters of a target, given on the command line as `key=value`
+   * @param values The parameter values by key
+   */
+  case class Params(values: Map[String, String] = Map()) {
+    def int(key: String, default: Int): Int = values.get(key).map(_.toInt).getOrElse(default)
+    def bool(key: String, default: Boolean): Boolean = values.get(key).map(_.toBoolean).getOrElse(default)
+    override def toString: String = values.toSeq.sorted.map { case (k, v) => s"$k=$v" }.mkString(" ")
+  }
+
+  /**
+   * A generation target
+   * @param name Name of the top module, and of the file it is written to
+   * @param keys Keys of the design parameters the target accepts
+   * @param build Function elaborating the design with a given configuration and parameters
+   */
+  case class Target(name: String, keys: Seq[String], build: (ClickConfig, Params) => RawModule)
+
+  val targets = Seq(
+    Target("Adder", Seq("width"), (c, p) => Adder(p.int("width", 8))(c)),
+    Target("CDC", Seq("clkDiv", "depth"), (c, p) => new CDC(p.int("clkDiv", 8), p.int("depth", 4))(c)),
+    Target("Demultiplexer", Seq("width"), (c, p) => new Demultiplexer(UInt(p.int("width", 8).W))(c)),
+    Target("Fib", Seq("width"), (c, p) => new Fib(p.int("width", 8))(c)),
+    Target("Fifo", Seq("depth", "width", "ro"), (c, p) => Fifo(p.int("depth", 5), 0.U(p.int("width", 8).W), p.bool("ro", false))(c)),
+    Target("Fork", Seq("width"), (c, p) => Fork(UInt(p.int("width", 8).W))(c)),
+    Target("GCD", Seq("width"), (c, p) => new GCD(p.int("width", 8))(c)),
+    Target("GCDLanes", Seq("width", "lanes"), (c, p) => new GCDLanes(p.int("width", 8), p.int("lanes", 4))(c)),
+    Target("GCDLanesCompare", Seq("width", "lanes"), (c, p) => new GCDLanesCompare(p.int("width", 8), p.int("lanes", 4))(c)),
+    Target("Join", Seq("width"), (c, p) => Join(p.int("width", 8))(c)),
+    Target("JoinReg", Seq("width", "ro"), (c, p) => JoinReg(p.int("width", 8), 4, ro = p.bool("ro", true))(c)),
+    //Simple join-reg-fork block
+    Target("JRF_simple", Seq("width", "ro"), (c, p) => JoinRegFork(widthIn=p.int("width", 8), valueOut=0, ro=p.bool("ro", false))(c)),
+    //The complex JRF uses different phases on the output ports and performs bit-moving between the inputs and outputs
+    Target("JRF_complex", Seq(), (conf, _) => new JoinRegFork(UInt(8.W), UInt(10.W), 0.U(4.W), 4.U(14.W), false, true)((a: UInt, b: UInt) => {
+      val c = Cat(a, b)
+      (c(17,14), c(13, 0))
+    })(conf)),
+    //N-ary joins and forks, as balanced trees of two-input components or, with chain=true, linear chains
+    Target("JoinN", Seq("inputs", "width", "chain"), (c, p) => JoinN(p.int("width", 8), p.int("inputs", 4), p.bool("chain", false))(c)),
+    Target("ForkN", Seq("outputs", "width", "chain"), (c, p) => ForkN(UInt(p.int("width", 8).W), p.int("outputs", 4), p.bool("chain", false))(c)),
+    Target("JoinRegForkN", Seq("inputs", "outputs", "width", "ro", "chain"), (c, p) => JoinRegForkN(p.int("width", 8), p.int("inputs", 4), p.int("outputs", 4), p.bool("ro", false), p.bool("chain", false))(c)),
+    Target("NaryCompare", Seq("n", "width"), (c, p) => new NaryCompare(p.int("n", 8), p.int("width", 8))(c)),
+    Target("Merge", Seq("width"), (c, p) => new Merge(UInt(p.int("width", 8).W))(c)),
+    Target("Multiplexer", Seq("width"), (c, p) => new Multiplexer(UInt(p.int("width", 8).W))(c)),
+    Target("RegFork", Seq("width", "ro"), (c, p) => RegFork(4.U(p.int("width", 8).W), p.bool("ro", false))(c)),
+    Target("Ring", Seq("stages", "tokens", "width"), (c, p) => new Ring(p.int("stages", 8), p.int("tokens", 3), p.int("width", 8))(c)),
+    Target("RingSweep", Seq("stages", "width"), (c, p) => new RingSweep(p.int("stages", 8), p.int("width", 8))(c)),
+    Target("BistableMutex", Seq(), (c, _) => new BistableMutex()(c)),
+    Target("RGDMutex", Seq(), (c, _) => new RGDMutex()(c)),
+    Target("Arbiter", Seq("width"), (c, p) => new Arbiter(UInt(p.int("width", 8).W))(c)),
+    //N-input arbiter and merge, as balanced trees of two-input elements or, with flat=true, a single N-input stage
+    Target("ArbiterN", Seq("inputs", "width", "flat"), (c, p) => new ArbiterN(UInt(p.int("width", 8).W), p.int("inputs", 8), p.bool("flat", false))(c)),
+    Target("MergeN", Seq("inputs", "width", "flat"), (c, p) => new MergeN(UInt(p.int("width", 8).W), p.int("inputs", 8), p.bool("flat", false))(c)),
+  )
+
+  /**
+   * Returns a copy of a configuration with some of its fields set from `key=value` arguments
+   * @param conf The base configuration
+   * @param values The new field values by field name
+   */
+  def configure(conf: ClickConfig, values: Map[String, String]): ClickConfig = values.foldLeft(conf) {
+    case (c, ("MUX_DELAY", v)) => c.copy(MUX_DELAY = v.toInt)
+    case (c, ("DEMUX_DELAY", v)) => c.copy(DEMUX_DELAY = v.toInt)
+    case (c, ("REG_DELAY", v)) => c.copy(REG_DELAY = v.toInt)
+    case (c, ("ADD_DELAY", v)) => c.copy(ADD_DELAY = v.toInt)
+    case (c, ("MERGE_DELAY", v)) => c.copy(MERGE_DELAY = v.toInt)
+    case (c, ("JOIN_DELAY", v)) => c.copy(JOIN_DELAY = v.toInt)
+    case (c, ("FORK_DELAY", v)) => c.copy(FORK_DELAY = v.toInt)
+    case (c, ("COMP_DELAY", v)) => c.copy(COMP_DELAY = v.toInt)
+    case (c, ("SIMULATION", v)) => c.copy(SIMULATION = v.toBoolean)
+    case (_, (k, _)) => throw new IllegalArgumentException(s"Unknown ClickConfig field $k")
+  }
+
+  /** File holding the hash, Scala sources and output files of every generated target */
+  val cacheFile = ".gen_cache"
+
+  def write(path: String, contents: String): Unit = {
+    val bw = new BufferedWriter(new FileWriter(path))
+    bw.write(contents)
+    bw.close()
+  }
+
+  /** All Scala sources of the project, by file name */
+  lazy val sources: Map[String, String] = {
+    def walk(f: File): Seq[File] = if (f.isDirectory) f.listFiles().toSeq.flatMap(walk) else Seq(f)
+    walk(new File("src/main/scala")).filter(_.getName.endsWith(".scala")).map(f => f.getName -> f.getPath).toMap
+  }
+
+  /** Hash of a target's name, the configuration and the contents of the files it is built from */
+  def hash(name: String, conf: ClickConfig, deps: Seq[String]): String = {
+    val md = MessageDigest.getInstance("SHA-256")
+    md.update(s"$name $conf".getBytes)
+    deps.sorted.foreach { d =>
+      md.update(d.getBytes)
+      if (new File(d).exists()) md.update(Files.readAllBytes(Paths.get(d)))
+    }
+    md.digest().map("%02x".format(_)).mkString
+  }
+
+  /** Copies a file into `dir`, unless an identical file is already there, to keep its timestamp */
+  def update(file: File, dir: String): Unit = {
+    val dest = new File(dir, file.getName)
+    if (!dest.exists() || !java.util.Arrays.equals(Files.readAllBytes(file.toPath), Files.readAllBytes(dest.toPath))) {
+      Files.copy(file.toPath, dest.toPath, StandardCopyOption.REPLACE_EXISTING)
+    }
+  }
+
+  def deleteRecursively(f: File): Unit = {
+    if (f.isDirectory) f.listFiles().foreach(deleteRecursively)
+    f.delete()
+  }
+
+  /**
+   * Elaborates a target into a scratch directory, and moves the files which changed into `dir`
+   * @return The Scala sources the target was built from and the Verilog files it consists of
+   */
+  def build(t: Target, params: Params, conf: ClickConfig, dir: String, suffix: String): (Seq[String], Seq[String]) = {
+    val tmp = s"$dir/.build/${t.name}$suffix"
+    deleteRecursively(new File(tmp))
+    val options = Array("-td", tmp, "--emission-options", "disableRegisterRandomization", "--no-check-comb-loops")
+    val verilog = (new ChiselStage).emitVerilog(t.build(conf, params), options)
+
+    //The top module is emitted last
+    val top = "module (\\w+)\\(".r.findAllMatchIn(verilog).map(_.group(1)).toSeq.last
+    if (top != t.name) renameModule(top, t.name, tmp)
+    val delays = "DelayElementSim_\\d+".r.findAllIn(verilog).toSeq.distinct.sorted
+    if (suffix.nonEmpty) addSuffix(t.name +: delays, suffix, tmp)
+    addVcd(t.name + suffix, tmp)
+    val outputs = (t.name +: delays).map(n => s"$n$suffix.v")
+    outputs.foreach(o => update(new File(tmp, o), dir))
+    //The CHIRRTL of the design is the netlist read by click_tb.cycletime
+    val fir = new File(tmp, s"$top.fir")
+    if (!fir.exists()) write(fir.getPath, (new ChiselStage).emitChirrtl(t.build(conf, params)))
+    Files.move(fir.toPath, Paths.get(tmp, s"${t.name}$suffix.fir"), StandardCopyOption.REPLACE_EXISTING)
+    update(new File(tmp, s"${t.name}$suffix.fir"), dir)
+    deleteRecursively(new File(tmp))
+
+    //Source locators in the emitted Verilog name the Scala files the design is built from
+    val deps = "(\\w+)\\.scala".r.findAllMatchIn(verilog).map(m => s"${m.group(1)}.scala").toSeq.distinct
+      .flatMap(sources.get) ++ Seq("src/main/scala/Generate.scala", "build.sbt")
+    (deps.distinct.sorted, outputs)
+  }
+
+  /**
+   * Appends a suffix to the names of all modules in the given files, and to the files themselves.
+   * This gives every variant of a design unique module names
+   * @param files Names of the files, without extension
+   * @param suffix The suffix to append
+   * @param dir Directory holding the files
+   */
+  def addSuffix(files: Seq[String], suffix: String, dir: String): Unit = {
+    val contents = files.map { f =>
+      val src = Source.fromFile(s"$dir/$f.v")
+      val text = src.mkString
+      src.close()
+      f -> text
+    }
+    val modules = contents.flatMap { case (_, text) => "module (\\w+)\\s*\\(".r.findAllMatchIn(text).map(_.group(1)) }.distinct
+    //Matches module declarations and instantiations
+    val names = s"\\b(${modules.mkString("|")})\\b(?=\\s*\\(|\\s+\\w+\\s*\\()".r
+    contents.foreach { case (f, text) =>
+      write(s"$dir/$f$suffix.v", names.replaceAllIn(text, m => m.group(1) + suffix))
+      new File(s"$dir/$f.v").delete()
+    }
+  }
+
+  /**
+   * Writes `<dir>/<name>.mk`, listing the Verilog files of a target and the Scala sources it is built from,
+   * along with the arguments to regenerate it with
+   */
+  def writeMakefile(name: String, deps: Seq[String], outputs: Seq[String], dir: String, genArgs: Seq[String]): Unit = {
+    write(s"$dir/$name.mk",
+      s"""# Generated by Generate.scala. Lists the Verilog files of $name and the sources they are generated from
+         |VERILOG_SOURCES += ${outputs.map(o => s"$$(GEN_DIR)/$o").mkString(" ")}
+         |GEN_ARGS := ${genArgs.mkString(" ")}
+         |$$(GEN_DIR)/$name.mk: ${deps.map(d => s"$$(WORKDIR)/$d").mkString(" ")}
+         |""".stripMargin)
+  }
+
+  /** Hash, sources and outputs of a generated target */
+  type CacheEntry = (String, Seq[String], Seq[String])
+
+  /** Reads the cache of generated targets. Each line holds: name, hash, sources, outputs */
+  def readCache(path: String): Map[String, CacheEntry] = {
+    if (!new File(path).exists()) return Map()
+    val src = Source.fromFile(path)
+    val entries = src.getLines().map(_.split("\t")).collect {
+      case Array(name, h, deps, outs) => (name, (h, deps.split(",").toSeq, outs.split(",").toSeq))
+    }.toMap
+    src.close()
+    entries
+  }
+
+  /**
+   * Generates the given targets into `dir`, skipping those whose sources, parameters and configuration are unchanged
+   * @param selected The targets to generate
+   * @param params Design parameters of the targets
+   * @param conf Configuration to generate with
+   * @param dir The output directory
+   * @param suffix Suffix appended to the names of all modules and files
+   * @param force Whether to regenerate all targets regardless of the cache
+   * @param args The arguments given to Generate, except target names, for the makefiles of the targets
+   */
+  def generate(selected: Seq[Target], params: Params, conf: ClickConfig, dir: String, suffix: String, force: Boolean,
+               args: Seq[String]): Unit = {
+    new File(dir).mkdirs()
+    val cachePath = s"$dir/$cacheFile"
+    val cache = readCache(cachePath)
+    var updated = Map[String, CacheEntry]()
+
+    for (t <- selected) {
+      val name = t.name + suffix
+      val id = s"$name $params"
+      val cached = cache.get(name).filter { case (h, deps, outs) =>
+        h == hash(id, conf, deps) && outs.forall(o => new File(s"$dir/$o").exists())
+      }
+      val (deps, outputs) = cached match {
+        case Some((_, deps, outs)) if !force =>
+          println(s"$name is up to date")
+          (deps, outs)
+        case _ =>
+          println(s"Generating $name")
+          build(t, params, conf, dir, suffix)
+      }
+      updated += ((name, (hash(id, conf, deps), deps, outputs)))
+      writeMakefile(name, deps, outputs, dir, t.name +: args)
+    }
+    //Other runs of Generate may have updated the cache meanwhile, so only the entries of these targets are replaced
+    val merged = readCache(cachePath) ++ updated
+    val tmp = s"$cachePath.${ProcessHandle.current().pid()}"
+    write(tmp, merged.map { case (name, (h, deps, outs)) =>
+      s"$name\t$h\t${deps.mkString(",")}\t${outs.mkString(",")}\n"
+    }.mkString)
+    Files.move(Paths.get(tmp), Paths.get(cachePath), StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+    writeConfig(conf, dir)
+  }
+
+  /**
+   * Generates the targets selected by a set of arguments:
+   *  - Target names select the targets to generate. All targets are generated if none are named
+   *  - `KEY=value` sets a field of the [[ClickConfig]], e.g. `REG_DELAY=7`
+   *  - `key=value` sets a design parameter of the targets, e.g. `depth=8` for the Fifo
+   *  - `--dir=<dir>` sets the output directory, `gen` by default
+   *  - `--suffix=<suffix>` appends a suffix to the names of all modules and files
+   *  - `--force` regenerates the targets regardless of the cache
+   */
+  def run(args: Seq[String]): Unit = {
+    def option(name: String) = args.collectFirst { case a if a.startsWith(s"--$name=") => a.stripPrefix(s"--$name=") }
+    val force = args.contains("--force")
+    val dir = option("dir").getOrElse("gen")
+    val suffix = option("suffix").getOrElse("")
+    val (settings, names) = args.filterNot(_.startsWith("--")).partition(_.contains("="))
+    val values = settings.map { s => val Array(k, v) = s.split("=", 2); k -> v }.toMap
+    val fields = ClickConfig().productElementNames.toSet
+    val (confValues, paramValues) = values.partition { case (k, _) => fields.contains(k) }
+
+    val unknown = names.filterNot(n => targets.exists(_.name == n))
+    require(unknown.isEmpty, s"Unknown targets ${unknown.mkString(", ")}. Available targets: ${targets.map(_.name).mkString(" ")}")
+    val selected = if (names.isEmpty) targets else targets.filter(t => names.contains(t.name))
+    for (t <- selected; k <- paramValues.keys) {
+      require(t.keys.contains(k), s"${t.name} has no parameter $k. Its parameters are: ${t.keys.mkString(" ")}")
+    }
+    generate(selected, Params(paramValues), configure(ClickConfig(), confValues), dir, suffix, force,
+      args.filterNot(a => a == "--force" || names.contains(a)))
+  }
+
+  //With --variants=<file>, each line of the file holds the arguments of one variant
+  args.collectFirst { case a if a.startsWith("--variants=") => a.stripPrefix("--variants=") } match {
+    case Some(file) =>
+      val src = Source.fromFile(file)
+      val variants = src.getLines().map(_.trim).filter(l => l.nonEmpty && !l.startsWith("#")).toList
+      src.close()
+      variants.foreach(v => run(v.split("\\s+").toSeq))
+    case None => run(args.toSeq)
+  }
 }
@@ -0,0 +1,42 @@
+package click
+
+import chisel3._
+
+/**
+ * An N-input arbiter, allowing N producers which are not mutually exclusive in their requests to access
+ * a common consumer.
+ * By default, it is built as a balanced tree of two-input [[Arbiter]]s, giving a grant latency which grows with the
+ * logarithm of N. The flat variant arbitrates between all inputs with a single [[RGDMutexN]] in front of a flat
+ * [[MergeN]]
+ * @param typ The datatype on the inputs and output of the arbiter
+ * @param N The number of inputs. Must be at least 2
+ * @param flat Whether to use a single N-way mutex instead of a tree
+ * @tparam T
+ */
+class ArbiterN[T <: Data](typ: T, N: Int, flat: Boolean = false)
+                         (implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "An arbiter must have at least two inputs")
+  val io = IO(new Bundle {
+    val in = Vec(N, new ReqAck(typ))
+    val out = Flipped(new ReqAck(typ))
+  })
+
+  if (flat) {
+    val rgd = Module(new RGDMutexN(N))
+    val merge = Module(new MergeN(typ, N, flat = true))
+
+    for (i <- 0 until N) {
+      rgd.io.R(i) := io.in(i).req
+      rgd.io.D(i) := merge.io.in(i).ack
+      merge.io.in(i).req := rgd.io.G(i)
+      merge.io.in(i).data := io.in(i).data
+      io.in(i).ack := merge.io.in(i).ack
+    }
+    io.out <> merge.io.out
+  } else {
+    io.out <> MergeN.tree(io.in) { () =>
+      val arbiter = Module(new Arbiter(typ))
+      (arbiter.io.in1, arbiter.io.in2, arbiter.io.out)
+    }
+  }
+}
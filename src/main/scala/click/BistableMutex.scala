@@ -77,6 +77,64 @@ class BistableMutex(val dR1: Int = 0, val dR2: Int = 0)
   io.G2 := o1 & !o2
 }
 
+/**
+ * A 2-phase request-grant-done mutex between N producers, generalizing the [[RGDMutex]].
+ * Each producer has the registers of one channel of the [[RGDMutex]], and the channels share a [[BistableMutexN]]
+ * @param N The number of producers. Must be at least 2
+ */
+class RGDMutexN(N: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "A mutex must have at least two producers")
+  val io = IO(new Bundle {
+    val R = Input(Vec(N, Bool()))
+    val D = Input(Vec(N, Bool()))
+    val G = Output(Vec(N, Bool()))
+  })
+  val mutex = Module(new BistableMutexN(N))
+
+  for(i <- 0 until N) {
+    //Same as regs[0..2] of the RGDMutex
+    val regs = for(_ <- 0 until 3) yield {
+      Module(new PhaseRegister(false))
+    }
+    mutex.io.R(i) := regs(0).io.out ^ io.D(i)
+
+    regs(0).clock := ((regs(0).io.out & !io.R(i) & regs(1).io.out) | (!regs(0).io.out & io.R(i) & !regs(1).io.out)).asClock
+    regs(1).clock := (!mutex.io.G(i)).asClock
+    regs(2).clock := mutex.io.G(i).asClock
+    for(reg <- regs) {
+      reg.io.in := !reg.io.out
+    }
+
+    io.G(i) := regs(2).io.out
+  }
+}
+
+/**
+ * A mutex between N producers, generalizing the cross-coupled NAND gates of the [[BistableMutex]] to N gates.
+ * Gate i is enabled when its request is high and all other gates are idle, and grants when it is the only active gate.
+ * When several requests become enabled in the same simulator step, e.g. when the holder of the mutex releases it while
+ * several others are waiting, the one with the lowest index wins. This models the resolution of the metastability
+ * a real mutex goes through, which the zero-delay model cannot resolve by itself.
+ * When creating Verilog code from circuits using a BistableMutexN, the argument `--no-check-comb-loops` must be passed
+ * @param N The number of producers. Must be at least 2
+ */
+class BistableMutexN(N: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "A mutex must have at least two producers")
+  val io = IO(new Bundle {
+    val R = Input(Vec(N, Bool()))
+    val G = Output(Vec(N, Bool()))
+  })
+  val o = Wire(Vec(N, Bool()))
+
+  def others(i: Int): Bool = (0 until N).filter(_ != i).map(o(_)).reduce(_ & _)
+  val enabled = (0 until N).map(i => io.R(i) & others(i))
+
+  for(i <- 0 until N) {
+    o(i) := !(enabled(i) & !enabled.take(i).foldLeft(false.B)(_ | _))
+    io.G(i) := !o(i) & others(i)
+  }
+}
+
 object BistableMutex extends App {
   (new ChiselStage).emitVerilog(new BistableMutex()(ClickConfig()), Array("-td", "gen", "--no-check-comb-loops"))
 }
\ No newline at end of file
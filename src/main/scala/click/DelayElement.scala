@@ -23,7 +23,12 @@ abstract class DelayElement(delay: Int) extends BlackBox {
 /**
  * A delay element for use when simulating circuits. This delay element will *not* serve to delay
  * signals in a synthesized circuit.
- * @param delay The delay of the delay element. Must be greater than zero
+ * The model uses an intra-assignment delay on a non-blocking assignment, giving a transport delay where
+ * every transition of reqIn is reproduced on reqOut. It simulates with Icarus Verilog and with Verilator 5
+ * when compiled with --timing.
+ * The delay of each instance is held in its `delay_ps` variable, which a testbench may overwrite to give every
+ * instance its own delay, e.g. for the Monte Carlo runs of `click_tb.montecarlo`.
+ * @param delay The delay of the delay element, in ns. Must be greater than zero
  */
 class DelayElementSim(delay: Int = 1) extends DelayElement(delay) with HasBlackBoxInline {
   override val desiredName = s"DelayElementSim_$delay"
@@ -32,8 +37,9 @@ class DelayElementSim(delay: Int = 1) extends DelayElement(delay) with HasBlackB
       | input reqIn,
       | output reg reqOut
       |);
+      |integer delay_ps /*verilator public_flat_rw*/ = ${delay * 1000};
       |always@(reqIn) begin
-      | reqOut <= #$delay reqIn;
+      | reqOut <= #(0.001 * delay_ps) reqIn;
       |end
       |initial begin
       | reqOut <= 1'b0;
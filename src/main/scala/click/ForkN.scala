@@ -0,0 +1,56 @@
+package click
+
+import chisel3._
+
+/**
+ * A Fork-component propagating the data on its input to N outputs.
+ * The request is distributed and the acknowledges are collected by a balanced tree of two-input [[Fork]]s, so the
+ * forward latency grows with the logarithm of N. With `chain`, the Forks form a linear chain instead, as when chaining
+ * two-input Forks by hand
+ * @param typIn The datatype on the input
+ * @param N The number of output channels. Must be at least 2
+ * @param typOut The datatype on each output
+ * @param chain Whether to build a chain of N-1 Forks instead of a tree
+ * @param fork A function used to perform the forking behaviour, returning the data of each output
+ * @tparam T1
+ * @tparam T2
+ */
+class ForkN[T1 <: Data, T2 <: Data](typIn: T1, N: Int, typOut: T2, chain: Boolean = false)
+                                   (fork: T1 => Seq[T2])
+                                   (implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "A fork must have at least two outputs")
+  val io = IO(new Bundle {
+    val in = new ReqAck(typIn)
+    val out = Vec(N, Flipped(new ReqAck(typOut)))
+  })
+
+  //Each subtree is its acknowledge, and a function connecting its request. The Forks only handle the handshakes
+  val leaves = io.out.map(o => (o.ack, (req: Bool) => o.req := req))
+  val (ack, connect) = reduceTree(leaves, chain) { (a, b) =>
+    val f = Module(Fork(Bool()))
+    f.io.out1.ack := a._1
+    f.io.out2.ack := b._1
+    a._2(f.io.out1.req)
+    b._2(f.io.out2.req)
+    f.io.in.data := false.B
+    (f.io.in.ack, (req: Bool) => f.io.in.req := req)
+  }
+  connect(io.in.req)
+  io.in.ack := ack
+
+  val d = fork(io.in.data)
+  require(d.length == N, "The fork function must return the data of every output")
+  io.out.zip(d).foreach { case (o, data) => o.data := data }
+}
+
+object ForkN {
+  /**
+   * Generates an N-output Fork which duplicates its input on all outputs
+   * @param typ The type of data being forked
+   * @param N The number of outputs
+   * @param chain Whether to build a chain of Forks instead of a tree
+   */
+  def apply[T <: Data](typ: T, N: Int, chain: Boolean = false)(implicit conf: ClickConfig): ForkN[T, T] = {
+    new ForkN(typ, N, typ, chain)(a => Seq.fill(N)(a))
+  }
+}
@@ -0,0 +1,54 @@
+package click
+
+import chisel3._
+import chisel3.util.Cat
+
+/**
+ * A Join-component merging N handshake channels into one channel.
+ * The requests are joined by a balanced tree of two-input [[Join]]s, so the forward latency grows with the logarithm
+ * of N. All inputs are acknowledged by the output's acknowledge, like the two-input [[Join]].
+ * With `chain`, the Joins form a linear chain instead, as when chaining two-input Joins by hand
+ * @param typIn The datatype on each input channel
+ * @param N The number of input channels. Must be at least 2
+ * @param typOut The datatype on the output channel
+ * @param chain Whether to build a chain of N-1 Joins instead of a tree
+ * @param join A function used to perform the joining behavior, taking the data of all inputs
+ * @tparam T1
+ * @tparam T2
+ */
+class JoinN[T1 <: Data, T2 <: Data](typIn: T1, N: Int, typOut: T2, chain: Boolean = false)
+                                   (join: Vec[T1] => T2)
+                                   (implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "A join must have at least two inputs")
+  val io = IO(new Bundle {
+    val in = Vec(N, new ReqAck(typIn))
+    val out = Flipped(new ReqAck(typOut))
+  })
+
+  //The Joins of the tree only handle the requests, the data is joined in one go
+  io.out.req := reduceTree(io.in.map(_.req), chain) { (a, b) =>
+    val j = Module(new Join(Bool(), Bool(), Bool())((x, _) => x))
+    j.io.in1.req := a
+    j.io.in2.req := b
+    j.io.in1.data := false.B
+    j.io.in2.data := false.B
+    j.io.out.ack := io.out.ack
+    j.io.out.req
+  }
+  io.in.foreach(_.ack := io.out.ack)
+
+  io.out.data := join(VecInit(io.in.map(_.data)))
+}
+
+object JoinN {
+  /**
+   * Creates an N-input Join concatenating N inputs of width `width` into an output of width `N*width`.
+   * The input on channel 0 is placed in the LSB of the output
+   * @param width The bitwidth of each input
+   * @param N The number of inputs
+   * @param chain Whether to build a chain of Joins instead of a tree
+   */
+  def apply(width: Int, N: Int, chain: Boolean = false)(implicit conf: ClickConfig): JoinN[UInt, UInt] = {
+    new JoinN(UInt(width.W), N, UInt((N*width).W), chain)(d => Cat(d.reverse))
+  }
+}
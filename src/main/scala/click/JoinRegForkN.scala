@@ -0,0 +1,51 @@
+package click
+
+import chisel3._
+import chisel3.util.Cat
+
+/**
+ * A JoinRegFork-block with N inputs and M outputs.
+ * The inputs are joined by a [[JoinN]] into a handshake register holding the data of every output, which a [[ForkN]]
+ * forks onto the outputs. Both the join and the fork are balanced trees, or chains with `chain`
+ * @param typIn The datatype of each input
+ * @param N The number of inputs. Must be at least 2
+ * @param init The initial value of each output
+ * @param M The number of outputs. Must be at least 2
+ * @param ro Initial value of the register's out.req signal
+ * @param chain Whether to build chains of Joins and Forks instead of trees
+ * @param joinfork The function used to join the input data and fork the output data, returning the data of each output
+ * @tparam T1
+ * @tparam T2
+ */
+class JoinRegForkN[T1 <: Data, T2 <: Data](typIn: T1, N: Int, init: T2, M: Int, ro: Boolean, chain: Boolean = false)
+                                          (joinfork: Vec[T1] => Seq[T2])
+                                          (implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  val typOut = chiselTypeOf(init)
+  val io = IO(new Bundle {
+    val in = Vec(N, new ReqAck(typIn))
+    val out = Vec(M, Flipped(new ReqAck(typOut)))
+  })
+
+  val join = Module(new JoinN(typIn, N, Vec(M, typOut), chain)(d => VecInit(joinfork(d))))
+  val reg = Module(new HandshakeRegister(VecInit(Seq.fill(M)(init)), ro))
+  val fork = Module(new ForkN(Vec(M, typOut), M, typOut, chain)(d => d))
+
+  join.io.in <> io.in
+  reg.io.in <> join.io.out
+  fork.io.in <> reg.io.out
+  io.out <> fork.io.out
+}
+
+object JoinRegForkN {
+  /**
+   * Creates a JoinRegForkN block concatenating N UInt's (input 0 in the LSB) and duplicating the result on M outputs
+   * @param widthIn Width of each input channel
+   * @param N The number of inputs
+   * @param M The number of outputs
+   * @param ro Initial value of the register's out.req signal
+   * @param chain Whether to build chains of Joins and Forks instead of trees
+   */
+  def apply(widthIn: Int, N: Int, M: Int, ro: Boolean, chain: Boolean)(implicit conf: ClickConfig): JoinRegForkN[UInt, UInt] = {
+    new JoinRegForkN(UInt(widthIn.W), N, 0.U((N*widthIn).W), M, ro, chain)(d => Seq.fill(M)(Cat(d.reverse)))
+  }
+}
@@ -0,0 +1,67 @@
+package click
+
+import chisel3._
+import chisel3.util.PriorityMux
+
+/**
+ * An N-input merge, forwarding the tokens of N mutually exclusive producers to one consumer.
+ * Like the [[Merge]], it expects its inputs to be mutually exclusive. If they are not, the behaviour is undefined.
+ * By default, it is built as a balanced tree of two-input [[Merge]]s, giving a forward latency which grows with the
+ * logarithm of N. The flat variant merges all inputs in a single stage, with the phase registers of the [[Merge]]
+ * generalized to N inputs
+ * @param typ The type of data on the inputs and output
+ * @param N The number of inputs. Must be at least 2
+ * @param flat Whether to build a single N-input stage instead of a tree
+ * @tparam T
+ */
+class MergeN[T <: Data](typ: T, N: Int, flat: Boolean = false)
+                       (implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N >= 2, "A merge must have at least two inputs")
+  val io = IO(new Bundle {
+    val in = Vec(N, new ReqAck(typ))
+    val out = Flipped(new ReqAck(typ))
+  })
+
+  if (flat) {
+    val sel = io.in.map(c => c.req ^ c.ack)
+    val clickIn = !(io.out.req ^ io.out.ack)
+    val clickOut = sel.reduce(_ || _)
+
+    for (c <- io.in) {
+      val P = Module(new PhaseRegister(false))
+      P.io.in := c.req
+      P.clock := clickIn.asClock
+      c.ack := P.io.out
+    }
+    val Pc = Module(new PhaseRegister(false))
+    Pc.io.in := !Pc.io.out
+    Pc.clock := clickOut.asClock
+
+    //As in the Merge, the last input is forwarded when no input is active
+    io.out.data := PriorityMux(sel.init.zip(io.in.init.map(_.data)) :+ (true.B, io.in.last.data))
+    io.out.req := simDelay(Pc.io.out, conf.MERGE_DELAY)
+  } else {
+    io.out <> MergeN.tree(io.in) { () =>
+      val merge = Module(new Merge(typ))
+      (merge.io.in1, merge.io.in2, merge.io.out)
+    }
+  }
+}
+
+object MergeN {
+  /**
+   * Connects a number of channels to one channel through a balanced tree of two-input elements.
+   * Must be called while elaborating a module, as it instantiates the elements of the tree
+   * @param ins The channels at the leaves of the tree
+   * @param node Instantiates one element, returning its two input channels and its output channel
+   * @return The output channel at the root of the tree
+   */
+  def tree[T <: Data](ins: Seq[ReqAck[T]])(node: () => (ReqAck[T], ReqAck[T], ReqAck[T])): ReqAck[T] = {
+    reduceTree(ins) { (left, right) =>
+      val (in1, in2, out) = node()
+      in1 <> left
+      in2 <> right
+      out
+    }
+  }
+}
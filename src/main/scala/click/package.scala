@@ -47,6 +47,24 @@ package object click {
     }
   }
 
+  /**
+   * Reduces a sequence with a binary function, either as a balanced tree or as a linear chain.
+   * Used to build N-input components out of two-input ones, where `f` instantiates one two-input component
+   * @param xs The values at the leaves. Must not be empty
+   * @param chain Whether to build a chain of depth n-1, where each step adds one leaf, instead of a tree of depth log2(n)
+   * @param f Combines the results of two subtrees
+   * @return The result at the root
+   */
+  def reduceTree[A](xs: Seq[A], chain: Boolean = false)(f: (A, A) => A): A = {
+    require(xs.nonEmpty, "Cannot reduce an empty sequence")
+    if (xs.length == 1) {
+      xs.head
+    } else {
+      val (left, right) = xs.splitAt(if (chain) xs.length - 1 else (xs.length + 1) / 2)
+      f(reduceTree(left, chain)(f), reduceTree(right, chain)(f))
+    }
+  }
+
   /**
    * A bundle representing a bundled-data request/acknowledge handshake
    * @param gen
@@ -7,34 +7,45 @@ import click._
 
 /**
  * An example of clock-domain crossing using the asynchronous click elements
- * This example uses a 4-deep asynchronous FIFO to transfer data between a producer and a consumer
+ * This example uses an asynchronous FIFO to transfer data between a producer and a consumer, where the consumer
+ * runs on a clock divided down from the clock of the producer
+ * @param clkDiv The period of the consumer clock, in cycles of the producer clock. Must be even and positive
+ * @param depth The number of stages in the FIFO
  */
-class CDC(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+class CDC(clkDiv: Int = 8, depth: Int = 4)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(clkDiv > 0 && clkDiv % 2 == 0, "Clock divider must be even and positive")
   val io = IO(new Bundle {
     val din = Input(UInt(8.W))
     val valid = Input(Bool())
+    /** High while the producer is idle, ready to accept a new byte */
+    val ready = Output(Bool())
     val dout = Output(UInt(8.W))
+    /** Toggles every time the consumer has received a complete byte on dout */
+    val done = Output(Bool())
   })
 
   //Generate rising-edge detecting valid signal
   val valid = RegNext(RegNext(io.valid))
   val v = valid && !RegNext(valid)
 
-  //Generate downsampled clock signal
+  //Generate downsampled clock signal, toggling every clkDiv/2 cycles
   val clk2 = RegInit(false.B)
-  val clkCnt = RegInit(0.U(2.W))
-  clkCnt := clkCnt + 1.U
-  clk2 := Mux(clkCnt === 3.U, !clk2, clk2)
+  val clkCnt = RegInit(0.U(log2Ceil(clkDiv / 2).max(1).W))
+  val toggle = clkCnt === (clkDiv / 2 - 1).U
+  clkCnt := Mux(toggle, 0.U, clkCnt + 1.U)
+  clk2 := Mux(toggle, !clk2, clk2)
 
   val prod = Module(new Producer)
-  val fifo = Module(Fifo(N=4, init=false.B, ro=false))
+  val fifo = Module(Fifo(N=depth, init=false.B, ro=false))
   val cons = withClock(clk2.asClock) {Module(new Consumer)}
 
   prod.io.din := io.din
   prod.io.valid := v
   prod.io.out <> fifo.io.in
   fifo.io.out <> cons.io.in
+  io.ready := prod.io.ready
   io.dout := cons.io.dout
+  io.done := cons.io.done
 }
 
 /**
@@ -44,6 +55,7 @@ class Producer extends Module {
   val io = IO(new Bundle {
     val din = Input(UInt(8.W))
     val valid = Input(Bool())
+    val ready = Output(Bool())
     val out = Flipped(new ReqAck(Bool()))
   })
 
@@ -78,6 +90,7 @@ class Producer extends Module {
 
   io.out.req := req
   io.out.data := buf(0)
+  io.ready := state === sIdle
 }
 
 /**
@@ -87,6 +100,7 @@ class Consumer extends Module with RequireAsyncReset {
   val io = IO(new Bundle {
     val in = new ReqAck(Bool())
     val dout = Output(UInt(8.W))
+    val done = Output(Bool())
   })
 
   val r = withReset(this.reset.asAsyncReset) {RegNext(io.in.req, false.B)}
@@ -94,13 +108,21 @@ class Consumer extends Module with RequireAsyncReset {
   val buf = withReset(this.reset.asAsyncReset) {RegInit(0.U(8.W))}
   val reqEdge = req =/= RegNext(req)
   val ack = withReset(this.reset.asAsyncReset) {RegInit(false.B)}
+  //Counts the bits of the current byte, toggling done once all 8 have been received
+  val cnt = withReset(this.reset.asAsyncReset) {RegInit(0.U(3.W))}
+  val done = withReset(this.reset.asAsyncReset) {RegInit(false.B)}
 
   when(reqEdge) {
     ack := !ack
     buf := Cat(io.in.data, buf(7,1))
+    cnt := cnt + 1.U
+    when(cnt === 7.U) {
+      done := !done
+    }
   }
   io.in.ack := ack
   io.dout := buf
+  io.done := done
 }
 
 object CDC extends App {
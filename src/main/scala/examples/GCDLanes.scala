@@ -0,0 +1,83 @@
+package examples
+
+import chisel3._
+import chisel3.util.isPow2
+import click._
+
+/**
+ * A self-timed source of select tokens, alternating between false and true and starting with false.
+ * The token circulates in a ring of two handshake registers, being inverted on its way from the first to the second
+ */
+class Alternator(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  val io = IO(new Bundle {
+    val out = Flipped(new ReqAck(Bool()))
+  })
+
+  //R0 holds the next select token, R1 is the bubble of the ring
+  val R0 = Module(new HandshakeRegister(false.B, true))
+  val R1 = Module(new HandshakeRegister(true.B, false))
+  val F0 = Module(Fork(Bool()))
+
+  F0.io.in <> R0.io.out
+  io.out <> F0.io.out1
+  R1.io.in <> F0.io.out2
+  R1.io.in.data := !F0.io.out2.data
+  R0.io.in <> R1.io.out
+}
+
+/**
+ * A GCD circuit with a number of independent [[GCD]] lanes, computing several pairs at once.
+ * Incoming pairs are spread round-robin over the lanes by a tree of [[Demultiplexer]]s, and the results are
+ * collected in the same order by a tree of [[Multiplexer]]s, so results leave in the order the pairs came in.
+ * Every demultiplexer and multiplexer alternates between its two halves, driven by its own [[Alternator]]
+ * @param dataWidth Width of the operands
+ * @param lanes The number of GCD lanes. Must be a power of two
+ */
+class GCDLanes(dataWidth: Int, lanes: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(lanes > 0 && isPow2(lanes), "Number of lanes must be a power of two")
+  def dtype() = new Bundle2(UInt(dataWidth.W), UInt(dataWidth.W))
+  val io = IO(new Bundle {
+    val in = new ReqAck(dtype())
+    val out = Flipped(new ReqAck(dtype()))
+  })
+
+  if (lanes == 1) {
+    val gcd = Module(new GCD(dataWidth))
+    gcd.io.in <> io.in
+    io.out <> gcd.io.out
+  } else {
+    val DX0 = Module(new Demultiplexer(dtype()))
+    val MX0 = Module(new Multiplexer(dtype()))
+    val selIn = Module(new Alternator)
+    val selOut = Module(new Alternator)
+    val half1 = Module(new GCDLanes(dataWidth, lanes / 2))
+    val half2 = Module(new GCDLanes(dataWidth, lanes / 2))
+
+    DX0.io.in <> io.in
+    DX0.io.sel <> selIn.io.out
+    half1.io.in <> DX0.io.out1
+    half2.io.in <> DX0.io.out2
+    MX0.io.in1 <> half1.io.out
+    MX0.io.in2 <> half2.io.out
+    MX0.io.sel <> selOut.io.out
+    io.out <> MX0.io.out
+  }
+}
+
+/**
+ * A [[GCDLanes]] and a single-lane [[GCD]] side by side, for comparing their throughput in a single simulation
+ * @param dataWidth Width of the operands
+ * @param lanes The number of lanes of the multi-lane GCD
+ */
+class GCDLanesCompare(dataWidth: Int, lanes: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  val multi = Module(new GCDLanes(dataWidth, lanes))
+  val single = Module(new GCD(dataWidth))
+
+  val io = IO(new Bundle {
+    val lanes = chiselTypeOf(GCDLanesCompare.this.multi.io)
+    val single = chiselTypeOf(GCDLanesCompare.this.single.io)
+  })
+
+  io.lanes <> multi.io
+  io.single <> single.io
+}
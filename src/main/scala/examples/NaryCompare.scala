@@ -0,0 +1,36 @@
+package examples
+
+import chisel3._
+import click._
+
+/**
+ * An N-input [[JoinN]], an N-output [[ForkN]] and a [[JoinRegForkN]] with N inputs and outputs, each built both as a
+ * balanced tree and as a chain of two-input components. The six designs are independent, and simulating them compares
+ * trees against chaining by hand in a single run
+ * @param N The number of inputs of the joins and outputs of the forks
+ * @param width Width of each input of the joins, and of the data being forked
+ */
+class NaryCompare(N: Int, width: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  val joinTree = Module(JoinN(width, N))
+  val joinChain = Module(JoinN(width, N, chain = true))
+  val forkTree = Module(ForkN(UInt(width.W), N))
+  val forkChain = Module(ForkN(UInt(width.W), N, chain = true))
+  val jrfTree = Module(JoinRegForkN(width, N, N, ro = false, chain = false))
+  val jrfChain = Module(JoinRegForkN(width, N, N, ro = false, chain = true))
+
+  val io = IO(new Bundle {
+    val joinTree = chiselTypeOf(NaryCompare.this.joinTree.io)
+    val joinChain = chiselTypeOf(NaryCompare.this.joinChain.io)
+    val forkTree = chiselTypeOf(NaryCompare.this.forkTree.io)
+    val forkChain = chiselTypeOf(NaryCompare.this.forkChain.io)
+    val jrfTree = chiselTypeOf(NaryCompare.this.jrfTree.io)
+    val jrfChain = chiselTypeOf(NaryCompare.this.jrfChain.io)
+  })
+
+  io.joinTree <> joinTree.io
+  io.joinChain <> joinChain.io
+  io.forkTree <> forkTree.io
+  io.forkChain <> forkChain.io
+  io.jrfTree <> jrfTree.io
+  io.jrfChain <> jrfChain.io
+}
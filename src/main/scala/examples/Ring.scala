@@ -0,0 +1,65 @@
+package examples
+
+import chisel3._
+import chisel3.util.log2Ceil
+import click._
+
+/**
+ * A self-timed ring of handshake registers holding a number of tokens.
+ * The ring is a [[Fifo]] whose output is fed back into its input. Since the click elements are phase-decoupled,
+ * any number of tokens can be placed in the ring by setting the initial out.req-values of its stages. The tokens are
+ * spread as evenly as possible around the ring, and stage i is initialized to the value i.
+ * @param N The number of stages in the ring
+ * @param tokens The number of tokens in the ring. Must be between 1 and N-1, as a ring needs at least one bubble
+ * @param dataWidth Width of the data being passed around the ring
+ */
+class Ring(N: Int, tokens: Int, dataWidth: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  require(N > 1, "A ring must have at least two stages")
+  require(tokens > 0 && tokens < N, "Number of tokens must be between 1 and N-1")
+  require(dataWidth >= log2Ceil(N), "Data must be wide enough to hold the index of every stage")
+  val io = IO(new Bundle {
+    /** Starts the ring when taken high */
+    val go = Input(Bool())
+    /** Request of the channel from the last stage back to the first, toggling once per token passing it */
+    val req = Output(Bool())
+    /** Data on that channel */
+    val data = Output(UInt(dataWidth.W))
+  })
+
+  val fifo = Module(new Fifo(N, Seq.tabulate(N)(_.U(dataWidth.W)), Ring.placement(N, tokens)))
+  fifo.io.in.data := fifo.io.out.data
+  fifo.io.in.req := fifo.io.out.req && io.go
+  fifo.io.out.ack := fifo.io.in.ack
+
+  io.req := fifo.io.out.req
+  io.data := fifo.io.out.data
+}
+object Ring {
+  /**
+   * Spreads tokens as evenly as possible over the stages of a ring
+   * @param N The number of stages in the ring
+   * @param tokens The number of tokens
+   * @return The initial out.req-value of each stage, true for the stages holding a token
+   */
+  def placement(N: Int, tokens: Int): Seq[Boolean] = Seq.tabulate(N)(i => (i * tokens) % N < tokens)
+}
+
+/**
+ * A [[Ring]] of N stages for every number of tokens from 1 to N-1, all started by the same go-signal.
+ * Simulating it measures the throughput of every occupancy of the ring at once
+ * @param N The number of stages in each ring
+ * @param dataWidth Width of the data being passed around the rings
+ */
+class RingSweep(N: Int, dataWidth: Int)(implicit conf: ClickConfig) extends Module with RequireAsyncReset {
+  val io = IO(new Bundle {
+    val go = Input(Bool())
+    /** The req-output of the ring holding i+1 tokens */
+    val taps = Output(Vec(N-1, Bool()))
+  })
+
+  for(t <- 1 until N) {
+    val ring = Module(new Ring(N, t, dataWidth))
+    ring.io.go := io.go
+    io.taps(t-1) := ring.io.req
+  }
+}
@@ -0,0 +1,86 @@
+import cocotb
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+from click_tb.bench import BenchmarkResults, interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.soak import LatencyStats
+from collections import deque
+import math
+import os
+import random
+
+# Number of tokens sent by every producer in the stream case
+TOKENS = int(os.environ.get("TOKENS", 1000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("arbiter_n")
+
+
+def ports(dut):
+    """A source on every input of the arbiter, and a sink on its output recording arrival times"""
+    n = 0
+    while hasattr(dut, f"io_in_{n}_req"):
+        n += 1
+    return [HandshakeSource(dut, f"io_in_{i}") for i in range(n)], HandshakeSink(dut, "io_out", timestamps=True)
+
+
+def shape(n):
+    return {"inputs": n, "tree_depth": math.ceil(math.log2(n))}
+
+
+@cocotb.test()
+async def latency(dut):
+    """Grant latency of a single request with all other inputs idle, from the request until the token leaves"""
+    srcs, sink = ports(dut)
+    await reset(dut, *srcs, sink)
+
+    stats = LatencyStats()
+    for _ in range(10):
+        for i, src in enumerate(srcs):
+            start = get_sim_time("ps")
+            send = cocotb.start_soon(src.send(i))
+            await sink.receive_expect(i)
+            stats.add(round(sink.times[-1] * 1000) - start)
+            await send
+            await Timer(20, "ns")
+    lat = stats.summary()
+    results.record("latency", **shape(len(srcs)), latency_ns=lat["mean_ns"], latency_min_ns=lat["min_ns"],
+                   latency_max_ns=lat["max_ns"])
+
+
+@cocotb.test()
+async def stream(dut):
+    """
+    Throughput and grant latency with every producer requesting again as soon as its previous token is acknowledged.
+    Requests are jittered by up to 500 ps, as the zero-delay mutexes cannot resolve requests in the same simulator step
+    """
+    rng = random.Random(SEED)
+    srcs, sink = ports(dut)
+    await reset(dut, *srcs, sink)
+
+    requests = [deque() for _ in srcs]
+
+    async def produce(i, src):
+        for _ in range(TOKENS):
+            await Timer(rng.randint(1, 500), "ps")
+            requests[i].append(get_sim_time("ps"))
+            await src.send(i)
+
+    for i, src in enumerate(srcs):
+        cocotb.start_soon(produce(i, src))
+    stats = LatencyStats()
+    grants = [0] * len(srcs)
+    # Grants of each producer while all of them were still requesting, until the first one sent its last token
+    contended = None
+    for _ in range(TOKENS * len(srcs)):
+        i = await sink.receive()
+        grants[i] += 1
+        stats.add(round(sink.times[-1] * 1000) - requests[i].popleft())
+        if contended is None and grants[i] == TOKENS:
+            contended = list(grants)
+    assert grants == [TOKENS] * len(srcs), f"Tokens received from each input: {grants}"
+
+    shares = [g * len(srcs) / sum(contended) for g in contended]
+    results.record("stream", **shape(len(srcs)), **interval_stats(sink.times),
+                   **{f"grant_latency_{k}": v for k, v in stats.summary().items()},
+                   fair_share_min=min(shares), fair_share_max=max(shares))
@@ -0,0 +1,90 @@
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import Edge, ReadOnly, RisingEdge, Timer
+from cocotb.utils import get_sim_time
+from click_tb.bench import BenchmarkResults, interval_stats, latency_stats
+import os
+import random
+
+# Number of bytes streamed across the clock domains for every clock period
+TOKENS = int(os.environ.get("TOKENS", 500))
+# Periods (ns) of the producer clock. The consumer clock is divided down from it by the clkDiv of the design
+CLK_PERIODS = [float(p) for p in os.environ.get("CLK_PERIODS", "2,5,10,20").split(",")]
+
+results = BenchmarkResults("cdc")
+rng = random.Random(int(os.environ.get("SEED", 1)))
+
+
+async def start(dut, period):
+    """Starts the producer clock with the given period and resets the design"""
+    clock = cocotb.start_soon(Clock(dut.clock, period, "ns").start())
+    dut.reset.value = 1
+    dut.io_valid.value = 0
+    dut.io_din.value = 0
+    await Timer(3 * period, "ns")
+    dut.reset.value = 0
+    return clock
+
+
+async def consumer_period(dut):
+    """Measures the period of the divided consumer clock"""
+    await RisingEdge(dut.clk2)
+    t = get_sim_time("ns")
+    await RisingEdge(dut.clk2)
+    return get_sim_time("ns") - t
+
+
+async def send_byte(dut, byte):
+    """Hands a byte to the producer as soon as it is ready, returning the time (ns) it was handed over"""
+    await RisingEdge(dut.clock)
+    while not dut.io_ready.value:
+        await RisingEdge(dut.clock)
+    dut.io_din.value = byte
+    dut.io_valid.value = 1
+    t = get_sim_time("ns")
+    await RisingEdge(dut.clock)
+    dut.io_valid.value = 0
+    while dut.io_ready.value:
+        await RisingEdge(dut.clock)
+    return t
+
+
+async def receive(dut, n, times, received):
+    """Collects `n` bytes from the consumer, timestamping the completion of each one"""
+    for _ in range(n):
+        await Edge(dut.io_done)
+        await ReadOnly()
+        times.append(get_sim_time("ns"))
+        received.append(int(dut.io_dout.value))
+
+
+@cocotb.test()
+async def stream(dut):
+    """Sustained throughput and end-to-end latency of a continuous stream of bytes, for every producer clock period"""
+    for period in CLK_PERIODS:
+        clock = await start(dut, period)
+        consumer = await consumer_period(dut)
+
+        # Single bytes crossing an empty FIFO
+        idle_sent, idle_done, received = [], [], []
+        for _ in range(20):
+            task = cocotb.start_soon(receive(dut, 1, idle_done, received))
+            idle_sent.append(await send_byte(dut, rng.randrange(256)))
+            await task
+        idle = latency_stats(idle_sent, idle_done)
+
+        # Bytes handed to the producer as soon as it is ready
+        data = [rng.randrange(256) for _ in range(TOKENS)]
+        sent, done, received = [], [], []
+        task = cocotb.start_soon(receive(dut, len(data), done, received))
+        for byte in data:
+            sent.append(await send_byte(dut, byte))
+        await task
+        clock.kill()
+        assert received == data, f"Bytes were lost or corrupted with a {period} ns producer clock"
+
+        stats = interval_stats(done)
+        results.record(f"stream_{period:g}ns", **stats, **latency_stats(sent, done),
+                       bytes_per_us=1000 / stats["cycle_time_ns"],
+                       latency_idle_ns=idle["latency_ns"],
+                       producer_period_ns=period, consumer_period_ns=consumer, clock_ratio=consumer / period)
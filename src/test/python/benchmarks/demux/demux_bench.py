@@ -0,0 +1,63 @@
+import cocotb
+from cocotb.triggers import Combine
+from click_tb.bench import BenchmarkResults, interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.traffic import Occupancy, Traffic
+import os
+import random
+
+# Number of tokens streamed through the demultiplexer
+TOKENS = int(os.environ.get("TOKENS", 10000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("demux")
+
+
+async def traffic(dut, case, source, sink1, sink2):
+    """
+    Streams tokens through the demultiplexer to a random output, with a consumer on each output.
+    Each token and its select are sent together, as the demultiplexer acknowledges both at once
+    """
+    rng = random.Random(SEED)
+    src = HandshakeSource(dut, "io_in", gap=source)
+    sel = HandshakeSource(dut, "io_sel")
+    snk1 = HandshakeSink(dut, "io_out1", delay=sink1, timestamps=True)
+    snk2 = HandshakeSink(dut, "io_out2", delay=sink2, timestamps=True)
+    await reset(dut, src, sel, snk1, snk2)
+
+    occupancy = Occupancy(dut, ["io_in"], ["io_out1", "io_out2"])
+    selects = [rng.randrange(2) for _ in range(TOKENS)]
+    tokens = [rng.randrange(2 ** len(dut.io_in_data)) for _ in range(TOKENS)]
+
+    async def produce():
+        for token, s in zip(tokens, selects):
+            await Combine(cocotb.start_soon(src.send(token)), cocotb.start_soon(sel.send(s)))
+
+    cocotb.start_soon(produce())
+    out1 = cocotb.start_soon(snk1.receive_stream([t for t, s in zip(tokens, selects) if s == 0]))
+    await snk2.receive_stream([t for t, s in zip(tokens, selects) if s == 1])
+    await out1
+    occupancy.stop()
+    results.record(case, **interval_stats(sorted(snk1.times + snk2.times)), **occupancy.summary(),
+                   out1_throughput_tokens_per_ns=interval_stats(snk1.times)["throughput_tokens_per_ns"],
+                   out2_throughput_tokens_per_ns=interval_stats(snk2.times)["throughput_tokens_per_ns"],
+                   source=source.describe(), sink1=sink1.describe(), sink2=sink2.describe())
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time with the producer and both consumers at full speed"""
+    await traffic(dut, "stream", Traffic(), Traffic(), Traffic())
+
+
+@cocotb.test()
+async def slow_output(dut):
+    """One consumer much slower than the other. Every token for it blocks the tokens behind it for the fast one"""
+    await traffic(dut, "slow_output", Traffic(), Traffic(), Traffic(gap=10, jitter="exponential", seed=SEED))
+
+
+@cocotb.test()
+async def bursty_producer(dut):
+    """A producer sending bursts of tokens to consumers with random delays"""
+    await traffic(dut, "bursty_producer", Traffic(burst=16, idle=100, seed=SEED),
+                  Traffic(gap=2, jitter="uniform", seed=SEED + 1), Traffic(gap=2, jitter="uniform", seed=SEED + 2))
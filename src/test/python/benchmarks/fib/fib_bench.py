@@ -0,0 +1,35 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb import montecarlo
+from click_tb.bench import BenchmarkResults, interval_stats
+from click_tb.handshake import HandshakeSink
+import os
+
+# Number of values taken out of the ring
+TOKENS = int(os.environ.get("TOKENS", 10000))
+
+results = BenchmarkResults("fib")
+
+
+@cocotb.test()
+async def ring(dut):
+    """
+    Steady-state cycle time of the Fibonacci ring with a consumer that acknowledges immediately.
+    Randomizes the delays for Monte Carlo runs, see click_tb.montecarlo
+    """
+    mc = await montecarlo.from_env(dut)
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    dut.reset.value = 1
+    dut.io_go.value = 0
+    # The output register starts out holding a token (ro=true), which is acknowledged from the start
+    sink.reset(phase=1)
+    await Timer(1, "ns")
+    dut.reset.value = 0
+    await Timer(1, "ns")
+    dut.io_go.value = 1
+
+    for _ in range(TOKENS):
+        await sink.receive()
+    results.record("ring", **interval_stats(sink.times), **(mc.summary() if mc else {}))
+    if mc:
+        mc.check()
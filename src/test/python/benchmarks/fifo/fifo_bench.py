@@ -0,0 +1,89 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb.bench import BenchmarkResults, HostTime, interval_stats, latency_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.traffic import Occupancy, Traffic
+import os
+import random
+
+# Number of tokens streamed through the FIFO
+TOKENS = int(os.environ.get("TOKENS", 10000))
+# Traffic models of the producer and consumer of the custom_traffic case, see click_tb.traffic.Traffic.parse
+SOURCE_TRAFFIC = os.environ.get("SOURCE_TRAFFIC", "")
+SINK_TRAFFIC = os.environ.get("SINK_TRAFFIC", "")
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("fifo")
+
+
+@cocotb.test()
+async def latency(dut):
+    """Forward latency of single tokens entering an empty FIFO"""
+    src = HandshakeSource(dut, "io_in", timestamps=True)
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    await reset(dut, src, sink)
+
+    rng = random.Random(SEED)
+    for _ in range(100):
+        send = cocotb.start_soon(src.send(rng.randrange(2 ** len(dut.io_in_data))))
+        await sink.receive()
+        await send
+        # Let the acknowledge propagate back, emptying the FIFO
+        await Timer(50, "ns")
+    results.record("latency", **latency_stats(src.times, sink.times))
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time and throughput of back-to-back tokens"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    await reset(dut, src, sink)
+
+    rng = random.Random(SEED)
+    tokens = [rng.randrange(2 ** len(dut.io_in_data)) for _ in range(TOKENS)]
+    host = HostTime()
+    cocotb.start_soon(src.send_stream(tokens))
+    await sink.receive_stream(tokens)
+    results.record("stream", **interval_stats(sink.times), **host.summary(TOKENS))
+
+
+async def traffic(dut, case, source, sink):
+    """Streams tokens from a producer to a consumer with the given traffic models, measuring throughput and occupancy"""
+    src = HandshakeSource(dut, "io_in", gap=source)
+    snk = HandshakeSink(dut, "io_out", delay=sink, timestamps=True)
+    await reset(dut, src, snk)
+
+    occupancy = Occupancy(dut, ["io_in"], ["io_out"])
+    rng = random.Random(SEED)
+    tokens = [rng.randrange(2 ** len(dut.io_in_data)) for _ in range(TOKENS)]
+    cocotb.start_soon(src.send_stream(tokens))
+    await snk.receive_stream(tokens)
+    occupancy.stop()
+    results.record(case, **interval_stats(snk.times), **occupancy.summary(),
+                   source=source.describe(), sink=sink.describe())
+
+
+@cocotb.test()
+async def slow_consumer(dut):
+    """A producer at full speed and a consumer which is slower than the FIFO"""
+    await traffic(dut, "slow_consumer", Traffic(), Traffic(gap=10, jitter="uniform", seed=SEED))
+
+
+@cocotb.test()
+async def bursty_producer(dut):
+    """A producer sending bursts of tokens, drained by a consumer at a steady rate"""
+    await traffic(dut, "bursty_producer", Traffic(burst=16, idle=160, seed=SEED), Traffic(gap=5, seed=SEED + 1))
+
+
+@cocotb.test()
+async def stalling_consumer(dut):
+    """A producer at a steady rate and a fast consumer which occasionally stalls for a long time"""
+    await traffic(dut, "stalling_consumer", Traffic(gap=5, jitter="exponential", seed=SEED),
+                  Traffic(stall=0.02, stall_time=100, seed=SEED + 1))
+
+
+@cocotb.test(skip=not (SOURCE_TRAFFIC or SINK_TRAFFIC))
+async def custom_traffic(dut):
+    """Producer and consumer set by SOURCE_TRAFFIC and SINK_TRAFFIC, e.g. SINK_TRAFFIC=gap=4,burst=8,idle=50"""
+    await traffic(dut, "custom_traffic", Traffic.parse(SOURCE_TRAFFIC, SEED), Traffic.parse(SINK_TRAFFIC, SEED + 1))
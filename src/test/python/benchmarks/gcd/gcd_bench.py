@@ -0,0 +1,79 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb import montecarlo
+from click_tb.bench import BenchmarkResults, bench_dir, interval_stats, latency_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.trace import HandshakeTracer, load_trace
+from click_tb.trace_analysis import analyze, critical_cycle, latency_histograms
+import math
+import os
+import random
+
+# Number of operand pairs streamed through the circuit
+TOKENS = int(os.environ.get("TOKENS", 2000))
+
+# Component instances of GCD, all of whose channels are traced
+STAGES = ["R0", "RF0", "RF1", "F0", "MX0", "DX0", "DX1", "ME0", "CL0", "CL1", "CL2", "CL3"]
+
+results = BenchmarkResults("gcd")
+rng = random.Random(int(os.environ.get("SEED", 1)))
+
+
+def pairs(dut, n):
+    top = 2 ** len(dut.io_in_data_a)
+    return [(rng.randrange(1, top), rng.randrange(1, top)) for _ in range(n)]
+
+
+@cocotb.test()
+async def latency(dut):
+    """Forward latency of single operand pairs. It depends on the number of loop iterations the pair requires"""
+    src = HandshakeSource(dut, "io_in", timestamps=True)
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    await reset(dut, src, sink, duration=5)
+
+    for a, b in pairs(dut, 200):
+        send = cocotb.start_soon(src.send((a, b)))
+        await sink.receive_expect((math.gcd(a, b),) * 2)
+        await send
+        await Timer(50, "ns")
+    results.record("latency", **latency_stats(src.times, sink.times))
+
+
+@cocotb.test()
+async def stream(dut):
+    """Throughput of back-to-back operand pairs. Randomizes the delays for Monte Carlo runs, see click_tb.montecarlo"""
+    mc = await montecarlo.from_env(dut)
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    await reset(dut, src, sink, duration=5)
+
+    operands = pairs(dut, TOKENS)
+    cocotb.start_soon(src.send_stream(operands))
+    await sink.receive_stream([(math.gcd(a, b),) * 2 for a, b in operands])
+    results.record("stream", **interval_stats(sink.times, warmup=0), **(mc.summary() if mc else {}))
+    if mc:
+        mc.check()
+
+
+@cocotb.test()
+async def trace(dut):
+    """Latency of each stage and the critical cycle of the loop, from a trace of all internal channels"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out")
+    await reset(dut, src, sink, duration=5)
+
+    path = os.path.join(bench_dir(), "gcd_trace.npy")
+    os.makedirs(bench_dir(), exist_ok=True)
+    tracer = HandshakeTracer(dut, path, channels=["io_in", "io_out"], instances=STAGES)
+    operands = pairs(dut, TOKENS)
+    cocotb.start_soon(src.send_stream(operands))
+    await sink.receive_stream([(math.gcd(a, b),) * 2 for a, b in operands])
+    tracer.close()
+
+    trace = analyze(*load_trace(path))
+    stages = latency_histograms(trace)
+    cycle = critical_cycle(trace)
+    results.record("trace", events=tracer.count,
+                   stage_latency_ns={name: s["mean_ns"] for name, s in stages.items()},
+                   critical_cycle_ns=cycle and cycle["period_ns"],
+                   critical_cycle=cycle and [step["stage"] for step in cycle["steps"]])
@@ -0,0 +1,55 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb.bench import BenchmarkResults, interval_stats, latency_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+import os
+import random
+
+# Number of tokens streamed through the JoinRegFork
+TOKENS = int(os.environ.get("TOKENS", 10000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("jrf")
+
+
+def ports(dut, timestamps=False):
+    return (HandshakeSource(dut, "io_in1", timestamps=timestamps), HandshakeSource(dut, "io_in2"),
+            HandshakeSink(dut, "io_out1", timestamps=timestamps), HandshakeSink(dut, "io_out2"))
+
+
+@cocotb.test()
+async def latency(dut):
+    """Forward latency from both inputs arriving until the outputs are produced"""
+    src1, src2, sink1, sink2 = ports(dut, timestamps=True)
+    await reset(dut, src1, src2, sink1, sink2)
+
+    width = len(dut.io_in1_data)
+    rng = random.Random(SEED)
+    for _ in range(100):
+        a, b = rng.randrange(2 ** width), rng.randrange(2 ** width)
+        cocotb.start_soon(src2.send(b))
+        cocotb.start_soon(sink2.receive())
+        send = cocotb.start_soon(src1.send(a))
+        assert await sink1.receive() == (a << width) | b
+        await send
+        await Timer(50, "ns")
+    results.record("latency", **latency_stats(src1.times, sink1.times))
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time with both producers and both consumers running at full speed"""
+    src1, src2, sink1, sink2 = ports(dut, timestamps=True)
+    await reset(dut, src1, src2, sink1, sink2)
+
+    width = len(dut.io_in1_data)
+    rng = random.Random(SEED)
+    in1 = [rng.randrange(2 ** width) for _ in range(TOKENS)]
+    in2 = [rng.randrange(2 ** width) for _ in range(TOKENS)]
+    expected = [(a << width) | b for a, b in zip(in1, in2)]
+    cocotb.start_soon(src1.send_stream(in1))
+    cocotb.start_soon(src2.send_stream(in2))
+    other = cocotb.start_soon(sink2.receive_stream(expected))
+    await sink1.receive_stream(expected)
+    await other
+    results.record("stream", **interval_stats(sink1.times))
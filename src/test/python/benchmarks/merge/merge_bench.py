@@ -0,0 +1,59 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb.bench import BenchmarkResults, interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.traffic import Occupancy, Traffic
+import os
+import random
+
+# Number of tokens streamed through the merge
+TOKENS = int(os.environ.get("TOKENS", 10000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("merge")
+
+
+async def traffic(dut, case, source, sink):
+    """
+    Streams tokens through the merge from a producer which sends each token on a random input, never on both at once
+    as the merge requires, measuring the throughput and occupancy under the given traffic models
+    """
+    rng = random.Random(SEED)
+    srcs = [HandshakeSource(dut, "io_in1"), HandshakeSource(dut, "io_in2")]
+    snk = HandshakeSink(dut, "io_out", delay=sink, timestamps=True)
+    await reset(dut, *srcs, snk)
+
+    occupancy = Occupancy(dut, ["io_in1", "io_in2"], ["io_out"])
+    tokens = [rng.randrange(2 ** len(dut.io_in1_data)) for _ in range(TOKENS)]
+    inputs = [rng.randrange(2) for _ in range(TOKENS)]
+
+    async def produce():
+        for token, i in zip(tokens, inputs):
+            await srcs[i].send(token)
+            gap = source()
+            if gap:
+                await Timer(gap, "ns", round_mode="round")
+
+    cocotb.start_soon(produce())
+    await snk.receive_stream(tokens)
+    occupancy.stop()
+    results.record(case, **interval_stats(snk.times), **occupancy.summary(),
+                   source=source.describe(), sink=sink.describe())
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time with a producer and a consumer at full speed"""
+    await traffic(dut, "stream", Traffic(), Traffic())
+
+
+@cocotb.test()
+async def slow_consumer(dut):
+    """A producer at full speed and a consumer with random, exponentially distributed delays"""
+    await traffic(dut, "slow_consumer", Traffic(), Traffic(gap=5, jitter="exponential", seed=SEED))
+
+
+@cocotb.test()
+async def bursty_producer(dut):
+    """A producer sending bursts of tokens to a consumer at full speed"""
+    await traffic(dut, "bursty_producer", Traffic(burst=8, idle=50, seed=SEED), Traffic())
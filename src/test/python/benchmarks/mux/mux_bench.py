@@ -0,0 +1,56 @@
+import cocotb
+from click_tb.bench import BenchmarkResults, interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+from click_tb.traffic import Occupancy, Traffic
+import os
+import random
+
+# Number of tokens streamed through the multiplexer
+TOKENS = int(os.environ.get("TOKENS", 10000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("mux")
+
+
+async def traffic(dut, case, source1, source2, sink):
+    """
+    Streams tokens through the multiplexer, selecting a random input for each token. Both producers run
+    independently with their own traffic model, while the select tokens are sent at full speed
+    """
+    rng = random.Random(SEED)
+    src1 = HandshakeSource(dut, "io_in1", gap=source1)
+    src2 = HandshakeSource(dut, "io_in2", gap=source2)
+    sel = HandshakeSource(dut, "io_sel")
+    snk = HandshakeSink(dut, "io_out", delay=sink, timestamps=True)
+    await reset(dut, src1, src2, sel, snk)
+
+    occupancy = Occupancy(dut, ["io_in1", "io_in2"], ["io_out"])
+    width = len(dut.io_in1_data)
+    selects = [rng.randrange(2) for _ in range(TOKENS)]
+    tokens = [rng.randrange(2 ** width) for _ in range(TOKENS)]
+    cocotb.start_soon(src1.send_stream([t for t, s in zip(tokens, selects) if s == 0]))
+    cocotb.start_soon(src2.send_stream([t for t, s in zip(tokens, selects) if s == 1]))
+    cocotb.start_soon(sel.send_stream(selects))
+    await snk.receive_stream(tokens)
+    occupancy.stop()
+    results.record(case, **interval_stats(snk.times), **occupancy.summary(), source1=source1.describe(),
+                   source2=source2.describe(), sink=sink.describe())
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time with all producers and the consumer at full speed"""
+    await traffic(dut, "stream", Traffic(), Traffic(), Traffic())
+
+
+@cocotb.test()
+async def slow_input(dut):
+    """One producer much slower than the other, stalling the output whenever it is selected"""
+    await traffic(dut, "slow_input", Traffic(), Traffic(gap=10, jitter="exponential", seed=SEED), Traffic())
+
+
+@cocotb.test()
+async def stalling_consumer(dut):
+    """Bursty producers and a consumer which occasionally stalls for a long time"""
+    await traffic(dut, "stalling_consumer", Traffic(burst=8, idle=40, seed=SEED),
+                  Traffic(burst=8, idle=40, seed=SEED + 1), Traffic(stall=0.02, stall_time=100, seed=SEED + 2))
@@ -0,0 +1,61 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb.bench import BenchmarkResults, interval_stats, latency_stats
+from click_tb.handshake import reset
+from click_tb.nary import design_ports, expected
+import os
+import random
+
+# Number of tokens streamed through every design
+TOKENS = int(os.environ.get("TOKENS", 5000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("nary")
+
+
+async def setup(dut):
+    """Sources and sinks on every design, which are all reset together"""
+    ports = design_ports(dut, timestamps=True)
+    await reset(dut, *(port for srcs, sinks in ports.values() for port in srcs + sinks))
+    return ports
+
+
+def shape(srcs, sinks):
+    return {"inputs": len(srcs), "outputs": len(sinks), "width": len(srcs[0].data[0])}
+
+
+@cocotb.test()
+async def latency(dut):
+    """Forward latency of single tokens, from sending on all inputs until the token has arrived on all outputs"""
+    ports = await setup(dut)
+    rng = random.Random(SEED)
+    for name, (srcs, sinks) in ports.items():
+        width = len(srcs[0].data[0])
+        for _ in range(50):
+            inputs = [[rng.randrange(2 ** width)] for _ in srcs]
+            sends = [cocotb.start_soon(src.send(tokens[0])) for src, tokens in zip(srcs, inputs)]
+            for sink in sinks:
+                await sink.receive_expect(expected(name, inputs, width)[0])
+            for send in sends:
+                await send
+            await Timer(50, "ns")
+        # A token has arrived once it is on the last output
+        arrivals = [max(times) for times in zip(*(sink.times for sink in sinks))]
+        results.record(f"{name}_latency", **shape(srcs, sinks), **latency_stats(srcs[0].times, arrivals))
+
+
+@cocotb.test()
+async def stream(dut):
+    """Steady-state cycle time of every design with all producers and consumers running at full speed"""
+    ports = await setup(dut)
+    rng = random.Random(SEED)
+    for name, (srcs, sinks) in ports.items():
+        width = len(srcs[0].data[0])
+        inputs = [[rng.randrange(2 ** width) for _ in range(TOKENS)] for _ in srcs]
+        out = expected(name, inputs, width)
+        for src, tokens in zip(srcs, inputs):
+            cocotb.start_soon(src.send_stream(tokens))
+        receivers = [cocotb.start_soon(sink.receive_stream(out)) for sink in sinks]
+        for receiver in receivers:
+            await receiver
+        results.record(f"{name}_stream", **shape(srcs, sinks), **interval_stats(sinks[0].times))
@@ -0,0 +1,52 @@
+import cocotb
+from cocotb.triggers import Edge, Timer
+from cocotb.utils import get_sim_time
+from click_tb.bench import BenchmarkResults, interval_stats
+import os
+
+# Number of tokens passing the tap of every ring
+TOKENS = int(os.environ.get("TOKENS", 2000))
+
+results = BenchmarkResults("ring")
+
+
+async def timestamps(signal, count):
+    """Records the times of the first `count` toggles of a signal"""
+    times = []
+    for _ in range(count):
+        await Edge(signal)
+        times.append(get_sim_time("ns"))
+    return times
+
+
+@cocotb.test()
+async def token_bubble(dut):
+    """
+    Throughput of a ring of N handshake registers holding 1 to N-1 tokens. Throughput rises with the number of tokens
+    while the ring is limited by its forward latency, and falls again once it is limited by the bubbles travelling back
+    """
+    taps = []
+    while hasattr(dut, f"io_taps_{len(taps)}"):
+        taps.append(getattr(dut, f"io_taps_{len(taps)}"))
+    stages = len(taps) + 1
+
+    dut.reset.value = 1
+    dut.io_go.value = 0
+    await Timer(1, "ns")
+    dut.reset.value = 0
+    await Timer(1, "ns")
+    dut.io_go.value = 1
+
+    tasks = [cocotb.start_soon(timestamps(tap, TOKENS)) for tap in taps]
+    curve = []
+    for tokens, task in enumerate(tasks, start=1):
+        stats = interval_stats(await task)
+        curve.append(stats)
+        results.record(f"tokens_{tokens}", stages=stages, ring_tokens=tokens, occupancy=tokens / stages, **stats)
+
+    best = max(range(len(curve)), key=lambda i: curve[i]["throughput_tokens_per_ns"])
+    results.record("peak", stages=stages, ring_tokens=best + 1, occupancy=(best + 1) / stages, **curve[best])
+    peak = curve[best]["throughput_tokens_per_ns"]
+    lines = [f"{t:>4}{s['throughput_tokens_per_ns']:>10.4f} {'#' * round(40 * s['throughput_tokens_per_ns'] / peak)}"
+             for t, s in enumerate(curve, start=1)]
+    dut._log.info("Throughput (tokens/ns) of a %d-stage ring by number of tokens\n%s", stages, "\n".join(lines))
@@ -0,0 +1,70 @@
+import cocotb
+import numpy as np
+from click_tb import handshake
+from click_tb.bench import BenchmarkResults, HostTime, interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, pack, reset
+import os
+import random
+
+# Number of tokens joined by each case
+TOKENS = int(os.environ.get("TOKENS", 10000))
+SEED = int(os.environ.get("SEED", 1))
+
+results = BenchmarkResults("wide")
+
+
+async def stream(dut, case, in1, in2, expected):
+    """Joins the tokens of both inputs at full speed, recording the cycle time and the cost of simulating it"""
+    src1, src2 = HandshakeSource(dut, "io_in1"), HandshakeSource(dut, "io_in2")
+    sink = HandshakeSink(dut, "io_out", timestamps=True)
+    await reset(dut, src1, src2, sink)
+
+    width = len(dut.io_in1_data)
+    host = HostTime()
+    cocotb.start_soon(src1.send_stream(in1))
+    cocotb.start_soon(src2.send_stream(in2))
+    await sink.receive_stream(expected)
+    summary = host.summary(len(expected))
+    # Both inputs are driven and the output is sampled for every token, 4 * width bits in all
+    results.record(case, width=width, out_width=len(dut.io_out_data), **interval_stats(sink.times), **summary,
+                   host_ns_per_bit=1e3 * summary["host_us_per_token"] / (4 * width))
+
+
+def random_ints(rng, width):
+    return [rng.getrandbits(width) for _ in range(TOKENS)]
+
+
+@cocotb.test()
+async def stream_ints(dut):
+    """Wide tokens as packed ints, read and written as binary strings through the simulator interface"""
+    width = len(dut.io_in1_data)
+    rng = random.Random(SEED)
+    in1, in2 = random_ints(rng, width), random_ints(rng, width)
+    await stream(dut, "stream_ints", in1, in2, [(b << width) | a for a, b in zip(in1, in2)])
+
+
+@cocotb.test()
+async def stream_numpy(dut):
+    """Wide tokens as NumPy arrays of 64-bit words, packed into ints as they are driven"""
+    width = len(dut.io_in1_data)
+    words = -(-width // 64)
+    rng = np.random.default_rng(SEED)
+    in1, in2 = (rng.integers(0, 2 ** 64, size=(TOKENS, words), dtype=np.uint64) for _ in range(2))
+    if width % 64:
+        for a in (in1, in2):
+            a[:, -1] &= np.uint64((1 << (width % 64)) - 1)
+    expected = [(pack(b) << width) | pack(a) for a, b in zip(in1, in2)]
+    await stream(dut, "stream_numpy", list(in1), list(in2), expected)
+
+
+@cocotb.test()
+async def stream_values(dut):
+    """The tokens of stream_ints through handle.value, converting every token to and from a BinaryValue"""
+    width = len(dut.io_in1_data)
+    rng = random.Random(SEED)
+    in1, in2 = random_ints(rng, width), random_ints(rng, width)
+    fast, handshake.FAST_HANDLES = handshake.FAST_HANDLES, False
+    try:
+        await stream(dut, "stream_values", in1, in2, [(b << width) | a for a, b in zip(in1, in2)])
+    finally:
+        handshake.FAST_HANDLES = fast
@@ -0,0 +1,3 @@
+"""
+Shared Python tooling for the cocotb testbenches of the click library.
+"""
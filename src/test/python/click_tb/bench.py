@@ -0,0 +1,146 @@
+"""
+Helpers for the benchmarks in ``src/test/python/benchmarks``.
+
+A benchmark module keeps a :class:`BenchmarkResults` object, and each of its cocotb tests records the
+metrics of one case in it. After every case, the results are written to ``$BENCH_DIR/<name>.json``
+along with the ``ClickConfig`` the design was generated with (``$GEN_DIR/ClickConfig.json``).
+All times are in ns, throughputs in tokens per ns.
+
+Running this module summarizes all results in a bench directory::
+
+    python3 -m click_tb.bench [BENCH_DIR]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+
+def bench_dir():
+    """The directory benchmark results are written to"""
+    return os.environ.get("BENCH_DIR", "bench")
+
+
+def click_config():
+    """Returns the ClickConfig the design under test was generated with, or None if it is unknown"""
+    path = os.path.join(os.environ.get("GEN_DIR", "gen"), "ClickConfig.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def interval_stats(times, warmup=0.1):
+    """
+    Computes the steady-state cycle time from the times at which consecutive tokens passed a port.
+    :param times: Event times in ns
+    :param warmup: Fraction of the events at the start which are ignored, as the pipeline fills up
+    :return: Dict with the mean, median, minimum and maximum cycle time and the resulting throughput
+    """
+    t = times[int(len(times) * warmup):]
+    if len(t) < 2:
+        raise ValueError("At least two events are required to compute a cycle time")
+    intervals = [b - a for a, b in zip(t, t[1:])]
+    mean = (t[-1] - t[0]) / len(intervals)
+    return {
+        "tokens": len(times),
+        "cycle_time_ns": mean,
+        "cycle_time_median_ns": statistics.median(intervals),
+        "cycle_time_min_ns": min(intervals),
+        "cycle_time_max_ns": max(intervals),
+        "throughput_tokens_per_ns": 1 / mean,
+    }
+
+
+def latency_stats(sent, received):
+    """Computes the forward latency of each token from the times it was sent and received"""
+    latencies = [r - s for s, r in zip(sent, received)]
+    return {
+        "latency_ns": statistics.mean(latencies),
+        "latency_min_ns": min(latencies),
+        "latency_max_ns": max(latencies),
+    }
+
+
+class HostTime:
+    """
+    Measures the wall-clock and CPU time the host spends simulating a case, from its creation until :meth:`summary`.
+    Per token, this is the cost of a handshake in the simulator and the Python testbench together
+    """
+
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def summary(self, tokens):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        return {
+            "host_time_s": wall,
+            "host_us_per_token": 1e6 * wall / tokens,
+            "host_cpu_us_per_token": 1e6 * cpu / tokens,
+        }
+
+
+class BenchmarkResults:
+    """
+    Collects the results of the cases of one benchmark and writes them to ``$BENCH_DIR/<name>.json``
+    :param name: Name of the benchmark
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.cases = {}
+
+    @property
+    def path(self):
+        return os.path.join(bench_dir(), f"{self.name}.json")
+
+    def record(self, case, **metrics):
+        """Records the metrics of a single case and rewrites the results file"""
+        self.cases[case] = metrics
+        self.write()
+
+    def write(self):
+        os.makedirs(bench_dir(), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({
+                "benchmark": self.name,
+                "toplevel": os.environ.get("TOPLEVEL"),
+                "simulator": os.environ.get("SIM"),
+                "config": click_config(),
+                "cases": self.cases,
+            }, f, indent=2)
+
+
+def load_results(directory):
+    """Loads all benchmark results files in a directory"""
+    results = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json") and name != "summary.json":
+            with open(os.path.join(directory, name)) as f:
+                results.append(json.load(f))
+    return results
+
+
+def summarize(directory):
+    """Prints the main metrics of all benchmark results in a directory and writes them to summary.json"""
+    rows = []
+    for result in load_results(directory):
+        for case, metrics in result["cases"].items():
+            rows.append({"benchmark": result["benchmark"], "case": case, **metrics})
+
+    def fmt(row, key, width, spec=""):
+        return format(row[key], f">{width}{spec}") if key in row else format("-", f">{width}")
+
+    print(f"{'BENCHMARK':<12}{'CASE':<24}{'TOKENS':>8}{'CYCLE (ns)':>12}{'TOKENS/ns':>11}{'LATENCY (ns)':>14}")
+    for row in rows:
+        print(f"{row['benchmark']:<12}{row['case']:<24}{fmt(row, 'tokens', 8)}{fmt(row, 'cycle_time_ns', 12, '.2f')}"
+              f"{fmt(row, 'throughput_tokens_per_ns', 11, '.4f')}{fmt(row, 'latency_ns', 14, '.2f')}")
+    with open(os.path.join(directory, "summary.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else bench_dir())
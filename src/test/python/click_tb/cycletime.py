@@ -0,0 +1,538 @@
+"""
+Static cycle-time analysis of click-element circuits.
+
+``Generate`` writes the CHIRRTL of every target to ``gen/<target>.fir``. This module reads it as a netlist of click
+components (``HandshakeRegister``, ``RegFork``, ``JoinReg``, ``JoinRegFork``, ``Fork``, ``Join``, ``FunctionBlock``,
+``Merge``, ``Multiplexer`` and ``Demultiplexer``), flattening any other modules such as ``Adder``. For every component
+it finds the delay of its simulation delay elements, the initial phase of its outputs (``ro``) and the channels
+connecting it to other components, including the delay elements placed on those channels.
+
+From the netlist it builds a timed marked graph with one node for the request and one for the acknowledge of every
+token on a channel, and one for the click of every register. An edge ``u -> v`` with delay ``d`` and ``m`` tokens
+says that event ``k`` of ``v`` happens at least ``d`` ns after event ``k - m`` of ``u``. The steady-state cycle time
+is the maximum ratio of delay to tokens over all cycles of the graph, and the cycle reaching it is the critical
+cycle. Ports of the top module are connected to a producer or consumer responding immediately.
+
+``Merge``, ``Multiplexer`` and ``Demultiplexer`` steer tokens depending on their data. The analysis is run for every
+combination of routes through them (a *mode*), such as the loop of ``GCD`` with ``MX0=in2`` and ``DX0=out2``,
+or for the routes given with ``--route``::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.cycletime gen/Fib.fir
+    PYTHONPATH=src/test/python python3 -m click_tb.cycletime gen/GCD.fir --route MX0=in2 --route DX0=out2
+
+All delays are in ns, the unit of the simulation delay elements. The design must be generated with
+``SIMULATION=true`` (the default), as synthesis delay elements carry no delay value.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import math
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Input and output channels of the click components
+PORTS = {
+    "HandshakeRegister": (("in",), ("out",)),
+    "RegFork": (("in",), ("out1", "out2")),
+    "JoinReg": (("in1", "in2"), ("out",)),
+    "JoinRegFork": (("in1", "in2"), ("out1", "out2")),
+    "Fork": (("in",), ("out1", "out2")),
+    "Join": (("in1", "in2"), ("out",)),
+    "FunctionBlock": (("in",), ("out",)),
+    "Merge": (("in1", "in2"), ("out",)),
+    "Multiplexer": (("in1", "in2", "sel"), ("out",)),
+    "Demultiplexer": (("in", "sel"), ("out1", "out2")),
+}
+# Components steering tokens, and the ports they steer between
+CHOICES = {"Merge": ("in1", "in2"), "Multiplexer": ("in1", "in2"), "Demultiplexer": ("out1", "out2")}
+DELAY_ELEMENT = re.compile(r"DelayElementSim_(\d+)")
+MAX_MODES = 4096
+
+
+def kind_of(module: str) -> Optional[str]:
+    """The click component a module is an instance of, ignoring the ``_<n>`` suffixes of its variants"""
+    base = re.sub(r"(_\d+)+$", "", module)
+    return base if base in PORTS else None
+
+
+def is_input(port: str) -> bool:
+    """Whether a channel port of a component or design receives tokens. Output ports are named ``out*``"""
+    return not port.startswith("out")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# CHIRRTL
+# ---------------------------------------------------------------------------------------------------------------------
+
+@dataclass
+class FirModule:
+    name: str
+    external: bool = False
+    defname: Optional[str] = None
+    instances: Dict[str, str] = field(default_factory=dict)
+    nodes: Dict[str, str] = field(default_factory=dict)
+    regs: Dict[str, Optional[str]] = field(default_factory=dict)
+    connects: List[Tuple[str, str]] = field(default_factory=list)
+
+    def driver(self, sig: str) -> Optional[str]:
+        """The expression last connected to a signal, also through connections of the bundles holding it"""
+        for sink, source in reversed(self.connects):
+            if sig == sink:
+                return source
+            if sig.startswith(sink + "."):
+                return source + sig[len(sink):]
+            # Bundles connect in both directions, and only signals driven in this module are looked up
+            if sig.startswith(source + ".") and "." in source:
+                return sink + sig[len(source):]
+        return None
+
+
+def split_args(text: str) -> List[str]:
+    """Splits a comma-separated argument list at the outermost level"""
+    args, depth, start = [], 0, 0
+    for i, c in enumerate(text):
+        if c in "(<":
+            depth += 1
+        elif c in ")>":
+            depth -= 1
+        elif c == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return [a for a in args if a]
+
+
+def parse_firrtl(text: str) -> Tuple[str, Dict[str, FirModule]]:
+    """Parses the modules of a CHIRRTL circuit, keeping the statements the analysis needs"""
+    top, modules, mod, pending_reg = None, {}, None, None
+    for line in text.splitlines():
+        line = re.sub(r"\s*@\[.*\]\s*$", "", line).strip()
+        if not line:
+            continue
+        m = re.match(r"circuit (\w+) :", line)
+        if m:
+            top = m.group(1)
+            continue
+        m = re.match(r"(ext)?module (\w+) :", line)
+        if m:
+            mod = modules[m.group(2)] = FirModule(m.group(2), external=bool(m.group(1)))
+            continue
+        if mod is None:
+            continue
+        if m := re.match(r"defname = (\w+)", line):
+            mod.defname = m.group(1)
+            continue
+        if pending_reg and line.startswith("reset =>"):
+            mod.regs[pending_reg] = split_args(line[len("reset =>"):].strip()[1:-1])[1]
+            pending_reg = None
+            continue
+        pending_reg = None
+        if m := re.match(r"inst (\w+) of (\w+)", line):
+            mod.instances[m.group(1)] = m.group(2)
+        elif m := re.match(r"node (\w+) = (.+)$", line):
+            mod.nodes[m.group(1)] = m.group(2)
+        elif m := re.match(r"regreset (\w+) : [^,]+,(.+)$", line):
+            mod.regs[m.group(1)] = split_args(m.group(2))[2]
+        elif m := re.match(r"reg (\w+) : .*with :\s*(.*)$", line):
+            mod.regs[m.group(1)] = None
+            rest = m.group(2).strip().lstrip("(").strip()
+            if rest.startswith("reset =>"):
+                mod.regs[m.group(1)] = split_args(rest[len("reset =>"):].strip().rstrip(")")[1:])[1]
+            else:
+                pending_reg = m.group(1)
+        elif m := re.match(r"reg (\w+) :", line):
+            mod.regs[m.group(1)] = None
+        elif m := re.match(r"(\S+) <[=-] (.+)$", line):
+            mod.connects.append((m.group(1), m.group(2)))
+        elif m := re.match(r"connect (\S+), (.+)$", line):
+            mod.connects.append((m.group(1), m.group(2)))
+    if top is None:
+        raise ValueError("Not a FIRRTL circuit")
+    return top, modules
+
+
+def refs_in(expr: str) -> List[str]:
+    """The signals referenced by an expression, in order"""
+    expr = re.sub(r'"[^"]*"', "", expr)
+    refs = []
+    for m in re.finditer(r"[A-Za-z_][\w$]*(?:\.[A-Za-z_][\w$]*)*", expr):
+        after = expr[m.end():m.end() + 1]
+        if after not in ("(", "<"):
+            refs.append(m.group(0))
+    return refs
+
+
+def parse_literal(expr: str) -> Optional[int]:
+    m = re.match(r'[SU]Int<\d*>\("?(h|b|o)?([0-9a-fA-F]+)"?\)$', expr)
+    if not m:
+        return int(expr) if expr.isdigit() else None
+    return int(m.group(2), {"h": 16, "b": 2, "o": 8, None: 10}[m.group(1)])
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Netlist
+# ---------------------------------------------------------------------------------------------------------------------
+
+Endpoint = Tuple[Tuple[str, ...], str]  # Instance path of a component, () for the environment, and a channel port
+
+
+@dataclass
+class Component:
+    path: Tuple[str, ...]
+    kind: str
+    module: str
+    delay: int
+    ro: Dict[str, int]
+
+    @property
+    def name(self):
+        return ".".join(self.path)
+
+
+@dataclass
+class Channel:
+    producer: Endpoint
+    consumer: Endpoint
+    delay: int
+
+    @property
+    def name(self):
+        """Named after the port producing its tokens, as in the traces of the simulations"""
+        path, port = self.producer
+        return f"{'.'.join(path)}.io_{port}" if path else f"io_{port}"
+
+
+class Netlist:
+    """The click components of a circuit and the channels between them"""
+
+    def __init__(self, text: str):
+        self.top, self.modules = parse_firrtl(text)
+        self.components: Dict[Tuple[str, ...], Component] = {}
+        self._collect((), self.modules[self.top])
+        self.channels = self._connect()
+
+    @classmethod
+    def load(cls, path: str) -> "Netlist":
+        with open(path) as f:
+            return cls(f.read())
+
+    def _module_at(self, path):
+        mod = self.modules[self.top]
+        for inst in path:
+            mod = self.modules[mod.instances[inst]]
+        return mod
+
+    def delay_element(self, module: str) -> Optional[int]:
+        """The delay of a simulation delay element, or None if the module is something else"""
+        mod = self.modules.get(module)
+        m = DELAY_ELEMENT.fullmatch(mod.defname or mod.name) if mod is not None and mod.external else None
+        return int(m.group(1)) if m else None
+
+    def _delay(self, mod: FirModule) -> int:
+        """Total delay of the delay elements in a module and its submodules"""
+        delay = self.delay_element(mod.name)
+        if delay is not None:
+            return delay
+        return sum(self._delay(self.modules[i]) for i in mod.instances.values() if i in self.modules)
+
+    def _collect(self, path, mod):
+        for inst, name in mod.instances.items():
+            sub = self.modules.get(name)
+            kind = kind_of(name)
+            if kind:
+                ro = {p: self.value(sub, f"io.{p}.req") for p in PORTS[kind][1]}
+                self.components[path + (inst,)] = Component(path + (inst,), kind, name, self._delay(sub), ro)
+            elif sub is not None and not sub.external:
+                self._collect(path + (inst,), sub)
+
+    # Initial values -----------------------------------------------------------------------------------------------
+
+    def value(self, mod: FirModule, sig: str, depth=0) -> int:
+        """Value of a signal of a module right after reset. Inputs of the module are taken to be 0"""
+        if depth > 100:
+            return 0
+        if sig in mod.regs:
+            return self.evaluate(mod, mod.regs[sig], depth + 1) if mod.regs[sig] else 0
+        if sig in mod.nodes:
+            return self.evaluate(mod, mod.nodes[sig], depth + 1)
+        parts = sig.split(".")
+        if parts[0] in mod.instances and len(parts) > 1:
+            sub = self.modules.get(mod.instances[parts[0]])
+            if self.delay_element(mod.instances[parts[0]]) is not None and parts[1] == "reqOut":
+                # A delay element passes on its input once the delay has passed
+                return self.value(mod, f"{parts[0]}.reqIn", depth + 1)
+            port = ".".join(parts[1:])
+            if sub is not None and not sub.external and (sub.driver(port) is not None or port in sub.nodes):
+                # An output of the instance
+                return self.value(sub, port, depth + 1)
+            source = mod.driver(sig)
+            return self.evaluate(mod, source, depth + 1) if source is not None else 0
+        source = mod.driver(sig)
+        return self.evaluate(mod, source, depth + 1) if source is not None else 0
+
+    def evaluate(self, mod: FirModule, expr: str, depth=0) -> int:
+        expr = expr.strip()
+        literal = parse_literal(expr)
+        if literal is not None:
+            return literal
+        m = re.match(r"(\w+)\((.*)\)$", expr)
+        if not m:
+            return self.value(mod, expr, depth)
+        op, args = m.group(1), split_args(m.group(2))
+        vals = lambda: [self.evaluate(mod, a, depth) for a in args]
+        if op == "not":
+            return 1 - (vals()[0] & 1)
+        if op in ("and", "or", "xor", "eq", "neq"):
+            a, b = vals()[:2]
+            return {"and": a & b, "or": a | b, "xor": a ^ b, "eq": int(a == b), "neq": int(a != b)}[op]
+        if op == "mux":
+            c = self.evaluate(mod, args[0], depth)
+            return self.evaluate(mod, args[1] if c else args[2], depth)
+        if op == "bits":
+            hi, lo = int(args[1]), int(args[2])
+            return (self.evaluate(mod, args[0], depth) >> lo) & ((1 << (hi - lo + 1)) - 1)
+        # Casts and anything else: the value of the first argument
+        return self.evaluate(mod, args[0], depth) if args else 0
+
+    # Connections --------------------------------------------------------------------------------------------------
+
+    def _trace(self, path, sig, delay=0, depth=0) -> Optional[Tuple[Endpoint, int]]:
+        """
+        Follows a request signal back to the port of the component or the top module driving it
+        :param path: Instance path of the module holding the signal
+        :return: The producing endpoint and the delay of the delay elements passed, or None if it is not driven
+        """
+        if depth > 200:
+            return None
+        mod = self._module_at(path)
+        parts = sig.split(".")
+        if parts[0] in mod.instances and len(parts) > 1:
+            inst, name = parts[0], mod.instances[parts[0]]
+            delay_element = self.delay_element(name)
+            if delay_element is not None and parts[1] == "reqOut":
+                return self._trace(path, f"{inst}.reqIn", delay + delay_element, depth + 1)
+            if parts[1] == "io" and len(parts) > 2 and not is_input(parts[2]):
+                if path + (inst,) in self.components:
+                    return (path + (inst,), parts[2]), delay
+                # The output of a module holding other components
+                return self._trace(path + (inst,), ".".join(parts[1:]), delay, depth + 1)
+        elif parts[0] == "io" and len(parts) > 2 and is_input(parts[1]):
+            if not path:
+                return ((), parts[1]), delay
+            return self._trace(path[:-1], f"{path[-1]}.{sig}", delay, depth + 1)
+        source = mod.nodes.get(sig) or mod.driver(sig)
+        if source is None:
+            return None
+        refs = refs_in(source)
+        # Of the signals combined by some logic, the request signals are followed first
+        for ref in sorted(refs, key=lambda r: not r.endswith(".req")):
+            found = self._trace(path, ref, delay, depth + 1)
+            if found is not None:
+                return found
+        return None
+
+    def _connect(self) -> List[Channel]:
+        channels = []
+        consumers = [(c.path, p) for c in self.components.values() for p in PORTS[c.kind][0]]
+        top = self.modules[self.top]
+        # Output channels of the top module, as seen in its connections
+        signals = [ref for sink, source in top.connects for ref in [sink] + refs_in(source)]
+        outputs = sorted({s.split(".")[1] for s in signals if s.startswith("io.out")})
+        consumers += [((), p) for p in outputs]
+        for path, port in consumers:
+            sig = f"io.{port}.req" if not path else f"{path[-1]}.io.{port}.req"
+            found = self._trace(path[:-1], sig)
+            if found is not None:
+                producer, delay = found
+                channels.append(Channel(producer, (path, port), delay))
+        return channels
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Timed marked graph
+# ---------------------------------------------------------------------------------------------------------------------
+
+@dataclass
+class Edge:
+    src: str
+    dst: str
+    delay: float
+    tokens: int
+
+
+def build_graph(net: Netlist, routes: Dict[str, str]) -> List[Edge]:
+    """
+    Builds the timed marked graph of a netlist, with the given route through every steering component
+    :param routes: The port each steering component passes tokens through, by component name
+    """
+    edges = []
+    inputs, outputs = {}, {}
+    for ch in net.channels:
+        name = ch.name
+        outputs[ch.producer] = (name, ch.delay)
+        inputs[ch.consumer] = (name, ch.delay)
+        if not ch.producer[0]:
+            # The environment sends the next token as soon as the last one was acknowledged
+            edges.append(Edge(f"{name} ack", f"{name} req", 0, 1))
+        if not ch.consumer[0]:
+            # The environment acknowledges tokens immediately
+            edges.append(Edge(f"{name} req", f"{name} ack", ch.delay, 0))
+
+    for comp in net.components.values():
+        ins = {p: inputs[(comp.path, p)] for p in PORTS[comp.kind][0] if (comp.path, p) in inputs}
+        outs = {p: outputs[(comp.path, p)][0] for p in PORTS[comp.kind][1] if (comp.path, p) in outputs}
+        d = comp.delay
+        if comp.kind in ("HandshakeRegister", "RegFork", "JoinReg", "JoinRegFork"):
+            click = f"{comp.name} click"
+            # The HandshakeRegister delays its output request, the others the click itself
+            d_click, d_out = (0, d) if comp.kind == "HandshakeRegister" else (d, 0)
+            for name, wire in ins.values():
+                edges.append(Edge(f"{name} req", click, wire + d_click, 0))
+                edges.append(Edge(click, f"{name} ack", 0, 0))
+            for port, name in outs.items():
+                ro = comp.ro.get(port, 0) & 1
+                edges.append(Edge(f"{name} ack", click, d_click, 1 - ro))
+                edges.append(Edge(click, f"{name} req", d_out, ro))
+            continue
+        if comp.kind in CHOICES:
+            route = routes[comp.name]
+            if comp.kind == "Demultiplexer":
+                outs = {route: outs[route]} if route in outs else {}
+            else:
+                ins = {p: v for p, v in ins.items() if p in (route, "sel")}
+        # Pass-through components: requests are forwarded once all inputs have one, acknowledges once all outputs
+        # have one
+        for name_in, wire in ins.values():
+            for name_out in outs.values():
+                edges.append(Edge(f"{name_in} req", f"{name_out} req", wire + d, 0))
+                edges.append(Edge(f"{name_out} ack", f"{name_in} ack", 0, 0))
+    return edges
+
+
+def positive_cycle(nodes: Sequence[str], edges: Sequence[Edge], ratio: float) -> Optional[List[Edge]]:
+    """Returns a cycle whose delay exceeds `ratio` times its tokens, using Bellman-Ford on longest paths"""
+    dist = {n: 0.0 for n in nodes}
+    pred: Dict[str, Edge] = {}
+    changed = None
+    for _ in range(len(nodes)):
+        changed = None
+        for e in edges:
+            w = dist[e.src] + e.delay - ratio * e.tokens
+            if w > dist[e.dst] + 1e-9:
+                dist[e.dst] = w
+                pred[e.dst] = e
+                changed = e.dst
+        if changed is None:
+            return None
+    # Walk back far enough to be on the cycle, then collect it
+    node = changed
+    for _ in range(len(nodes)):
+        node = pred[node].src
+    cycle, n = [], node
+    while True:
+        e = pred[n]
+        cycle.append(e)
+        n = e.src
+        if n == node:
+            break
+    return cycle[::-1]
+
+
+def max_cycle_ratio(edges: Sequence[Edge]) -> Tuple[float, Optional[List[Edge]]]:
+    """
+    The maximum ratio of delay to tokens over all cycles, and the cycle reaching it.
+    A cycle with delay but no tokens can never complete, and gives an infinite ratio
+    """
+    nodes = sorted({e.src for e in edges} | {e.dst for e in edges})
+    ratio, best = 0.0, None
+    while True:
+        cycle = positive_cycle(nodes, edges, ratio)
+        if cycle is None:
+            return ratio, best
+        delay, tokens = sum(e.delay for e in cycle), sum(e.tokens for e in cycle)
+        if tokens == 0:
+            return math.inf, cycle
+        if delay / tokens <= ratio + 1e-9:
+            return ratio, best
+        ratio, best = delay / tokens, cycle
+
+
+def modes(net: Netlist, fixed: Dict[str, str]) -> List[Dict[str, str]]:
+    """Every combination of routes through the steering components not given in `fixed`"""
+    free = sorted(c.name for c in net.components.values() if c.kind in CHOICES and c.name not in fixed)
+    choices = [CHOICES[next(c.kind for c in net.components.values() if c.name == n)] for n in free]
+    if math.prod(len(c) for c in choices) > MAX_MODES:
+        raise ValueError(f"Too many routes through {', '.join(free)}, fix some of them with --route")
+    return [{**fixed, **dict(zip(free, combo))} for combo in itertools.product(*choices)]
+
+
+def analyze(path: str, routes: Optional[Dict[str, str]] = None) -> List[dict]:
+    """
+    Computes the steady-state cycle time of a generated design in every mode, slowest first
+    :param path: The ``.fir`` file written by ``Generate``
+    :param routes: Routes through steering components which are fixed, e.g. ``{"MX0": "in2"}``
+    """
+    net = Netlist.load(path)
+    for name in routes or {}:
+        if not any(c.name == name and c.kind in CHOICES for c in net.components.values()):
+            raise ValueError(f"{name} is not a Merge, Multiplexer or Demultiplexer of {net.top}")
+    results = []
+    for mode in modes(net, routes or {}):
+        ratio, cycle = max_cycle_ratio(build_graph(net, mode))
+        results.append({
+            "design": net.top,
+            "routes": mode,
+            "cycle_time_ns": ratio,
+            "throughput_tokens_per_ns": 1 / ratio if 0 < ratio < math.inf else (math.inf if ratio == 0 else 0.0),
+            "deadlock": ratio == math.inf,
+            "tokens": sum(e.tokens for e in cycle) if cycle else 0,
+            "critical_cycle": [{"event": e.dst, "delay_ns": e.delay, "tokens": e.tokens} for e in cycle or []],
+        })
+    return sorted(results, key=lambda r: -r["cycle_time_ns"])
+
+
+def report(result: dict) -> str:
+    routes = " ".join(f"{k}={v}" for k, v in sorted(result["routes"].items()))
+    head = f"{result['design']}{' [' + routes + ']' if routes else ''}: "
+    if result["deadlock"]:
+        lines = [head + "deadlock, a cycle of events holds no token"]
+    else:
+        lines = [head + f"cycle time {result['cycle_time_ns']:.3f} ns, "
+                        f"{result['throughput_tokens_per_ns']:.4f} tokens/ns, {result['tokens']} token(s) on the "
+                        f"critical cycle"]
+    for step in result["critical_cycle"]:
+        lines.append(f"  {step['delay_ns']:>8.3f} ns {'*' if step['tokens'] else ' '} {step['event']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compute the steady-state cycle time of generated designs")
+    parser.add_argument("netlists", nargs="+", help="CHIRRTL files written by Generate, e.g. gen/Fib.fir")
+    parser.add_argument("--route", action="append", default=[],
+                        help="Fix the route through a Merge, Multiplexer or Demultiplexer, e.g. MX0=in2")
+    parser.add_argument("--all", action="store_true", help="Report every mode, not only the slowest one")
+    parser.add_argument("--json", help="Write all results to this file")
+    args = parser.parse_args(argv)
+
+    routes = dict(r.split("=", 1) for r in args.route)
+    everything = []
+    for path in args.netlists:
+        try:
+            results = analyze(path, routes)
+        except (OSError, ValueError) as e:
+            parser.error(f"{path}: {e}")
+        everything += [{"netlist": path, **r} for r in results]
+        for result in results if args.all else results[:1]:
+            print(report(result))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(everything, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+Drivers and monitors for two-phase bundled-data handshake ports, mirroring the
+``HandshakeDriver`` used by the ChiselTest specs (src/test/scala/click/HandshakeTesting.scala).
+
+A port is the group of signals generated for a ``ReqAck`` bundle, identified by their common prefix.
+For the prefix ``io_in``, these are ``io_in_req``, ``io_in_ack`` and either ``io_in_data`` or, for
+bundles such as ``Bundle2``, one signal per field (``io_in_data_a``, ``io_in_data_b``).
+
+Tokens are plain ints for ports with a single data signal. For bundles, tokens are tuples holding
+one int per field, ordered by field name (``(a, b)`` for a ``Bundle2``). Wide payloads may also be driven as
+NumPy arrays of 64-bit words, least significant word first (see :func:`pack` and :func:`unpack`).
+
+The handles of a port are resolved once, and signals are read and written through the simulator interface
+directly, skipping the ``BinaryValue`` and checks of every ``handle.value`` access. Signals of up to 31 bits are
+transferred as ints, wider signals as binary strings converted with ``int(s, 2)`` and ``format``, whose cost grows
+with the width far slower than that of a ``BinaryValue``. On long token streams this is most of the time spent in
+Python per handshake. Set ``FAST_HANDLES=0`` to go through ``handle.value`` instead, e.g. to compare the two.
+The simulator interface is reached through internals of cocotb 1.x. Where they are missing, signals are accessed
+through ``handle.value`` as well.
+"""
+import os
+
+import cocotb
+import numpy as np
+from cocotb.queue import Queue
+from cocotb.triggers import Edge, ReadOnly, Timer
+from cocotb.utils import get_sim_time
+
+FAST_HANDLES = os.environ.get("FAST_HANDLES", "1") != "0"
+
+# Unresolved bits of wide signals are read as 0, like those of the narrow signals read as ints
+_UNRESOLVED = str.maketrans("xXzZuUwW-lLhH", "0000000000011")
+
+
+async def reset(dut, *ports, duration=1):
+    """
+    Holds the DUT in reset for `duration` ns while resetting the given sources and sinks,
+    then waits another `duration` ns after releasing it
+    """
+    dut.reset.value = 1
+    for port in ports:
+        port.reset()
+    await Timer(duration, "ns")
+    dut.reset.value = 0
+    await Timer(duration, "ns")
+
+
+def data_handles(dut, prefix):
+    """
+    Returns the data handles of the port with the given prefix, ordered by name.
+    Ports without data (or with zero-width data) return an empty list
+    """
+    name = f"{prefix}_data"
+    if hasattr(dut, name):
+        return [getattr(dut, name)]
+    fields = [h for h in dut if h._name.startswith(name + "_")]
+    return sorted(fields, key=lambda h: h._name) if fields else []
+
+
+def _gpi(handle, *methods):
+    """
+    The simulator object of a signal if ``FAST_HANDLES`` is set and it has the given methods, else None.
+    It is an internal of cocotb 1.x, so signals are accessed through ``handle.value`` on other versions
+    """
+    gpi = getattr(handle, "_handle", None)
+    return gpi if FAST_HANDLES and gpi is not None and all(hasattr(gpi, m) for m in methods) else None
+
+
+def reader(handle):
+    """
+    Returns a function reading the value of a signal as an int.
+    With ``FAST_HANDLES``, unresolved bits (X, Z) of signals read this way are read as 0
+    """
+    gpi = _gpi(handle, "get_signal_val_long", "get_signal_val_binstr")
+    if gpi is None:
+        return lambda: int(handle.value)
+    if len(handle) < 32:
+        return gpi.get_signal_val_long
+    get_value = gpi.get_signal_val_binstr
+
+    def read():
+        s = get_value()
+        try:
+            return int(s, 2)
+        except ValueError:
+            return int(s.translate(_UNRESOLVED), 2)
+    return read
+
+
+def bit_reader(handle):
+    """
+    Returns a function reading a one-bit signal as 0 or 1, or None while it is unresolved (X, Z).
+    With ``FAST_HANDLES``, it is read through the simulator interface like the signals read by :func:`reader`
+    """
+    gpi = _gpi(handle, "get_signal_val_binstr")
+    if gpi is None:
+        def read():
+            value = handle.value
+            return int(value) if value.is_resolvable else None
+        return read
+    get_value, levels = gpi.get_signal_val_binstr, {"0": 0, "1": 1}
+    return lambda: levels.get(get_value())
+
+
+async def toggles(handle):
+    """
+    Yields the new value of a one-bit signal, such as a request or acknowledge, every time it toggles.
+    Unresolved values are skipped, and the first resolved value (e.g. when leaving reset) is not a toggle
+    """
+    read = bit_reader(handle)
+    last = read()
+    while True:
+        await Edge(handle)
+        value = read()
+        if value is None:
+            continue
+        toggled = last is not None and value != last
+        last = value
+        if toggled:
+            yield value
+
+
+def writer(handle):
+    """Returns a function driving an int onto a signal, taking effect like an assignment to ``handle.value``"""
+    n = len(handle)
+    gpi = _gpi(handle, "set_signal_val_int", "set_signal_val_binstr")
+    schedule = getattr(getattr(cocotb, "scheduler", None), "_schedule_write", None)
+    if gpi is None or schedule is None:
+        return lambda v: setattr(handle, "value", v)
+    low, high = -(1 << (n - 1)), (1 << n) - 1
+
+    def check(v):
+        if not low <= v <= high:
+            raise OverflowError(f"Int value ({v}) out of range for assignment of {n}-bit signal ({handle._name})")
+
+    if n < 32:
+        set_value = gpi.set_signal_val_int
+
+        def write(v):
+            check(v)
+            schedule(handle, set_value, 0, v)
+    else:
+        set_value, mask, fmt = gpi.set_signal_val_binstr, high, f"0{n}b"
+
+        def write(v):
+            check(v)
+            schedule(handle, set_value, 0, format(v & mask, fmt))
+    return write
+
+
+def pack(words):
+    """Packs a NumPy array of unsigned 64-bit words, least significant word first, into an int"""
+    return int.from_bytes(np.ascontiguousarray(words, dtype="<u8").tobytes(), "little")
+
+
+def unpack(value, width):
+    """Splits a `width`-bit int into a NumPy array of unsigned 64-bit words, least significant word first"""
+    return np.frombuffer(value.to_bytes(8 * -(-width // 64), "little"), dtype="<u8")
+
+
+def as_int(value):
+    """Returns the value of a token or token field as an int, packing NumPy arrays of words with :func:`pack`"""
+    return pack(value) if isinstance(value, np.ndarray) else value
+
+
+class HandshakePort:
+    """The handles of a single handshake port"""
+
+    def __init__(self, dut, prefix):
+        self.dut = dut
+        self.prefix = prefix
+        self.req = getattr(dut, f"{prefix}_req")
+        self.ack = getattr(dut, f"{prefix}_ack")
+        self.data = data_handles(dut, prefix)
+        self.read_req, self.read_ack = reader(self.req), reader(self.ack)
+        self.write_req, self.write_ack = writer(self.req), writer(self.ack)
+        self._read_data = [reader(d) for d in self.data]
+        self._write_data = [writer(d) for d in self.data]
+
+    def sample(self):
+        """Returns the token currently on the data signals of the port"""
+        if len(self._read_data) == 1:
+            return self._read_data[0]()
+        return tuple(read() for read in self._read_data)
+
+    def drive(self, token):
+        """Drives a token onto the data signals of the port"""
+        if len(self._write_data) == 1:
+            self._write_data[0](as_int(token))
+        else:
+            for write, v in zip(self._write_data, token):
+                write(as_int(v))
+
+    def state(self):
+        """Returns the request, acknowledge and token currently on the port"""
+        return self.read_req(), self.read_ack(), self.sample()
+
+
+class PortGroup:
+    """
+    Several handshake ports of a DUT, e.g. the ``in`` and ``out`` ports of a ``HandshakeIO``, resolved once.
+    Ports are reached by prefix, ``group["io_in"]``, and the whole group is sampled or driven in one call
+    :param dut: The DUT handle
+    :param prefixes: Prefixes of the ports. If none are given, all ports of the DUT are included
+    """
+
+    def __init__(self, dut, *prefixes):
+        self.dut = dut
+        self.ports = {p: HandshakePort(dut, p) for p in prefixes or port_prefixes(dut)}
+
+    def __getitem__(self, prefix):
+        return self.ports[prefix]
+
+    def __iter__(self):
+        return iter(self.ports.values())
+
+    def sample(self):
+        """Returns the (req, ack, token) currently on each port, by prefix"""
+        return {p: port.state() for p, port in self.ports.items()}
+
+    def drive(self, tokens):
+        """Drives tokens onto the data signals of several ports, given as a dict from prefix to token"""
+        for p, token in tokens.items():
+            self.ports[p].drive(token)
+
+
+def port_prefixes(dut):
+    """Returns the prefixes of all handshake ports of a DUT, i.e. signals with both a ``_req`` and an ``_ack``"""
+    names = {h._name for h in dut}
+    return sorted(n[:-4] for n in names if n.endswith("_req") and n[:-4] + "_ack" in names)
+
+
+class HandshakeSource(HandshakePort):
+    """
+    Drives tokens into an input port of the DUT.
+    :param dut: The DUT handle
+    :param prefix: Prefix of the port's signals, e.g. ``io_in``
+    :param gap: Time in ns to wait after a token has been acknowledged, before sending the next one.
+                May be a function returning the time for each token, such as a :class:`click_tb.traffic.Traffic`
+    :param timestamps: Whether to record the time (ns) each token is sent at in :attr:`times`
+    """
+
+    def __init__(self, dut, prefix, gap=0, timestamps=False):
+        super().__init__(dut, prefix)
+        self.gap = gap
+        self.phase = 0
+        self.count = 0
+        self.times = [] if timestamps else None
+
+    def reset(self, phase=0):
+        """Drives the request signal to `phase`. Must be called while the DUT is being reset"""
+        self.phase = phase
+        self.req.value = phase
+
+    async def send(self, token=None):
+        """Sends one token, returning once the DUT has acknowledged it"""
+        if token is not None:
+            self.drive(token)
+        self.phase ^= 1
+        self.write_req(self.phase)
+        if self.times is not None:
+            self.times.append(get_sim_time("ns"))
+        while self.read_ack() != self.phase:
+            await Edge(self.ack)
+        self.count += 1
+        gap = self.gap() if callable(self.gap) else self.gap
+        if gap:
+            await Timer(gap, "ns", round_mode="round")
+
+    async def send_stream(self, tokens):
+        """Sends all tokens back-to-back, returning once the last one has been acknowledged"""
+        for token in tokens:
+            await self.send(token)
+
+
+class HandshakeSink(HandshakePort):
+    """
+    Consumes tokens from an output port of the DUT.
+    :param dut: The DUT handle
+    :param prefix: Prefix of the port's signals, e.g. ``io_out``
+    :param delay: Time in ns from a token arriving until it is acknowledged.
+                  If 0, the token is acknowledged one simulator step after it arrived.
+                  May be a function returning the time for each token, such as a :class:`click_tb.traffic.Traffic`
+    :param timestamps: Whether to record the time (ns) each token arrives at in :attr:`times`
+    """
+
+    def __init__(self, dut, prefix, delay=0, timestamps=False):
+        super().__init__(dut, prefix)
+        self.delay = delay
+        self.phase = 0
+        self.count = 0
+        self.times = [] if timestamps else None
+
+    def reset(self, phase=0):
+        """
+        Drives the acknowledge signal to `phase`. Must be called while the DUT is being reset.
+        Ports whose out.req is initially high (ro=true) start with an acknowledged token when `phase` is 1
+        """
+        self.phase = phase
+        self.ack.value = phase
+
+    async def wait_for_token(self):
+        """Blocks until a new token is available on the port"""
+        while self.read_req() == self.phase:
+            await Edge(self.req)
+
+    async def receive(self):
+        """Waits for the next token, acknowledges it and returns it"""
+        await self.wait_for_token()
+        if self.times is not None:
+            self.times.append(get_sim_time("ns"))
+        await ReadOnly()
+        token = self.sample()
+        delay = self.delay() if callable(self.delay) else self.delay
+        if delay:
+            await Timer(delay, "ns", round_mode="round")
+        else:
+            await Timer(1, "step")
+        self.phase ^= 1
+        self.write_ack(self.phase)
+        self.count += 1
+        return token
+
+    async def receive_expect(self, expected):
+        """Receives one token, checking that it equals `expected`, which may hold NumPy arrays of words"""
+        token = await self.receive()
+        expected = tuple(map(as_int, expected)) if isinstance(expected, tuple) else as_int(expected)
+        assert token == expected, f"{self.prefix}: expected token {expected}, got {token} (token #{self.count})"
+
+    async def receive_many(self, n):
+        """Receives `n` tokens and returns them"""
+        return [await self.receive() for _ in range(n)]
+
+    async def receive_stream(self, expected):
+        """Receives one token for each expected token, checking that they are equal"""
+        for token in expected:
+            await self.receive_expect(token)
+
+
+class HandshakeMonitor(HandshakePort):
+    """
+    Passively observes a port, producing one (time, token) pair for each token passing through it.
+    The token is sampled when the request toggles, time is in ns.
+    :param dut: The DUT handle
+    :param prefix: Prefix of the port's signals
+    :param callback: Optional function called with (time, token) for each token
+    :param keep: Whether to keep the observed tokens in a queue, read through :meth:`get` or ``async for``.
+                 Disable it for long runs where only the callback is needed
+    """
+
+    def __init__(self, dut, prefix, callback=None, keep=True):
+        super().__init__(dut, prefix)
+        self.callback = callback
+        self.queue = Queue() if keep else None
+        self.count = 0
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        async for _ in toggles(self.req):
+            await ReadOnly()
+            event = (get_sim_time("ns"), self.sample())
+            self.count += 1
+            if self.callback is not None:
+                self.callback(*event)
+            if self.queue is not None:
+                self.queue.put_nowait(event)
+
+    async def get(self):
+        """Returns the next (time, token) pair observed on the port"""
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def stop(self):
+        """Stops observing the port"""
+        self._task.kill()
@@ -0,0 +1,273 @@
+"""
+Monte Carlo simulation of delay variation.
+
+In the generated Verilog, every instance of a ``DelayElementSim_<n>`` holds its delay in a ``delay_ps`` variable.
+:func:`randomize` gives every instance its own delay, drawn around its nominal value, so a simulation sees a circuit
+in which no two delay elements are exactly alike. :class:`BundledDataChecker` checks the bundled-data assumption on
+every channel while it runs: the data of a channel must not change while it carries a token (req != ack).
+
+The benchmarks opt in by calling :func:`from_env`, which does nothing unless ``MC_SPREAD`` is set. Running this module
+runs a benchmark many times, each with its own seed, in parallel, and reports the distribution of the cycle time and
+the runs which broke a timing assumption (a changing bundled data signal, a wrong result or a deadlock)::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.montecarlo BENCHMARK [-n RUNS] [--spread S] [-j JOBS] [-- MAKE_ARGS]
+
+e.g. ``python3 -m click_tb.montecarlo gcd -n 200 --spread 0.2 --case stream``. Run ``i`` keeps its results and log in
+``montecarlo/<benchmark>/run<i>``, and the summary is written to ``montecarlo/<benchmark>/montecarlo.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import cocotb
+from cocotb.handle import HierarchyObject
+from cocotb.triggers import Edge, Timer
+from cocotb.utils import get_sim_time
+
+from click_tb.bench import load_results
+from click_tb.handshake import data_handles
+from click_tb.runner import results_passed
+from click_tb.trace import resolve
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+DISTRIBUTIONS = ("uniform", "normal")
+
+
+def delay_elements(handle, prefix=""):
+    """Returns the ``delay_ps`` handles of all delay elements below `handle`, by hierarchical instance name"""
+    found = {}
+    for child in handle:
+        if not isinstance(child, HierarchyObject):
+            continue
+        name = f"{prefix}{child._name}"
+        if child._name.startswith("DelayElementSim") or hasattr(child, "delay_ps"):
+            found[name] = child.delay_ps
+        else:
+            found.update(delay_elements(child, name + "."))
+    return found
+
+
+def draw(rng, nominal, spread, dist="uniform"):
+    """
+    Draws a delay around its nominal value, at least 1 ps
+    :param spread: Relative variation. With ``uniform``, delays are drawn from ``nominal * (1 +- spread)``. With
+                   ``normal``, `spread` is the relative standard deviation
+    """
+    if dist == "uniform":
+        factor = 1 + rng.uniform(-spread, spread)
+    elif dist == "normal":
+        factor = rng.gauss(1, spread)
+    else:
+        raise ValueError(f"Unknown distribution '{dist}', expected one of {', '.join(DISTRIBUTIONS)}")
+    return max(1, round(nominal * factor))
+
+
+def randomize(dut, rng, spread, dist="uniform"):
+    """
+    Gives every delay element below `dut` its own delay. Must be called after the delay elements have been
+    initialized (after time 0), and before the simulation starts moving tokens
+    :return: The nominal and drawn delay in ps of every delay element, by instance name
+    """
+    delays = {}
+    for name, handle in sorted(delay_elements(dut).items()):
+        nominal = int(handle.value)
+        delays[name] = (nominal, draw(rng, nominal, spread, dist))
+        handle.value = delays[name][1]
+    return delays
+
+
+def handshake_channels(handle, prefix=""):
+    """Returns the prefixes of all channels with data below `handle`, e.g. ``RF0.io_out1``, skipping delay elements"""
+    channels = []
+    names = set()
+    for child in handle:
+        names.add(child._name)
+        if isinstance(child, HierarchyObject) and not hasattr(child, "delay_ps"):
+            channels += handshake_channels(child, f"{prefix}{child._name}.")
+    for name in sorted(names):
+        port = name[:-len("_req")]
+        if name.endswith("_req") and f"{port}_ack" in names and data_handles(handle, port):
+            channels.append(prefix + port)
+    return channels
+
+
+class BundledDataChecker:
+    """
+    Checks that the data of the given channels is stable while they carry a token. Changes in the same time step as
+    the request are allowed, as the sender drives both at once
+    :param dut: The DUT handle
+    :param channels: Prefixes of the channels to check, e.g. ``io_in`` or ``RF0.io_out1``
+    :param max_log: Number of violations kept in :attr:`log`
+    """
+
+    def __init__(self, dut, channels, max_log=10):
+        self.violations = 0
+        self.log = []
+        self.max_log = max_log
+        self._tasks = []
+        for channel in channels:
+            parent, _, port = channel.rpartition(".")
+            handle = resolve(dut, parent) if parent else dut
+            req, ack = getattr(handle, f"{port}_req"), getattr(handle, f"{port}_ack")
+            state = {"req_time": None}
+            self._tasks.append(cocotb.start_soon(self._watch_req(req, state)))
+            for data in data_handles(handle, port):
+                self._tasks.append(cocotb.start_soon(self._watch_data(channel, data, req, ack, state)))
+
+    @staticmethod
+    async def _watch_req(req, state):
+        while True:
+            await Edge(req)
+            state["req_time"] = get_sim_time("ps")
+
+    async def _watch_data(self, channel, data, req, ack, state):
+        while True:
+            await Edge(data)
+            if not (req.value.is_resolvable and ack.value.is_resolvable) or int(req.value) == int(ack.value):
+                continue
+            now = get_sim_time("ps")
+            if state["req_time"] is not None and state["req_time"] < now:
+                self.violations += 1
+                if len(self.log) < self.max_log:
+                    self.log.append(f"{channel}: data changed at {now / 1000} ns while carrying a token")
+
+    def stop(self):
+        for task in self._tasks:
+            task.kill()
+
+
+class MonteCarlo:
+    """The delays of one Monte Carlo run and the bundled-data checker watching it"""
+
+    def __init__(self, dut, seed, spread, dist="uniform", channels=None):
+        self.seed = seed
+        self.spread = spread
+        self.dist = dist
+        self.delays = randomize(dut, random.Random(seed), spread, dist)
+        self.checker = BundledDataChecker(dut, handshake_channels(dut) if channels is None else channels)
+
+    def check(self):
+        assert self.checker.violations == 0, "\n".join(self.checker.log)
+
+    def summary(self):
+        """Metrics recorded along with the benchmark results of the run, including the delays it was run with"""
+        self.checker.stop()
+        return {"mc_seed": self.seed, "mc_spread": self.spread, "mc_dist": self.dist,
+                "delay_elements": len(self.delays), "timing_violations": self.checker.violations,
+                "timing_violation_log": self.checker.log, "delays_ps": {n: d for n, (_, d) in self.delays.items()}}
+
+
+async def from_env(dut, channels=None):
+    """
+    Randomizes the delays of the DUT if ``MC_SPREAD`` is set, using ``MC_SEED`` (default 0) and ``MC_DIST``
+    (``uniform`` or ``normal``). Waits one simulator step, for the delay elements to be initialized
+    :return: The :class:`MonteCarlo` run, or None for a nominal simulation
+    """
+    if not os.environ.get("MC_SPREAD"):
+        return None
+    await Timer(1, "step")
+    return MonteCarlo(dut, int(os.environ.get("MC_SEED", 0)), float(os.environ["MC_SPREAD"]),
+                      os.environ.get("MC_DIST", "uniform"), channels)
+
+
+def run(workdir: str, benchmark: str, i: int, out: str, spread: float, dist: str, case: Optional[str],
+        timeout: Optional[float], make_args: Sequence[str] = ()) -> str:
+    """Runs the benchmark with the delays of seed `i`, returning ``ok``, ``failed`` or ``timeout``"""
+    rdir = os.path.join(out, f"run{i}")
+    shutil.rmtree(rdir, ignore_errors=True)
+    os.makedirs(rdir)
+    cmd = ["make", "-C", os.path.join(BENCHMARKS_DIR, benchmark), f"WORKDIR={workdir}", f"BENCH_DIR={rdir}/bench",
+           f"COCOTB_RESULTS_FILE={rdir}/results.xml", f"MC_SEED={i}", f"MC_SPREAD={spread}", f"MC_DIST={dist}",
+           *([f"TESTCASE={case}"] if case else []), *make_args]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=timeout)
+        # Wrong results fail the testcases without failing make, so they are read from the results file
+        passed = proc.returncode == 0 and results_passed(os.path.join(rdir, "results.xml"))
+        log, status = proc.stdout, "ok" if passed else "failed"
+    except subprocess.TimeoutExpired as e:
+        log, status = e.stdout or "", "timeout"
+    with open(os.path.join(rdir, "run.log"), "w") as f:
+        f.write(log if isinstance(log, str) else log.decode())
+    return status
+
+
+def distribution(values: Sequence[float]) -> Dict[str, float]:
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"mean": statistics.mean(values), "stdev": statistics.pstdev(values), "min": values[0],
+            "p01": pick(0.01), "p50": pick(0.5), "p99": pick(0.99), "max": values[-1]}
+
+
+def collect(out: str, statuses: Sequence[str]) -> dict:
+    """Summarizes the cycle times and timing violations of all runs"""
+    cycle_times: Dict[str, List[float]] = {}
+    broken = []
+    for i, status in enumerate(statuses):
+        bench = os.path.join(out, f"run{i}", "bench")
+        violations = 0
+        for result in load_results(bench) if os.path.isdir(bench) else []:
+            for case, metrics in result["cases"].items():
+                violations += metrics.get("timing_violations", 0)
+                if "cycle_time_ns" in metrics:
+                    cycle_times.setdefault(case, []).append(metrics["cycle_time_ns"])
+        if status != "ok" or violations:
+            broken.append({"run": i, "status": status, "timing_violations": violations})
+    return {
+        "runs": len(statuses),
+        "yield": 1 - len(broken) / max(1, len(statuses)),
+        "cycle_time_ns": {case: distribution(v) for case, v in cycle_times.items()},
+        "broken": broken,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a benchmark with randomized delays many times")
+    parser.add_argument("benchmark", help="Benchmark directory to run, e.g. gcd")
+    parser.add_argument("-n", "--runs", type=int, default=100, help="Number of runs (default: 100)")
+    parser.add_argument("--spread", type=float, default=0.1,
+                        help="Relative delay variation: the bound of a uniform, the stdev of a normal (default: 0.1)")
+    parser.add_argument("--dist", choices=DISTRIBUTIONS, default="uniform", help="Delay distribution")
+    parser.add_argument("--case", help="Only run this case of the benchmark, e.g. stream")
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="Seconds after which a run is considered deadlocked (default: 600)")
+    parser.add_argument("--workdir", default=os.getcwd(), help="Root of the project (default: cwd)")
+    parser.add_argument("--out", help="Output directory (default: montecarlo/<benchmark>)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of runs at the same time (default: number of cores)")
+    argv = list(sys.argv[1:] if argv is None else argv)
+    make_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, make_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    workdir = os.path.abspath(args.workdir)
+    out = os.path.abspath(args.out or os.path.join(workdir, "montecarlo", args.benchmark))
+    go = lambda i: run(workdir, args.benchmark, i, out, args.spread, args.dist, args.case, args.timeout, make_args)
+    # The first run compiles the simulation, which all other runs share through the simulation cache
+    statuses = [go(0)]
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        statuses += list(pool.map(go, range(1, args.runs)))
+
+    summary = collect(out, statuses)
+    with open(os.path.join(out, "montecarlo.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"{summary['runs']} runs with {args.dist} delays, spread {args.spread}: yield {summary['yield']:.1%}")
+    for case, d in summary["cycle_time_ns"].items():
+        print(f"{case:<16} cycle time (ns): " + " ".join(f"{k}={v:.3f}" for k, v in d.items()))
+    for b in summary["broken"]:
+        print(f"run{b['run']}: {b['status']}, {b['timing_violations']} timing violations (see run{b['run']}/run.log)")
+    return 1 if summary["broken"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Helpers for the ``NaryCompare`` design, which holds N-ary joins, forks and join-reg-forks built both as balanced trees
+and as chains of two-input components. Shared by the ``nary`` test and benchmark.
+"""
+from click_tb.handshake import HandshakeSource, HandshakeSink, port_prefixes
+
+# The designs of NaryCompare, named like their io fields
+DESIGNS = ["joinTree", "joinChain", "forkTree", "forkChain", "jrfTree", "jrfChain"]
+
+
+def channels(dut, name, direction):
+    """The prefixes of the input or output channels of a design, in index order"""
+    prefixes = [p for p in port_prefixes(dut) if p.split("_")[:3] == ["io", name, direction]]
+    return sorted(prefixes, key=lambda p: int(p.rsplit("_", 1)[1]) if p[-1].isdigit() else 0)
+
+
+def expected(name, inputs, width):
+    """The tokens expected on each output of a design, given the `width`-bit tokens sent on each input"""
+    if name.startswith("fork"):
+        return inputs[0]
+    return [sum(t << (i * width) for i, t in enumerate(tokens)) for tokens in zip(*inputs)]
+
+
+def design_ports(dut, timestamps=False):
+    """The sources on the inputs and the sinks on the outputs of every design, by design name"""
+    return {name: ([HandshakeSource(dut, p, timestamps=timestamps) for p in channels(dut, name, "in")],
+                   [HandshakeSink(dut, p, timestamps=timestamps) for p in channels(dut, name, "out")])
+            for name in DESIGNS}
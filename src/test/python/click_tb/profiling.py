@@ -0,0 +1,177 @@
+"""
+Profiling of the cocotb tests, showing where the time of a regression goes.
+
+With ``PROFILE=1`` (see ``sim.mk``), this module is loaded along with the test module of a directory and instruments
+the cocotb scheduler. Besides the wall-clock time (``time``) and simulated time (``sim_time_ns``) cocotb records for
+every test in ``results.xml``, it adds
+
+- ``sim_callbacks``: callbacks from the simulator into Python, i.e. GPI triggers such as ``Timer``, ``Edge`` or
+  ``ReadOnly`` firing. Each of them is a switch between the simulator and Python
+- ``resumes``: coroutine resumptions, including those caused by Python triggers such as ``Event`` or a joined task
+- ``python_s``: wall-clock time spent running coroutines. The rest of ``time`` is spent in the simulator
+
+With ``PROFILE=coroutines``, the time spent in every coroutine function is recorded as well, as ``<property>``
+elements of the testcase. After the last test of a directory, a table of its tests sorted by wall-clock time is
+logged. Running this module prints the same table for all tests of a (merged) report::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.profiling results.xml
+
+The instrumentation patches internals of the cocotb 1.x scheduler and regression manager, the cocotb version the
+tests are pinned to.
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import List, Optional, Sequence
+
+PROFILE = os.environ.get("PROFILE", "")
+
+
+class Counters:
+    """The counts and times of the test currently running"""
+
+    def __init__(self):
+        self.callbacks = 0
+        self.resumes = 0
+        self.python = 0.0
+        self.coroutines = Counter()
+
+
+counters = Counters()
+rows = []
+
+
+def coroutine_name(task):
+    coro = getattr(task, "_coro", task)
+    return getattr(coro, "__qualname__", type(coro).__name__)
+
+
+def install(per_coroutine=False):
+    """Instruments the cocotb scheduler and regression manager"""
+    import cocotb
+    try:
+        from cocotb.regression import RegressionManager
+        from cocotb.scheduler import Scheduler
+        from cocotb.triggers import GPITrigger
+        react, schedule = Scheduler._react, Scheduler._schedule
+        record_result, tear_down = RegressionManager._record_result, RegressionManager._tear_down
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"PROFILE needs cocotb 1.x, found cocotb {cocotb.__version__}") from e
+
+    def _react(self, trigger):
+        if isinstance(trigger, GPITrigger):
+            counters.callbacks += 1
+        return react(self, trigger)
+
+    def _schedule(self, coroutine, trigger=None):
+        counters.resumes += 1
+        start = time.perf_counter()
+        try:
+            return schedule(self, coroutine, trigger)
+        finally:
+            elapsed = time.perf_counter() - start
+            counters.python += elapsed
+            if per_coroutine:
+                counters.coroutines[coroutine_name(coroutine)] += elapsed
+
+    def _record_result(self, test, outcome, wall_time_s, sim_time_ns):
+        record_result(self, test, outcome, wall_time_s, sim_time_ns)
+        case = self.xunit.last_testcase
+        case.set("sim_callbacks", str(counters.callbacks))
+        case.set("resumes", str(counters.resumes))
+        case.set("python_s", repr(counters.python))
+        if counters.coroutines:
+            props = ET.SubElement(case, "properties")
+            for name, t in counters.coroutines.most_common():
+                ET.SubElement(props, "property", name=f"coroutine:{name}", value=repr(t))
+        rows.append(row(case, test.__qualname__))
+        # Start counting for the next test
+        counters.__init__()
+
+    def _tear_down(self):
+        first = not self._tearing_down
+        tear_down(self)
+        if first and rows:
+            self.log.info("Profile of the tests, by wall-clock time\n" + table(rows))
+
+    Scheduler._react = _react
+    Scheduler._schedule = _schedule
+    RegressionManager._record_result = _record_result
+    RegressionManager._tear_down = _tear_down
+
+
+def row(case: ET.Element, name: str) -> dict:
+    """The profile of a single testcase of a report"""
+    return {
+        "test": name,
+        "wall_s": float(case.get("time", 0)),
+        "sim_ns": float(case.get("sim_time_ns", 0)),
+        "sim_callbacks": int(case.get("sim_callbacks", -1)),
+        "resumes": int(case.get("resumes", -1)),
+        "python_s": float(case.get("python_s", -1)),
+        "coroutines": {p.get("name")[len("coroutine:"):]: float(p.get("value"))
+                       for p in case.iter("property") if p.get("name", "").startswith("coroutine:")},
+    }
+
+
+def table(profiles: Sequence[dict], top: Optional[int] = None) -> str:
+    """Formats profiles as a table, most expensive first"""
+    ordered = sorted(profiles, key=lambda r: -r["wall_s"])[:top]
+    width = max([len(r["test"]) for r in ordered] + [4]) + 2
+    lines = [f"{'TEST':<{width}}{'WALL (s)':>10}{'SIM (ns)':>14}{'NS/S':>12}{'CALLBACKS':>11}{'RESUMES':>11}"
+             f"{'PYTHON':>8}{'US/CALLBACK':>13}"]
+    for r in ordered:
+        rate = r["sim_ns"] / r["wall_s"] if r["wall_s"] else 0
+        profiled = r["sim_callbacks"] >= 0
+        callbacks = f"{r['sim_callbacks']:>11}{r['resumes']:>11}" if profiled else f"{'-':>11}{'-':>11}"
+        python = f"{r['python_s'] / r['wall_s']:>8.0%}" if profiled and r["wall_s"] else f"{'-':>8}"
+        per_callback = (f"{1e6 * r['wall_s'] / r['sim_callbacks']:>13.1f}" if profiled and r["sim_callbacks"]
+                        else f"{'-':>13}")
+        lines.append(f"{r['test']:<{width}}{r['wall_s']:>10.2f}{r['sim_ns']:>14.0f}{rate:>12.0f}{callbacks}{python}"
+                     f"{per_callback}")
+    total = sum(r["wall_s"] for r in profiles)
+    lines.append(f"{'TOTAL':<{width}}{total:>10.2f}")
+    return "\n".join(lines)
+
+
+def coroutine_table(profiles: Sequence[dict], top: Optional[int] = None) -> str:
+    """Formats the time spent in each coroutine function over all tests, most expensive first"""
+    totals = Counter()
+    for r in profiles:
+        totals.update(r["coroutines"])
+    lines = [f"{'COROUTINE':<50}{'PYTHON (s)':>12}"]
+    lines += [f"{name:<50}{t:>12.3f}" for name, t in totals.most_common(top)]
+    return "\n".join(lines)
+
+
+def load(path: str) -> List[dict]:
+    """Loads the profiles of all testcases in a report, naming each by its test directory and test"""
+    profiles = []
+    for suite in ET.parse(path).getroot().iter("testsuite"):
+        for case in suite.iter("testcase"):
+            profiles.append(row(case, f"{suite.get('name')}.{case.get('name')}"))
+    return profiles
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Print the tests of a JUnit report sorted by their cost")
+    parser.add_argument("report", help="results.xml of a test directory, or the merged report of make test")
+    parser.add_argument("--top", type=int, help="Only print the most expensive tests")
+    args = parser.parse_args(argv)
+
+    profiles = load(args.report)
+    print(table(profiles, args.top))
+    if any(r["coroutines"] for r in profiles):
+        print()
+        print(coroutine_table(profiles, args.top))
+    return 0
+
+
+if PROFILE in ("1", "coroutines") and __name__ != "__main__":
+    install(per_coroutine=PROFILE == "coroutines")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""
+Parallel runner for the cocotb test directories.
+
+Every directory under the test root (``src/test/python/tests`` by default) is run with its own
+``make`` invocation, just as ``src/test/python/Makefile`` does, but up to ``--jobs`` directories
+run at the same time. The ``results.xml`` written by cocotb in each directory is merged into a
+single JUnit report, with one ``<testsuite>`` per directory carrying the wall-clock time of that
+directory (compilation included).
+
+Directories which passed are recorded in a result cache (``test_cache.json`` in the root of the project), along with
+a hash of everything they depend on: the files of the test directory, the shared testbench code, the generated
+Verilog files and the Scala sources they are built from, ``ClickConfig.json``, the simulator version, the make
+arguments and the environment variables read by the tests. A directory whose hash matches a previous pass is not
+run again, and is reported as cached. ``--force`` reruns every directory.
+
+Usage, from the root of the project::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.runner [-j JOBS] [-o results.xml] [--force] [TEST ...] [-- MAKE_ARGS]
+    PYTHONPATH=src/test/python python3 -m click_tb.runner --compare results_icarus.xml results_verilator.xml
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+TESTBENCH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(TESTBENCH_DIR, "tests")
+CACHE_FILE = "test_cache.json"
+# Commands printing the version of each simulator
+SIM_VERSION = {"icarus": ["iverilog", "-V"], "verilator": ["verilator", "--version"]}
+
+
+@dataclass
+class TestRun:
+    """The outcome of running ``make`` in one test directory"""
+    name: str
+    returncode: int
+    wall_time: float
+    log: str
+    suite: Optional[ET.Element] = None
+    cached: bool = False
+
+    @property
+    def counts(self):
+        """Number of (tests, failures, errors, skipped) in the merged suite of this run"""
+        return count_cases(self.suite)
+
+    @property
+    def passed(self) -> bool:
+        _, failures, errors, _ = self.counts
+        return failures == 0 and errors == 0
+
+
+def count_cases(suite: ET.Element):
+    """Returns the number of (tests, failures, errors, skipped) testcases in a suite"""
+    cases = suite.findall("testcase")
+    failures = sum(1 for c in cases if c.find("failure") is not None)
+    errors = sum(1 for c in cases if c.find("error") is not None)
+    skipped = sum(1 for c in cases if c.find("skipped") is not None)
+    return len(cases), failures, errors, skipped
+
+
+def results_passed(results: str) -> bool:
+    """
+    Whether the results.xml written by cocotb exists and none of its testcases failed or errored. cocotb's make exits
+    with 0 even when tests fail, so its exit code alone does not tell whether a run passed
+    """
+    try:
+        root = ET.parse(results).getroot()
+    except (OSError, ET.ParseError):
+        return False
+    suite = ET.Element("testsuite")
+    suite.extend(root.iter("testcase"))
+    tests, failures, errors, _ = count_cases(suite)
+    return tests > 0 and failures == 0 and errors == 0
+
+
+def discover(tests_dir: str) -> List[str]:
+    """Returns the names of all test directories (directories holding a Makefile) in `tests_dir`"""
+    return sorted(d for d in os.listdir(tests_dir) if os.path.isfile(os.path.join(tests_dir, d, "Makefile")))
+
+
+def run_make(tests_dir: str, name: str, workdir: str, make_args: Sequence[str] = ()) -> TestRun:
+    """
+    Runs the cocotb Makefile of a single test directory and collects its results
+    :param tests_dir: The directory holding all test directories
+    :param name: Name of the test directory to run
+    :param workdir: Root of the project, passed on as WORKDIR
+    :param make_args: Additional arguments for make, e.g. variable overrides
+    """
+    path = os.path.join(tests_dir, name)
+    results = os.path.join(path, "results.xml")
+    # Never merge the results of a previous run
+    if os.path.exists(results):
+        os.remove(results)
+    start = time.perf_counter()
+    proc = subprocess.run(["make", "-C", path, f"WORKDIR={workdir}", *make_args],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    wall_time = time.perf_counter() - start
+    with open(os.path.join(path, "run.log"), "w") as f:
+        f.write(proc.stdout)
+    run = TestRun(name, proc.returncode, wall_time, proc.stdout)
+    run.suite = load_suite(run, results)
+    return run
+
+
+def load_suite(run: TestRun, results: str) -> ET.Element:
+    """
+    Builds the ``<testsuite>`` element of a test directory from the results.xml written by cocotb.
+    If no results were written (e.g. because compilation failed), the suite holds a single
+    errored testcase instead
+    """
+    suite = ET.Element("testsuite", name=run.name, package=run.name)
+    if os.path.exists(results):
+        for case in ET.parse(results).getroot().iter("testcase"):
+            suite.append(case)
+    if len(suite) == 0 or (run.returncode != 0 and not suite.findall(".//failure")):
+        case = ET.SubElement(suite, "testcase", name="make", classname=run.name, time="0")
+        err = ET.SubElement(case, "error", message=f"make exited with code {run.returncode}")
+        err.text = run.log[-4000:]
+    tests, failures, errors, skipped = count_cases(suite)
+    suite.set("tests", str(tests))
+    suite.set("failures", str(failures))
+    suite.set("errors", str(errors))
+    suite.set("skipped", str(skipped))
+    suite.set("time", f"{run.wall_time:.3f}")
+    return suite
+
+
+def merge(runs: Sequence[TestRun], wall_time: float) -> ET.ElementTree:
+    """Merges the suites of all runs into a single JUnit report"""
+    root = ET.Element("testsuites", name="click")
+    totals = [0, 0, 0, 0]
+    for run in runs:
+        root.append(run.suite)
+        totals = [a + b for a, b in zip(totals, run.counts)]
+    for key, value in zip(("tests", "failures", "errors", "skipped"), totals):
+        root.set(key, str(value))
+    root.set("time", f"{wall_time:.3f}")
+    return ET.ElementTree(root)
+
+
+def make_variables(path: str) -> Dict[str, str]:
+    """The simple variable assignments of a Makefile"""
+    variables = {}
+    with open(path) as f:
+        for line in f:
+            m = re.match(r"\s*(?:export\s+)?(\w+)\s*[:?]?=\s*(.*?)\s*$", line)
+            if m:
+                variables.setdefault(m.group(1), m.group(2))
+    return variables
+
+
+def make_overrides(make_args: Sequence[str]) -> Dict[str, str]:
+    """
+    The variables set on the command line of make, both those given to the runner and those of the make
+    invocation running it (e.g. ``make test SIM=verilator``), which reach the test Makefiles through MAKEFLAGS
+    """
+    args = os.environ.get("MAKEFLAGS", "").split() + list(make_args)
+    return dict(a.split("=", 1) for a in args if "=" in a and not a.startswith("-"))
+
+
+def simulator_version(sim: str) -> str:
+    """The version string of a simulator, or an empty string if it cannot be run"""
+    try:
+        proc = subprocess.run(SIM_VERSION.get(sim, [sim, "--version"]), stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, timeout=30)
+        return proc.stdout.strip().splitlines()[0] if proc.stdout.strip() else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def input_files(tests_dir: str, name: str, workdir: str, make_args: Sequence[str]) -> Optional[List[str]]:
+    """
+    Returns the files a test directory depends on, or None if they cannot be determined,
+    e.g. because its design has not been generated yet
+    """
+    path = os.path.join(tests_dir, name)
+    variables = make_variables(os.path.join(path, "Makefile"))
+    overrides = make_overrides(make_args)
+    gen_dir = overrides.get("GEN_DIR", os.environ.get("GEN_DIR", os.path.join(workdir, "gen")))
+    target = overrides.get("GEN_TARGET", variables.get("GEN_TARGET", variables.get("TOPLEVEL")))
+    gen_mk = os.path.join(gen_dir, f"{target}.mk")
+    if target is None or not os.path.exists(gen_mk):
+        return None
+    files = [gen_mk, os.path.join(gen_dir, "ClickConfig.json"), os.path.join(TESTBENCH_DIR, "sim.mk")]
+    files += sorted(os.path.join(path, f) for f in os.listdir(path) if f == "Makefile" or f.endswith(".py"))
+    files += sorted(glob.glob(os.path.join(TESTBENCH_DIR, "click_tb", "*.py")))
+    # The generated Verilog files, and the Scala sources they are built from
+    with open(gen_mk) as f:
+        for ref in re.findall(r"\$\((GEN_DIR|WORKDIR)\)/(\S+)", f.read()):
+            files.append(os.path.join(gen_dir if ref[0] == "GEN_DIR" else workdir, ref[1]))
+    return files
+
+
+def input_hash(tests_dir: str, name: str, workdir: str, make_args: Sequence[str], sim_version: str) -> Optional[str]:
+    """
+    Hash of everything a test directory depends on, or None if it cannot be computed.
+    Files which do not exist are hashed as missing
+    """
+    files = input_files(tests_dir, name, workdir, make_args)
+    if files is None:
+        return None
+    h = hashlib.sha256(json.dumps([sim_version, sorted(make_overrides(make_args).items())]).encode())
+    sources = ""
+    for path in files:
+        h.update(os.path.relpath(path, workdir).encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            h.update(hashlib.sha256(data).digest())
+            if path.endswith(".py"):
+                sources += data.decode(errors="replace")
+        else:
+            h.update(b"missing")
+    # Environment variables read by the tests and the testbench code, e.g. TOKENS and SEED
+    for var in sorted(set(re.findall(r"os\.environ(?:\.get\(|\[)\s*[\"'](\w+)[\"']", sources))):
+        h.update(f"{var}={os.environ.get(var)}".encode())
+    return h.hexdigest()
+
+
+def load_cache(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: str, cache: dict) -> None:
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tmp, path)
+
+
+def cached_run(name: str, entry: dict) -> TestRun:
+    """
+    Rebuilds the run of a test directory from its entry in the result cache. The suite keeps the wall time of the run
+    which passed, and is marked as cached
+    """
+    run = TestRun(name, 0, 0.0, "", cached=True)
+    run.suite = ET.fromstring(entry["suite"])
+    run.suite.set("cached", "true")
+    return run
+
+
+def run_all(tests_dir: str, names: Sequence[str], workdir: str, jobs: int,
+            make_args: Sequence[str] = (), cache_path: Optional[str] = None, force: bool = False) -> List[TestRun]:
+    """
+    Runs the given test directories, at most `jobs` at a time. Every worker thread drives one
+    ``make`` process, so the simulations themselves run in parallel.
+    The runs are returned in the order of `names`
+    :param cache_path: The result cache. If None, no results are cached
+    :param force: Whether to run every directory, even if its inputs match a previous pass
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    keys = {}
+    sim = make_overrides(make_args).get("SIM", os.environ.get("SIM", "icarus"))
+    if cache_path:
+        version = simulator_version(sim)
+        keys = {name: input_hash(tests_dir, name, workdir, make_args, version) for name in names}
+    # Entries are kept per test directory and simulator, so runs with different simulators do not evict each other
+    ids = {name: f"{os.path.basename(tests_dir)}/{name}:{sim}" for name in names}
+
+    def hit(name):
+        entry = cache.get(ids[name])
+        return not force and keys.get(name) is not None and entry is not None and entry["key"] == keys[name]
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {name: pool.submit(run_make, tests_dir, name, workdir, make_args) for name in names
+                   if not hit(name)}
+        runs = []
+        for name in names:
+            if name not in futures:
+                run = cached_run(name, cache[ids[name]])
+                print(f"CACHED {run.name}", flush=True)
+            else:
+                run = futures[name].result()
+                status = "PASS" if run.passed else "FAIL"
+                print(f"{status} {run.name} ({run.wall_time:.1f} s)", flush=True)
+                # The inputs are hashed before running, so a change made meanwhile is not recorded as passed
+                if run.passed and keys.get(name) is not None:
+                    cache[ids[name]] = {"key": keys[name], "suite": ET.tostring(run.suite, encoding="unicode")}
+                else:
+                    cache.pop(ids[name], None)
+            runs.append(run)
+    if cache_path:
+        save_cache(cache_path, cache)
+    return runs
+
+
+def print_summary(runs: Sequence[TestRun], wall_time: float) -> None:
+    print(f"\n{'TEST':<16}{'TESTS':>7}{'FAIL':>6}{'ERR':>5}{'SKIP':>6}{'WALL (s)':>11}")
+    for run in runs:
+        tests, failures, errors, skipped = run.counts
+        wall = "cached" if run.cached else f"{run.wall_time:.2f}"
+        print(f"{run.name:<16}{tests:>7}{failures:>6}{errors:>5}{skipped:>6}{wall:>11}")
+    busy = sum(r.wall_time for r in runs)
+    cached = sum(1 for r in runs if r.cached)
+    print(f"\nTotal wall time {wall_time:.2f} s ({busy:.2f} s of work, {cached} of {len(runs)} directories cached)")
+
+
+def compare(base: str, other: str) -> None:
+    """
+    Prints the wall-clock time of every test directory in two merged reports, e.g. from runs with
+    different simulators, along with the speedup of the second report over the first. Directories whose results were
+    taken from the result cache were not run, so they are labelled as cached and have no speedup
+    """
+    def times(path):
+        return {s.get("name"): None if s.get("cached") == "true" else float(s.get("time"))
+                for s in ET.parse(path).getroot().iter("testsuite")}
+
+    def fmt(t):
+        return f"{'cached':>20}" if t is None else f"{t:>19.2f}s"
+
+    t_base, t_other = times(base), times(other)
+    print(f"{'TEST':<16}{os.path.basename(base):>20}{os.path.basename(other):>20}{'SPEEDUP':>10}")
+    for name in sorted(t_base.keys() & t_other.keys()):
+        b, o = t_base[name], t_other[name]
+        speedup = f"{b / o:>9.2f}x" if b and o else f"{'-':>10}"
+        print(f"{name:<16}{fmt(b)}{fmt(o)}{speedup}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the cocotb test directories in parallel")
+    parser.add_argument("tests", nargs="*", help="Test directories to run. Defaults to all of them")
+    parser.add_argument("--tests-dir", default=TESTS_DIR, help="Directory holding the test directories")
+    parser.add_argument("--workdir", default=os.getcwd(), help="Root of the project (default: cwd)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of test directories to run at the same time (default: number of cores)")
+    parser.add_argument("-o", "--output", default="results.xml", help="Path of the merged JUnit report")
+    parser.add_argument("--force", action="store_true",
+                        help="Run every test directory, even those whose inputs match a previous pass")
+    parser.add_argument("--cache", help=f"Path of the result cache (default: {CACHE_FILE} in the workdir)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither use nor record cached results")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "OTHER"),
+                        help="Compare the wall-clock times of two merged reports instead of running tests")
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Arguments after '--' are passed on to make, e.g. variable overrides
+    make_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, make_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    tests_dir = os.path.abspath(args.tests_dir)
+    names = args.tests or discover(tests_dir)
+
+    start = time.perf_counter()
+    workdir = os.path.abspath(args.workdir)
+    cache_path = None if args.no_cache else (args.cache or os.path.join(workdir, CACHE_FILE))
+    runs = run_all(tests_dir, names, workdir, max(1, args.jobs), make_args, cache_path, args.force)
+    wall_time = time.perf_counter() - start
+
+    merge(runs, wall_time).write(args.output, encoding="utf-8", xml_declaration=True)
+    print_summary(runs, wall_time)
+    failed = [r.name for r in runs if not r.passed]
+    if failed:
+        print(f"Failing test directories: {' '.join(failed)}")
+        for run in runs:
+            if not run.passed:
+                print(f"\n===== {run.name} =====\n{run.log[-4000:]}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Content-addressed cache of compiled simulations, shared by all test and benchmark directories.
+
+The build directory of a simulation is named by a hash of its Verilog sources and of the settings it is compiled
+with. The first time a directory is used, the sources are copied into its ``src`` directory and the simulation is
+compiled from those copies. As the copies are never newer than the compiled simulation, a rerun with the same
+sources and settings finds the simulation up to date and skips compilation, in any test directory.
+``sim.mk`` runs it as::
+
+    python3 src/test/python/click_tb/simcache.py CACHE_DIR SETTINGS SOURCE...
+
+which prints the build directory to use.
+"""
+import hashlib
+import os
+import shutil
+import sys
+
+
+def key(settings, sources):
+    """Hash of the compile settings and the names and contents of the sources"""
+    h = hashlib.sha256(settings.encode())
+    for path in sources:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def prepare(cache_dir, settings, sources):
+    """
+    Returns the build directory for the sources and settings, copying the sources into it if it is new
+    :param cache_dir: Root directory of the cache
+    :param settings: String holding everything besides the sources which affects compilation
+    :param sources: Paths of the Verilog sources
+    """
+    build = os.path.join(os.path.abspath(cache_dir), key(settings, sources))
+    src = os.path.join(build, "src")
+    os.makedirs(src, exist_ok=True)
+    for path in sources:
+        dest = os.path.join(src, os.path.basename(path))
+        if not os.path.exists(dest):
+            # Copy under a temporary name, so concurrent runs never see a partial file
+            tmp = f"{dest}.{os.getpid()}"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+    return build
+
+
+if __name__ == "__main__":
+    print(prepare(sys.argv[1], sys.argv[2], sys.argv[3:]))
@@ -0,0 +1,320 @@
+"""
+Constrained-random contention soaks for the mutexes and the arbiter.
+
+Two requesters contend for a shared resource. :func:`contend` issues requests at random, exponentially distributed
+inter-arrival times, and with probability ``both`` lets both requesters request at nearly the same time, within
+``window`` ps of each other. Requests are never issued in the same simulator step, as the zero-delay model of the
+bistable mutex cannot resolve truly simultaneous requests.
+
+Every port adapter records its grants in a shared :class:`ContentionStats`, which keeps
+
+- the distribution of grant latencies of each port, from request to grant,
+- the number of grants of each port, and the longest run of grants to one port while the other one was waiting,
+- every mutual-exclusion violation: a grant to one port while the other port holds the resource.
+
+All bookkeeping is done in Python at the time of the events the adapters already wait for, so no further triggers
+are needed per event and memory does not grow with the number of events.
+"""
+from abc import ABC, abstractmethod
+from collections import Counter
+
+import cocotb
+from cocotb.triggers import Edge, Event, ReadOnly, Timer
+from cocotb.utils import get_sim_time
+
+
+class LatencyStats:
+    """Distribution of latencies in ps, kept as a histogram"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.n = 0
+        self.total = 0
+
+    def add(self, latency):
+        self.counts[latency] += 1
+        self.n += 1
+        self.total += latency
+
+    def percentile(self, p):
+        target = p / 100 * self.n
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= target:
+                return value
+        return 0
+
+    def summary(self):
+        """Returns the mean, median, 99th percentile, minimum and maximum latency in ns"""
+        if self.n == 0:
+            return {}
+        return {
+            "mean_ns": self.total / self.n / 1000,
+            "p50_ns": self.percentile(50) / 1000,
+            "p99_ns": self.percentile(99) / 1000,
+            "min_ns": min(self.counts) / 1000,
+            "max_ns": max(self.counts) / 1000,
+        }
+
+
+class ContentionStats:
+    """Grant latencies, fairness and mutual-exclusion violations of two contending ports"""
+
+    def __init__(self, max_violations=10):
+        self.latency = [LatencyStats(), LatencyStats()]
+        self.grants = [0, 0]
+        self.streak = [0, 0]
+        self.max_streak = [0, 0]
+        self.violations = 0
+        self.violation_log = []
+        self.max_violations = max_violations
+        self.holding = [False, False]
+        self.waiting = [False, False]
+
+    def request(self, port):
+        self.waiting[port] = True
+
+    def grant(self, port, latency):
+        """Records a grant to `port`, checking that the other port does not hold the resource"""
+        other = 1 - port
+        if self.holding[other]:
+            self.violations += 1
+            if len(self.violation_log) < self.max_violations:
+                self.violation_log.append(f"port {port + 1} granted at {get_sim_time('ns')} ns "
+                                          f"while port {other + 1} holds the resource")
+        self.holding[port] = True
+        self.waiting[port] = False
+        self.grants[port] += 1
+        self.latency[port].add(latency)
+        # Consecutive grants to this port while the other one was waiting
+        self.streak[other] = 0
+        if self.waiting[other]:
+            self.streak[port] += 1
+            self.max_streak[port] = max(self.max_streak[port], self.streak[port])
+
+    def release(self, port):
+        self.holding[port] = False
+
+    @property
+    def events(self):
+        return sum(self.grants)
+
+    def report(self):
+        lines = [f"{self.events} grants, {self.violations} mutual-exclusion violations"]
+        for port in (0, 1):
+            share = self.grants[port] / max(1, self.events)
+            lat = self.latency[port].summary()
+            lines.append(f"port {port + 1}: {self.grants[port]} grants ({share:.1%}), "
+                         f"longest run while the other waited {self.max_streak[port]}, latency (ns) "
+                         + " ".join(f"{k[:-3]}={v:.3f}" for k, v in lat.items()))
+        return "\n".join(lines + self.violation_log)
+
+
+class ContentionPort(ABC):
+    """
+    Base class of the port adapters. A port requests the resource when triggered by :func:`contend`,
+    holds it for a random time, and releases it. Adapters implement the handshake of their design in :meth:`request`
+    :param stats: The statistics shared by both ports
+    :param port: Index of the port, 0 or 1
+    :param rng: Random generator for the hold times
+    :param hold: Mean time in ps the resource is held for
+    """
+
+    def __init__(self, stats, port, rng, hold=2000):
+        self.stats = stats
+        self.port = port
+        self.rng = rng
+        self.hold = hold
+        self.busy = False
+        self.req_time = 0
+        self._go = Event()
+        self._task = cocotb.start_soon(self._run())
+
+    def trigger(self):
+        """Makes the port request the resource. Ignored while a request is outstanding"""
+        if not self.busy:
+            self.busy = True
+            self._go.set()
+
+    async def _run(self):
+        while True:
+            await self._go.wait()
+            self._go.clear()
+            self.req_time = get_sim_time("ps")
+            self.stats.request(self.port)
+            await self.request()
+            self.busy = False
+
+    def hold_time(self):
+        return Timer(max(1, int(self.rng.expovariate(1 / self.hold))), "ps")
+
+    @abstractmethod
+    async def request(self):
+        """
+        Performs one request of the resource, returning once the port may request again. The grant and the release
+        are recorded in the statistics, either by the adapter itself or by a consumer such as :class:`ArbiterSink`
+        """
+
+
+class BistableMutexPort(ContentionPort):
+    """Four-phase request/grant port of the BistableMutex: R rises, G rises, R falls, G falls"""
+
+    def __init__(self, dut, stats, port, rng, hold=2000):
+        self.r = getattr(dut, f"io_R{port + 1}")
+        self.g = getattr(dut, f"io_G{port + 1}")
+        self.r.value = 0
+        super().__init__(stats, port, rng, hold)
+
+    async def request(self):
+        self.r.value = 1
+        while int(self.g.value) != 1:
+            await Edge(self.g)
+        self.stats.grant(self.port, get_sim_time("ps") - self.req_time)
+        await self.hold_time()
+        self.stats.release(self.port)
+        self.r.value = 0
+        while int(self.g.value) != 0:
+            await Edge(self.g)
+
+
+class RGDMutexPort(ContentionPort):
+    """Two-phase request/grant/done port of the RGDMutex: R toggles, G toggles, D toggles"""
+
+    def __init__(self, dut, stats, port, rng, hold=2000):
+        self.r = getattr(dut, f"io_R{port + 1}")
+        self.g = getattr(dut, f"io_G{port + 1}")
+        self.d = getattr(dut, f"io_D{port + 1}")
+        self.phase = 0
+        self.r.value = 0
+        self.d.value = 0
+        super().__init__(stats, port, rng, hold)
+
+    async def request(self):
+        self.phase ^= 1
+        self.r.value = self.phase
+        while int(self.g.value) != self.phase:
+            await Edge(self.g)
+        self.stats.grant(self.port, get_sim_time("ps") - self.req_time)
+        await self.hold_time()
+        self.stats.release(self.port)
+        self.d.value = self.phase
+
+
+class ArbiterPort(ContentionPort):
+    """
+    Two-phase input port of the Arbiter. Each request carries a token whose lowest bit identifies the port,
+    which is granted when :class:`ArbiterSink` receives the token
+    """
+
+    def __init__(self, dut, stats, port, rng, hold=2000):
+        self.req = getattr(dut, f"io_in{port + 1}_req")
+        self.ack = getattr(dut, f"io_in{port + 1}_ack")
+        self.data = getattr(dut, f"io_in{port + 1}_data")
+        self.mask = (1 << len(self.data)) - 1
+        self.phase = 0
+        self.seq = 0
+        self.token = None
+        self.req.value = 0
+        self.data.value = 0
+        super().__init__(stats, port, rng, hold)
+
+    async def request(self):
+        self.seq += 1
+        self.token = ((self.seq << 1) | self.port) & self.mask
+        self.data.value = self.token
+        self.phase ^= 1
+        self.req.value = self.phase
+        while int(self.ack.value) != self.phase:
+            await Edge(self.ack)
+        self.token = None
+
+
+class ArbiterSink:
+    """
+    Consumer on the output of the Arbiter. The resource is held from a token arriving until it is acknowledged.
+    A token which no port is waiting for, or both inputs of the internal merge being granted at once, is counted as
+    a violation
+    """
+
+    def __init__(self, dut, stats, ports, rng, hold=2000):
+        self.dut = dut
+        self.stats = stats
+        self.ports = ports
+        self.rng = rng
+        self.hold = hold
+        self.phase = 0
+        dut.io_out_ack.value = 0
+        self._task = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        req, ack, data = self.dut.io_out_req, self.dut.io_out_ack, self.dut.io_out_data
+        while True:
+            while int(req.value) == self.phase:
+                await Edge(req)
+            await ReadOnly()
+            token = int(data.value)
+            port = self.ports[token & 1]
+            if token != port.token:
+                self.violation(f"unexpected token {token}, port {port.port + 1} sent {port.token}")
+            if self.both_granted():
+                self.violation("both inputs of the internal merge are pending")
+            self.stats.grant(port.port, get_sim_time("ps") - port.req_time)
+            await Timer(max(1, int(self.rng.expovariate(1 / self.hold))), "ps")
+            self.stats.release(port.port)
+            self.phase ^= 1
+            ack.value = self.phase
+
+    def both_granted(self):
+        """Whether the mutex of the arbiter has passed on both requests to its merge at the same time"""
+        merge = self.dut.merge
+        return (int(merge.io_in1_req.value) != int(merge.io_in1_ack.value)
+                and int(merge.io_in2_req.value) != int(merge.io_in2_ack.value))
+
+    def violation(self, message):
+        self.stats.violations += 1
+        if len(self.stats.violation_log) < self.stats.max_violations:
+            self.stats.violation_log.append(f"{message} at {get_sim_time('ns')} ns")
+
+
+async def contend(ports, events, rng, mean_gap=3000, both=0.5, window=50):
+    """
+    Issues requests to two ports until `events` grants have been made
+    :param ports: The two port adapters
+    :param events: Number of grants to make
+    :param rng: Random generator
+    :param mean_gap: Mean time in ps between requests
+    :param both: Probability that both ports request at nearly the same time
+    :param window: Largest distance in ps between two nearly simultaneous requests
+    """
+    stats = ports[0].stats
+    issued = 0
+    while stats.events + sum(p.busy for p in ports) < events:
+        await Timer(max(1, int(rng.expovariate(1 / mean_gap))), "ps")
+        first = rng.randrange(2)
+        ports[first].trigger()
+        if rng.random() < both:
+            await Timer(rng.randint(1, window), "ps")
+            ports[1 - first].trigger()
+        issued += 1
+    while any(p.busy for p in ports):
+        await Timer(mean_gap, "ps")
+    return issued
+
+
+async def soak(dut, ports, events, rng, **kwargs):
+    """
+    Runs :func:`contend` on the two ports after resetting the circuit, and checks the outcome
+    :return: The statistics of the soak
+    """
+    dut.reset.value = 1
+    await Timer(3, "ns")
+    dut.reset.value = 0
+    await Timer(3, "ns")
+    stats = ports[0].stats
+    await contend(ports, events, rng, **kwargs)
+    dut._log.info("Contention soak:\n%s", stats.report())
+    assert stats.violations == 0, stats.report()
+    assert stats.events >= events
+    assert all(stats.grants), "a port was never granted"
+    return stats
@@ -0,0 +1,140 @@
+"""
+Design-space sweeps over the benchmarks in ``src/test/python/benchmarks``.
+
+A sweep generates one variant of a design for every combination of the given parameter values, each into its own
+directory and with its own module names, runs a benchmark on every variant in parallel, and collects the results
+into a single table. Parameters are either design parameters of the generation target (e.g. ``depth`` for the
+Fifo) or fields of the ``ClickConfig`` (e.g. ``REG_DELAY``), see ``Generate.scala``.
+
+Usage, from the root of the project::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.sweep BENCHMARK TARGET KEY=V1,V2,... [-j JOBS] [-- MAKE_ARGS]
+
+e.g. ``python3 -m click_tb.sweep fifo Fifo depth=2,4,8 REG_DELAY=3,5``. Variant ``v<n>`` is generated into
+``sweep/<benchmark>/v<n>/gen`` with the module name suffix ``_v<n>``. The table is written to
+``sweep/<benchmark>/sweep.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from click_tb.bench import load_results
+from click_tb.runner import results_passed
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+def variants(space: Dict[str, List[str]]) -> List[Dict[str, str]]:
+    """Returns every combination of the parameter values in `space`"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def generate(workdir: str, target: str, params: Sequence[Dict[str, str]], out: str, sbt: str = "sbt") -> None:
+    """Generates all variants with a single sbt invocation, through a variants file"""
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, "variants.txt")
+    with open(path, "w") as f:
+        for i, p in enumerate(params):
+            settings = " ".join(f"{k}={v}" for k, v in p.items())
+            f.write(f"{target} {settings} --dir={os.path.join(out, f'v{i}', 'gen')} --suffix=_v{i}\n")
+    subprocess.run([sbt, f"runMain Generate --variants={path}"], cwd=workdir, check=True)
+
+
+def run_variant(workdir: str, benchmark: str, target: str, i: int, out: str, make_args: Sequence[str] = ()) -> bool:
+    """
+    Runs the benchmark on variant `i`, keeping its results, reports and log in the directory of the variant.
+    Returns whether make succeeded and every testcase in the results of the variant passed
+    """
+    vdir = os.path.join(out, f"v{i}")
+    results = os.path.join(vdir, "results.xml")
+    os.makedirs(vdir, exist_ok=True)
+    # Never collect the results of a previous sweep
+    shutil.rmtree(os.path.join(vdir, "bench"), ignore_errors=True)
+    if os.path.exists(results):
+        os.remove(results)
+    proc = subprocess.run(["make", "-C", os.path.join(BENCHMARKS_DIR, benchmark), f"WORKDIR={workdir}",
+                           f"TOPLEVEL={target}_v{i}", f"GEN_DIR={vdir}/gen", f"BENCH_DIR={vdir}/bench",
+                           f"COCOTB_RESULTS_FILE={results}", *make_args],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    with open(os.path.join(vdir, "run.log"), "w") as f:
+        f.write(proc.stdout)
+    return proc.returncode == 0 and results_passed(results)
+
+
+def collect(out: str, params: Sequence[Dict[str, str]]) -> List[dict]:
+    """Collects the benchmark results of all variants into one row per variant and case"""
+    rows = []
+    for i, p in enumerate(params):
+        bench = os.path.join(out, f"v{i}", "bench")
+        for result in load_results(bench) if os.path.isdir(bench) else []:
+            for case, metrics in result["cases"].items():
+                rows.append({"variant": f"v{i}", **p, "case": case, **metrics})
+    return rows
+
+
+def print_table(rows: Sequence[dict], keys: Sequence[str]) -> None:
+    columns = ["variant", *keys, "case", "cycle_time_ns", "throughput_tokens_per_ns", "latency_ns"]
+    widths = [max([len(c)] + [len(fmt(r.get(c))) for r in rows]) + 2 for c in columns]
+    print("".join(c.upper().ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("".join(fmt(row.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def fmt(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a benchmark on variants of a design")
+    parser.add_argument("benchmark", help="Benchmark directory to run, e.g. fifo")
+    parser.add_argument("target", help="Generation target, e.g. Fifo")
+    parser.add_argument("params", nargs="+", help="Parameter values to sweep, as KEY=V1,V2,...")
+    parser.add_argument("--workdir", default=os.getcwd(), help="Root of the project (default: cwd)")
+    parser.add_argument("--out", help="Output directory (default: sweep/<benchmark>)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of variants to run at the same time (default: number of cores)")
+    parser.add_argument("--sbt", default="sbt", help="sbt executable")
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Arguments after '--' are passed on to make, e.g. TOKENS=1000
+    make_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, make_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    workdir = os.path.abspath(args.workdir)
+    out = os.path.abspath(args.out or os.path.join(workdir, "sweep", args.benchmark))
+    space = {}
+    for p in args.params:
+        key, _, values = p.partition("=")
+        space[key] = values.split(",")
+    params = variants(space)
+
+    generate(workdir, args.target, params, out, args.sbt)
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        passed = list(pool.map(lambda i: run_variant(workdir, args.benchmark, args.target, i, out, make_args),
+                              range(len(params))))
+    failed = [f"v{i}" for i, ok in enumerate(passed) if not ok]
+
+    rows = collect(out, params)
+    print_table(rows, list(space))
+    with open(os.path.join(out, "sweep.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+    if failed:
+        print(f"Failing variants (see run.log in their directories): {' '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Handshake event tracing.
+
+:class:`HandshakeTracer` timestamps every transition of the req and ack signals of a set of channels, including
+channels between the components inside the DUT, such as ``RF0.io_out1`` in ``GCD``. Events are collected in
+fixed-size NumPy buffers which are appended to a raw file whenever they fill up, so the memory used by the tracer
+does not grow with the length of the run. When the tracer is closed, the events are written to a ``.npy`` file
+holding one record per event:
+
+=========  ======  ======================================================================
+Field      Type    Description
+=========  ======  ======================================================================
+``time``   uint64  Simulation time of the transition, in ps
+``signal`` uint16  ``2 * channel + 0`` for a transition of req, ``2 * channel + 1`` for ack
+=========  ======  ======================================================================
+
+The names of the channels are written to a JSON file next to it (``trace.npy`` -> ``trace.json``).
+Load both with :func:`load_trace`, which memory-maps the events. The analysis of a trace is found in
+:mod:`click_tb.trace_analysis`.
+"""
+import json
+import os
+
+import cocotb
+import numpy as np
+from cocotb.utils import get_sim_time
+
+from click_tb.handshake import toggles
+
+EVENT_DTYPE = np.dtype([("time", np.uint64), ("signal", np.uint16)])
+REQ, ACK = 0, 1
+
+
+def resolve(dut, name):
+    """Returns the handle of a dotted hierarchical name below `dut`, e.g. ``RF0.io_out1_req``"""
+    handle = dut
+    for part in name.split("."):
+        handle = getattr(handle, part)
+    return handle
+
+
+def channels_of(dut, instance):
+    """
+    Returns the names of all handshake ports of a component instance below `dut`, e.g.
+    ``["RF0.io_in", "RF0.io_out1", "RF0.io_out2"]`` for the instance ``RF0``
+    """
+    handle = resolve(dut, instance)
+    names = {h._name for h in handle}
+    ports = sorted(n[:-len("_req")] for n in names if n.endswith("_req") and n[:-len("_req")] + "_ack" in names)
+    return [f"{instance}.{p}" for p in ports]
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def load_trace(path):
+    """
+    Loads a trace written by :class:`HandshakeTracer`
+    :return: The memory-mapped events and the list of channel names
+    """
+    with open(sidecar_path(path)) as f:
+        meta = json.load(f)
+    return np.load(path, mmap_mode="r"), meta["channels"]
+
+
+class HandshakeTracer:
+    """
+    Records every req/ack transition on a set of channels to a trace file.
+    :param dut: The DUT handle
+    :param path: Path of the ``.npy`` file the trace is written to
+    :param channels: Names of channels to trace, given by the hierarchical prefix of their signals, e.g. ``io_in`` or
+                     ``RF0.io_out1``
+    :param instances: Names of component instances, all of whose handshake ports are traced
+    :param chunk: Number of events buffered in memory before they are written to disk
+    """
+
+    def __init__(self, dut, path, channels=(), instances=(), chunk=1 << 16):
+        self.path = path
+        self.channels = list(channels)
+        for instance in instances:
+            self.channels += channels_of(dut, instance)
+        self.count = 0
+        self._buf = np.empty(chunk, dtype=EVENT_DTYPE)
+        self._n = 0
+        self._raw = open(path + ".raw", "wb")
+        self._tasks = []
+        for i, channel in enumerate(self.channels):
+            self._tasks.append(cocotb.start_soon(self._watch(resolve(dut, f"{channel}_req"), 2 * i + REQ)))
+            self._tasks.append(cocotb.start_soon(self._watch(resolve(dut, f"{channel}_ack"), 2 * i + ACK)))
+
+    async def _watch(self, handle, signal):
+        async for _ in toggles(handle):
+            self._record(signal)
+
+    def _record(self, signal):
+        self._buf[self._n] = (int(get_sim_time("ps")), signal)
+        self._n += 1
+        if self._n == len(self._buf):
+            self._flush()
+
+    def _flush(self):
+        self._buf[:self._n].tofile(self._raw)
+        self.count += self._n
+        self._n = 0
+
+    def close(self):
+        """Stops tracing and writes the trace file and its channel names"""
+        for task in self._tasks:
+            task.kill()
+        self._flush()
+        self._raw.close()
+        # Copy the raw events into a .npy file, chunk by chunk
+        out = np.lib.format.open_memmap(self.path, mode="w+", dtype=EVENT_DTYPE, shape=(self.count,))
+        if self.count:
+            raw = np.memmap(self.path + ".raw", dtype=EVENT_DTYPE, mode="r", shape=(self.count,))
+            step = len(self._buf)
+            for i in range(0, self.count, step):
+                out[i:i + step] = raw[i:i + step]
+            del raw
+        out.flush()
+        del out
+        os.remove(self.path + ".raw")
+        with open(sidecar_path(self.path), "w") as f:
+            json.dump({"channels": self.channels, "time_unit": "ps", "events": self.count}, f, indent=2)
@@ -0,0 +1,210 @@
+"""
+Analysis of the handshake traces written by :class:`click_tb.trace.HandshakeTracer`.
+
+Channels are grouped into stages by their component instance: ``RF0.io_in``, ``RF0.io_out1`` and ``RF0.io_out2``
+form the stage ``RF0``. Ports named ``io_out*`` are outputs of a stage, all other ports are inputs. The input events
+of a stage are the requests on its inputs and the acknowledges on its outputs, and its output events are the
+requests on its outputs and acknowledges on its inputs.
+
+- The latency of an output event is the time since the last input event of the same stage preceding it,
+  i.e. the time the stage took to react to the last of the events it was waiting for.
+- The critical cycle is found by starting from an event in the middle of the trace and repeatedly stepping back
+  to the last input event of the stage producing it, until an event is visited again.
+  The time between the two visits is the period of the cycle, and the steps show how it is made up.
+
+Signals of different channels which are connected to each other (e.g. ``RF0.io_out1`` and ``CL0.io_in``) have
+identical transitions and are merged into a single net. Traced ports which are not part of a traced instance,
+such as the top-level ports, are driven by the environment.
+
+Running this module prints a report of a trace::
+
+    python3 -m click_tb.trace_analysis trace.npy
+"""
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from click_tb.trace import ACK, REQ, load_trace
+
+BARS = " ▁▂▃▄▅▆▇█"
+
+
+@dataclass
+class Stage:
+    """A component instance, with the nets of its input and output events"""
+    name: str
+    inputs: List[int] = field(default_factory=list)
+    outputs: List[int] = field(default_factory=list)
+
+
+@dataclass
+class Trace:
+    """The transitions of a trace, grouped into nets and stages. Times are in ps"""
+    channels: List[str]
+    net_times: List[np.ndarray]
+    net_names: List[str]
+    net_of: List[Optional[int]]
+    stages: List[Stage]
+
+
+def signal_times(events, n_signals):
+    """Splits the events of a trace into the transition times of each signal"""
+    order = np.argsort(events["signal"], kind="stable")
+    signals = events["signal"][order]
+    times = events["time"][order].astype(np.int64)
+    bounds = np.searchsorted(signals, np.arange(n_signals + 1))
+    return [times[bounds[i]:bounds[i + 1]] for i in range(n_signals)]
+
+
+def analyze(events, channels) -> Trace:
+    """Groups the signals of a trace into nets and the channels into stages"""
+    times = signal_times(events, 2 * len(channels))
+    net_times, net_names, net_of = [], [], []
+    by_key: Dict[bytes, int] = {}
+    for sig, t in enumerate(times):
+        if len(t) == 0:
+            net_of.append(None)
+            continue
+        key = t.tobytes()
+        if key not in by_key:
+            by_key[key] = len(net_times)
+            net_times.append(t)
+            net_names.append(f"{channels[sig // 2]}_{'req' if sig % 2 == REQ else 'ack'}")
+        net_of.append(by_key[key])
+
+    stages: Dict[str, Stage] = {}
+    for i, channel in enumerate(channels):
+        if "." not in channel:
+            continue
+        instance, port = channel.rsplit(".", 1)
+        stage = stages.setdefault(instance, Stage(instance))
+        req, ack = net_of[2 * i + REQ], net_of[2 * i + ACK]
+        if port.startswith("io_out"):
+            ins, outs = [ack], [req]
+        else:
+            ins, outs = [req], [ack]
+        stage.inputs += [n for n in ins if n is not None]
+        stage.outputs += [n for n in outs if n is not None]
+    # A net which is both an input and an output of a stage passes straight through it
+    for stage in stages.values():
+        through = set(stage.inputs) & set(stage.outputs)
+        stage.inputs = sorted(set(stage.inputs) - through)
+        stage.outputs = sorted(set(stage.outputs) - through)
+    return Trace(channels, net_times, net_names, net_of, list(stages.values()))
+
+
+def stage_latencies(trace: Trace, stage: Stage) -> np.ndarray:
+    """Returns the latency (ps) of every output event of a stage since the last input event preceding it"""
+    if not stage.inputs or not stage.outputs:
+        return np.empty(0, dtype=np.int64)
+    inputs = np.sort(np.concatenate([trace.net_times[n] for n in stage.inputs]))
+    latencies = []
+    for n in stage.outputs:
+        out = trace.net_times[n]
+        idx = np.searchsorted(inputs, out, side="right") - 1
+        valid = idx >= 0
+        latencies.append(out[valid] - inputs[idx[valid]])
+    return np.concatenate(latencies)
+
+
+def latency_histograms(trace: Trace, bins=16):
+    """Returns the latency statistics and histogram (ns) of every stage of a trace"""
+    result = {}
+    for stage in trace.stages:
+        lat = stage_latencies(trace, stage) / 1000
+        if len(lat) == 0:
+            continue
+        counts, edges = np.histogram(lat, bins=bins)
+        result[stage.name] = {
+            "events": int(len(lat)),
+            "mean_ns": float(lat.mean()),
+            "p50_ns": float(np.percentile(lat, 50)),
+            "p90_ns": float(np.percentile(lat, 90)),
+            "max_ns": float(lat.max()),
+            "histogram": counts.tolist(),
+            "bin_edges_ns": edges.tolist(),
+        }
+    return result
+
+
+def critical_cycle(trace: Trace, start_time=None, max_steps=10000):
+    """
+    Finds the cycle of last-arriving events through the stages of a trace.
+    :param start_time: Time (ps) to start stepping back from. Defaults to the middle of the trace
+    :return: Dict with the period of the cycle and its steps in forward order, each step holding the stage,
+             the event it produced and the time it took. None if the walk ends at the environment
+    """
+    producer = {}
+    for stage in trace.stages:
+        for n in stage.outputs:
+            producer.setdefault(n, stage)
+    candidates = [n for n in producer if len(trace.net_times[n])]
+    if not candidates:
+        return None
+    if start_time is None:
+        start_time = (min(t[0] for t in trace.net_times) + max(t[-1] for t in trace.net_times)) // 2
+
+    # The latest event produced by a stage at or before the start time
+    net, time = None, -1
+    for n in candidates:
+        i = np.searchsorted(trace.net_times[n], start_time, side="right") - 1
+        if i >= 0 and trace.net_times[n][i] > time:
+            net, time = n, int(trace.net_times[n][i])
+    path, seen = [], {}
+    while net is not None and len(path) < max_steps:
+        if net in seen:
+            cycle = path[seen[net]:]
+            steps = [{"stage": stage, "event": trace.net_names[n], "delay_ns": (t - t_prev) / 1000}
+                     for (n, t, stage, t_prev) in reversed(cycle)]
+            return {"period_ns": (cycle[0][1] - time) / 1000, "steps": steps}
+        seen[net] = len(path)
+        stage = producer.get(net)
+        if stage is None:
+            return None
+        # Step back to the last input event of the stage
+        prev, prev_time = None, -1
+        for n in stage.inputs:
+            i = np.searchsorted(trace.net_times[n], time, side="right") - 1
+            if i >= 0 and trace.net_times[n][i] > prev_time:
+                prev, prev_time = n, int(trace.net_times[n][i])
+        path.append((net, time, stage.name, prev_time))
+        net, time = prev, prev_time
+    return None
+
+
+def histogram_bars(counts):
+    """Renders histogram counts as a line of bars"""
+    top = max(counts) or 1
+    return "".join(BARS[int(round(c / top * (len(BARS) - 1)))] for c in counts)
+
+
+def report(path, bins=16):
+    """Prints the per-stage latencies and the critical cycle of a trace, and returns them"""
+    events, channels = load_trace(path)
+    trace = analyze(events, channels)
+    stats = latency_histograms(trace, bins)
+    cycle = critical_cycle(trace)
+
+    print(f"{len(events)} events on {len(channels)} channels\n")
+    print(f"{'STAGE':<10}{'EVENTS':>9}{'MEAN':>9}{'P50':>9}{'P90':>9}{'MAX':>9}  HISTOGRAM (ns)")
+    for name, s in stats.items():
+        edges = s["bin_edges_ns"]
+        print(f"{name:<10}{s['events']:>9}{s['mean_ns']:>9.2f}{s['p50_ns']:>9.2f}{s['p90_ns']:>9.2f}{s['max_ns']:>9.2f}"
+              f"  {edges[0]:.1f} {histogram_bars(s['histogram'])} {edges[-1]:.1f}")
+    if cycle is None:
+        print("\nNo critical cycle: the last-arriving events lead back to the environment")
+    else:
+        print(f"\nCritical cycle, period {cycle['period_ns']:.2f} ns")
+        for step in cycle["steps"]:
+            print(f"  {step['stage']:<10}{step['event']:<24}{step['delay_ns']:>8.2f} ns")
+    return {"stages": stats, "critical_cycle": cycle}
+
+
+if __name__ == "__main__":
+    result = report(sys.argv[1])
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w") as f:
+            json.dump(result, f, indent=2)
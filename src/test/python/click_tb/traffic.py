@@ -0,0 +1,149 @@
+"""
+Traffic models for the producers and consumers attached to the ports of a DUT.
+
+A :class:`Traffic` draws the time a producer waits between sending tokens, or the time a consumer waits before
+acknowledging a token. It is passed as the ``gap`` of a :class:`click_tb.handshake.HandshakeSource` or the ``delay``
+of a :class:`click_tb.handshake.HandshakeSink`::
+
+    src = HandshakeSource(dut, "io_in", gap=Traffic(burst=16, idle=100))
+    sink = HandshakeSink(dut, "io_out", delay=Traffic.parse("gap=5,stall=0.05,stall_time=50"))
+
+:class:`Occupancy` measures how many tokens are inside the DUT over time, from the acknowledges of its ports.
+"""
+import random
+from collections import Counter
+
+import cocotb
+from cocotb.utils import get_sim_time
+
+from click_tb.handshake import toggles
+
+DISTRIBUTIONS = ("constant", "uniform", "exponential")
+
+
+class Traffic:
+    """
+    Random waiting times of a producer or consumer, in ns. Tokens come in bursts of `burst` tokens, `gap` ns apart.
+    Between bursts, the port is idle for `idle` ns on average. Any token may additionally be stalled, with
+    probability `stall`, for `stall_time` ns on average. The idle and stall times are exponentially distributed.
+    :param gap: Mean time between the tokens of a burst
+    :param jitter: Distribution of the gaps within a burst: ``constant``, ``uniform`` (from 0 to twice the mean)
+                   or ``exponential``
+    :param burst: Number of tokens in a burst
+    :param idle: Mean time between bursts
+    :param stall: Probability that a token is stalled
+    :param stall_time: Mean time a token is stalled for
+    :param seed: Seed of the random generator
+    """
+
+    def __init__(self, gap=0.0, jitter="constant", burst=1, idle=0.0, stall=0.0, stall_time=0.0, seed=None):
+        if jitter not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{jitter}', expected one of {', '.join(DISTRIBUTIONS)}")
+        if burst < 1:
+            raise ValueError("A burst holds at least one token")
+        self.gap = gap
+        self.jitter = jitter
+        self.burst = burst
+        self.idle = idle
+        self.stall = stall
+        self.stall_time = stall_time
+        self.rng = random.Random(seed)
+        self.count = 0
+
+    @classmethod
+    def rate(cls, rate, jitter="exponential", seed=None):
+        """A port handling `rate` tokens per ns on average, were the DUT infinitely fast"""
+        return cls(gap=1 / rate, jitter=jitter, seed=seed)
+
+    @classmethod
+    def parse(cls, spec, seed=None):
+        """
+        Creates a traffic model from a string of comma-separated settings, e.g. ``gap=2,jitter=uniform,burst=8``.
+        An empty string gives a port running at full speed
+        """
+        kwargs = {}
+        for item in filter(None, (s.strip() for s in spec.split(","))):
+            key, _, value = item.partition("=")
+            if key == "jitter":
+                kwargs[key] = value
+            elif key in ("burst", "seed"):
+                kwargs[key] = int(value)
+            elif key in ("gap", "idle", "stall", "stall_time"):
+                kwargs[key] = float(value)
+            else:
+                raise ValueError(f"Unknown traffic setting '{key}'")
+        kwargs.setdefault("seed", seed)
+        return cls(**kwargs)
+
+    def mean(self):
+        """The mean time waited per token"""
+        return self.gap + self.idle / self.burst + self.stall * self.stall_time
+
+    def describe(self):
+        """The settings of the model, for recording along with the results it was measured with"""
+        return {"gap_ns": self.gap, "jitter": self.jitter, "burst": self.burst, "idle_ns": self.idle,
+                "stall": self.stall, "stall_time_ns": self.stall_time}
+
+    def _draw(self, mean, dist):
+        if mean <= 0:
+            return 0.0
+        if dist == "constant":
+            return mean
+        if dist == "uniform":
+            return self.rng.uniform(0, 2 * mean)
+        return self.rng.expovariate(1 / mean)
+
+    def __call__(self):
+        """Returns the time to wait before the next token, rounded to ps"""
+        self.count += 1
+        t = self._draw(self.gap, self.jitter)
+        if self.count % self.burst == 0:
+            t += self._draw(self.idle, "exponential")
+        if self.stall and self.rng.random() < self.stall:
+            t += self._draw(self.stall_time, "exponential")
+        return round(t, 3)
+
+
+class Occupancy:
+    """
+    Time-weighted number of tokens inside the DUT. A token enters when an input port acknowledges it, and leaves
+    when the consumer on an output port acknowledges it
+    :param dut: The DUT handle
+    :param inputs: Prefixes of the ports through which tokens enter, e.g. ``["io_in"]``
+    :param outputs: Prefixes of the ports through which tokens leave, e.g. ``["io_out"]``
+    :param initial: Number of tokens inside the DUT after reset, e.g. for output registers with ``ro=true``
+    """
+
+    def __init__(self, dut, inputs, outputs, initial=0):
+        self.level = initial
+        self.time = Counter()
+        self.last = get_sim_time("ps")
+        self._tasks = [cocotb.start_soon(self._watch(getattr(dut, f"{p}_ack"), 1)) for p in inputs]
+        self._tasks += [cocotb.start_soon(self._watch(getattr(dut, f"{p}_ack"), -1)) for p in outputs]
+
+    def _update(self, delta):
+        now = get_sim_time("ps")
+        self.time[self.level] += now - self.last
+        self.last = now
+        self.level += delta
+
+    async def _watch(self, ack, delta):
+        async for _ in toggles(ack):
+            self._update(delta)
+
+    def stop(self):
+        """Stops measuring, accounting for the time since the last change"""
+        self._update(0)
+        for task in self._tasks:
+            task.kill()
+
+    def summary(self):
+        """Returns the mean and maximum occupancy, and the fraction of time spent at each occupancy"""
+        total = sum(self.time.values())
+        if total == 0:
+            return {}
+        return {
+            "occupancy_mean": sum(level * t for level, t in self.time.items()) / total,
+            "occupancy_max": max(level for level, t in self.time.items() if t > 0),
+            "occupancy_time_fraction": {str(level): self.time[level] / total for level in sorted(self.time)},
+        }
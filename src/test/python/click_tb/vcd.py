@@ -0,0 +1,295 @@
+"""
+Streaming analysis of the handshakes in a waveform dump.
+
+Waveforms dumped with ``DUMP=1`` (see ``sim.mk``) hold every req/ack transition of the design. This module reads a
+dump as a stream of value changes, one line at a time, so memory use does not depend on the length of the dump.
+Channels are found by name: every pair of ``<prefix>_req`` and ``<prefix>_ack`` signals in the same scope is a
+channel, named by its scope below the top module, e.g. ``io_in`` or ``RF0.io_out1``. For every channel it computes
+
+- the number of requests and of completed handshakes (acknowledges)
+- the interval between consecutive requests: mean, standard deviation, minimum and maximum
+- the stall time, during which a token was on the channel waiting to be acknowledged (req != ack),
+  and the idle time, during which the channel was empty (req == ack)
+- the utilization, the fraction of the time with a token on the channel, and the throughput
+
+VCD files are read directly, also when gzipped (``.vcd.gz``). FST files are converted on the fly by ``fst2vcd``,
+which comes with GTKWave::
+
+    PYTHONPATH=src/test/python python3 -m click_tb.vcd src/test/python/tests/gcd/dump.fst
+    PYTHONPATH=src/test/python python3 -m click_tb.vcd dump.vcd --channel "RF*" --start 100 --json channels.json
+
+All times are in ns.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import gzip
+import json
+import math
+import re
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+UNITS_PS = {"s": 10 ** 12, "ms": 10 ** 9, "us": 10 ** 6, "ns": 10 ** 3, "ps": 1, "fs": 10 ** -3}
+
+
+@contextmanager
+def open_dump(path: str) -> Iterator[TextIO]:
+    """Opens a dump as a text stream of VCD, converting FST files with ``fst2vcd``"""
+    if path.endswith(".fst"):
+        if shutil.which("fst2vcd") is None:
+            raise RuntimeError("Reading FST dumps requires fst2vcd (part of GTKWave), or dump with DUMP_FORMAT=vcd")
+        proc = subprocess.Popen(["fst2vcd", path], stdout=subprocess.PIPE, text=True, bufsize=1 << 20)
+        try:
+            yield proc.stdout
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+    elif path.endswith(".gz"):
+        with gzip.open(path, "rt") as f:
+            yield f
+    else:
+        with open(path, buffering=1 << 20) as f:
+            yield f
+
+
+def header(lines: Iterator[str]) -> Tuple[int, Dict[str, List[str]]]:
+    """
+    Reads the header of a VCD stream, up to ``$enddefinitions``
+    :return: The length of a time step in ps, and the hierarchical names of the signals of each identifier code.
+             Names leave out the top scope, e.g. ``RF0.io_out1_req``
+    """
+    timescale, scopes, signals = 1, [], {}
+    tokens: List[str] = []
+
+    def statement():
+        """The tokens of the next statement, up to its $end"""
+        body = []
+        while True:
+            while not tokens:
+                line = next(lines, None)
+                if line is None:
+                    raise ValueError("The dump ends in its header")
+                tokens.extend(line.split())
+            token = tokens.pop(0)
+            if token == "$end":
+                return body
+            body.append(token)
+
+    while True:
+        while not tokens:
+            line = next(lines, None)
+            if line is None:
+                raise ValueError("The dump ends in its header")
+            tokens.extend(line.split())
+        keyword = tokens.pop(0)
+        if keyword == "$enddefinitions":
+            statement()
+            return timescale, signals
+        body = statement()
+        if keyword == "$timescale":
+            m = re.fullmatch(r"(\d+)\s*([munpf]?s)", "".join(body))
+            if not m:
+                raise ValueError(f"Unknown timescale {' '.join(body)}")
+            timescale = int(m.group(1)) * UNITS_PS[m.group(2)]
+        elif keyword == "$scope":
+            scopes.append(body[1])
+        elif keyword == "$upscope":
+            scopes.pop()
+        elif keyword == "$var":
+            # $var <type> <size> <code> <name> [<range>]
+            name = ".".join(scopes[1:] + [body[3]])
+            signals.setdefault(body[2], []).append(name)
+
+
+class Changes:
+    """
+    Iterates over the (time, code, value) of every change of the scalar signals with the given identifier codes, in
+    steps of the timescale. The value is None when it is unknown (x or z). :attr:`time` holds the last timestamp parsed,
+    also of changes of other signals, which once the iteration is done is the end of the dump
+    """
+
+    def __init__(self, lines: Iterable[str], codes: Dict[str, object]):
+        self.lines = lines
+        self.codes = codes
+        self.time = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, str, Optional[int]]]:
+        for line in self.lines:
+            c = line[:1]
+            if c == "#":
+                self.time = int(line[1:])
+            elif c and c in "01xzXZ":
+                code = line[1:].strip()
+                if code in self.codes:
+                    yield self.time, code, 1 if c == "1" else 0 if c == "0" else None
+            # Vectors, reals and commands such as $dumpvars carry no handshake signals
+
+
+class ChannelStats:
+    """The handshake statistics of a single channel, updated one transition at a time"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.req: Optional[int] = None
+        self.ack: Optional[int] = None
+        self.requests = 0
+        self.handshakes = 0
+        self.stall = 0
+        self.idle = 0
+        self.last: Optional[int] = None
+        self.last_req: Optional[int] = None
+        self.intervals = 0
+        self.interval_sum = 0
+        self.interval_sq = 0
+        self.interval_min: Optional[int] = None
+        self.interval_max: Optional[int] = None
+
+    def _account(self, time: int, start: int):
+        """Adds the time since the last transition to the stall or idle time"""
+        if self.last is not None and self.req is not None and self.ack is not None and time > start:
+            elapsed = time - max(self.last, start)
+            if self.req != self.ack:
+                self.stall += elapsed
+            else:
+                self.idle += elapsed
+        self.last = time
+
+    def update(self, time: int, is_ack: bool, value: Optional[int], start: int = 0):
+        """Applies a transition of req or ack at `time`. Only the time from `start` on is accounted for"""
+        self._account(time, start)
+        old = self.ack if is_ack else self.req
+        if is_ack:
+            self.ack = value
+        else:
+            self.req = value
+        if old is None or value is None or old == value or time < start:
+            return
+        if is_ack:
+            self.handshakes += 1
+            return
+        self.requests += 1
+        if self.last_req is not None:
+            interval = time - self.last_req
+            self.intervals += 1
+            self.interval_sum += interval
+            self.interval_sq += interval * interval
+            self.interval_min = interval if self.interval_min is None else min(self.interval_min, interval)
+            self.interval_max = interval if self.interval_max is None else max(self.interval_max, interval)
+        self.last_req = time
+
+    def finish(self, time: int, start: int = 0):
+        """Accounts for the time from the last transition until the end of the dump"""
+        self._account(time, start)
+
+    def summary(self, ps: float) -> dict:
+        """The statistics of the channel, with times converted to ns using the length `ps` of a time step"""
+        ns = ps / 1000
+        observed = self.stall + self.idle
+        result = {
+            "channel": self.name,
+            "requests": self.requests,
+            "handshakes": self.handshakes,
+            "stall_ns": self.stall * ns,
+            "idle_ns": self.idle * ns,
+            "utilization": self.stall / observed if observed else 0.0,
+            "throughput_tokens_per_ns": self.handshakes / (observed * ns) if observed else 0.0,
+        }
+        if self.intervals:
+            mean = self.interval_sum / self.intervals
+            var = max(self.interval_sq / self.intervals - mean * mean, 0)
+            result.update({
+                "interval_ns": mean * ns,
+                "interval_std_ns": math.sqrt(var) * ns,
+                "interval_min_ns": self.interval_min * ns,
+                "interval_max_ns": self.interval_max * ns,
+            })
+        return result
+
+
+def find_channels(signals: Dict[str, List[str]], patterns: Sequence[str] = ()) -> Dict[str, Tuple[str, str]]:
+    """
+    Finds the channels of a dump: pairs of ``<prefix>_req`` and ``<prefix>_ack`` signals
+    :param signals: Names of the signals of each identifier code
+    :param patterns: Glob patterns of the channels to keep, e.g. ``RF*``. All channels are kept if none are given
+    :return: The req and ack identifier codes of every channel, by name
+    """
+    codes = {name: code for code, names in signals.items() for name in names}
+    channels = {}
+    for name, code in codes.items():
+        if not name.endswith("_req") or name[:-4] + "_ack" not in codes:
+            continue
+        prefix = name[:-4]
+        if patterns and not any(fnmatch.fnmatchcase(prefix, p) for p in patterns):
+            continue
+        channels[prefix] = (code, codes[prefix + "_ack"])
+    return dict(sorted(channels.items()))
+
+
+def analyze(path: str, patterns: Sequence[str] = (), start: float = 0.0) -> List[dict]:
+    """
+    Computes the handshake statistics of every channel in a dump, in one pass
+    :param path: Path of the ``.vcd``, ``.vcd.gz`` or ``.fst`` dump
+    :param patterns: Glob patterns of the channels to analyze
+    :param start: Time in ns from which on handshakes are counted, e.g. to skip the reset
+    """
+    with open_dump(path) as f:
+        lines = iter(f)
+        ps, signals = header(lines)
+        channels = find_channels(signals, patterns)
+        stats = {name: ChannelStats(name) for name in channels}
+        # Channels between two components appear in both of them, sharing their identifier codes
+        watch: Dict[str, List[Tuple[ChannelStats, bool]]] = {}
+        for name, (req, ack) in channels.items():
+            watch.setdefault(req, []).append((stats[name], False))
+            watch.setdefault(ack, []).append((stats[name], True))
+        begin = math.ceil(start * 1000 / ps)
+        dump = Changes(lines, watch)
+        for time, code, value in dump:
+            for channel, is_ack in watch[code]:
+                channel.update(time, is_ack, value, begin)
+        # Idle time after the last handshake counts up to the end of the dump
+        for channel in stats.values():
+            channel.finish(dump.time, begin)
+    return [s.summary(ps) for s in stats.values()]
+
+
+def report(results: Sequence[dict]) -> str:
+    lines = [f"{'CHANNEL':<24}{'HANDSHAKES':>11}{'INTERVAL (ns)':>15}{'MIN':>9}{'MAX':>9}{'STALL (ns)':>13}{'UTIL':>7}"]
+    for r in results:
+        interval = (f"{r['interval_ns']:>15.3f}{r['interval_min_ns']:>9.3f}{r['interval_max_ns']:>9.3f}"
+                    if "interval_ns" in r else f"{'-':>15}{'-':>9}{'-':>9}")
+        lines.append(f"{r['channel']:<24}{r['handshakes']:>11}{interval}{r['stall_ns']:>13.1f}{r['utilization']:>7.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Handshake statistics of every channel in a waveform dump")
+    parser.add_argument("dump", help="The .vcd, .vcd.gz or .fst file")
+    parser.add_argument("--channel", action="append", default=[],
+                        help="Glob pattern of the channels to analyze, e.g. 'RF*'. May be repeated")
+    parser.add_argument("--start", type=float, default=0.0, help="Ignore handshakes before this time (ns)")
+    parser.add_argument("--json", help="Write the statistics to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        results = analyze(args.dump, args.channel, args.start)
+    except (OSError, RuntimeError, ValueError) as e:
+        parser.error(str(e))
+    if not results:
+        print("No channels found", file=sys.stderr)
+        return 1
+    print(report(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+###############################################################################
+# Shared simulation settings for the cocotb test directories.
+# A test Makefile sets TOPLEVEL and MODULE and then includes this file
+# instead of including cocotb's Makefile.sim directly.
+###############################################################################
+
+SIM ?= icarus
+TESTBENCH_DIR := $(abspath $(dir $(lastword $(MAKEFILE_LIST))))
+
+# Make the shared testbench package (click_tb) importable from the test modules
+export PYTHONPATH := $(TESTBENCH_DIR):$(PYTHONPATH)
+
+# Directory holding the generated Verilog files and ClickConfig.json
+export GEN_DIR ?= $(WORKDIR)/gen
+# Directory benchmarks write their JSON results to
+export BENCH_DIR ?= $(WORKDIR)/bench
+
+###############################################################################
+# Waveform dumping. Off by default, so regressions pay no dump cost.
+#   DUMP=1              Dump waveforms of the simulation
+#   DUMP_FORMAT=fst     Dump format: fst (default), vcd or lxt2. Written to dump.<format>
+#   DUMP_SCOPE=<scope>  Hierarchical scope to dump, e.g. GCD.RF0. Defaults to the toplevel
+#   DUMP_DEPTH=<n>      Number of levels below the scope to dump. 0 (default) dumps all of them
+#   DUMP_START=<t>      Start dumping at time t, in simulator time units
+#   DUMP_STOP=<t>       Stop dumping at time t, in simulator time units
+# With Icarus, everything but DUMP_SCOPE is selected with plusargs at run time and does not
+# cause a recompile. Verilator needs a build with tracing support when DUMP=1.
+###############################################################################
+DUMP ?= 0
+DUMP_FORMAT ?= fst
+DUMP_DEPTH ?= 0
+
+ifeq ($(DUMP),1)
+PLUSARGS += +dump_waves +dump_file=dump.$(DUMP_FORMAT) +dump_depth=$(DUMP_DEPTH)
+ifneq ($(DUMP_START),)
+PLUSARGS += +dump_start=$(DUMP_START)
+endif
+ifneq ($(DUMP_STOP),)
+PLUSARGS += +dump_stop=$(DUMP_STOP)
+endif
+ifeq ($(SIM),icarus)
+ifneq ($(DUMP_FORMAT),vcd)
+# vvp selects the dump format with an extended argument following the design file
+PLUSARGS += -$(DUMP_FORMAT)
+endif
+endif
+endif
+
+ifneq ($(DUMP_SCOPE),)
+COMPILE_ARGS += -DDUMP_SCOPE=$(DUMP_SCOPE)
+endif
+
+###############################################################################
+# Profiling. PROFILE=1 records the simulator callbacks, coroutine resumptions and Python
+# time of every test in results.xml, PROFILE=coroutines also the time of every coroutine
+# function. See click_tb/profiling.py.
+###############################################################################
+ifneq ($(filter 1 coroutines,$(PROFILE)),)
+MODULE := $(MODULE),click_tb.profiling
+export PROFILE
+endif
+
+###############################################################################
+# Verilator 5 (SIM=verilator). The delay elements and testbenches rely on delays
+# and arbitrary event controls, which require --timing.
+###############################################################################
+ifeq ($(SIM),verilator)
+COCOTB_HDL_TIMEUNIT ?= 1ns
+COCOTB_HDL_TIMEPRECISION ?= 1ps
+EXTRA_ARGS += --timing --timescale $(COCOTB_HDL_TIMEUNIT)/$(COCOTB_HDL_TIMEPRECISION)
+# Chisel output trips a number of lint warnings, and the mutexes are combinational loops by design
+EXTRA_ARGS += -Wno-fatal -Wno-UNOPTFLAT -Wno-WIDTH -Wno-DECLFILENAME
+ifeq ($(DUMP),1)
+# Verilator only dumps waveforms from models compiled with tracing support
+EXTRA_ARGS += $(if $(filter vcd,$(DUMP_FORMAT)),--trace,--trace-fst)
+endif
+endif
+
+###############################################################################
+# Generated sources. Generate.scala writes $(GEN_DIR)/<target>.mk for each target, adding its
+# Verilog files to VERILOG_SOURCES. The target is (re)generated with sbt when that file is
+# missing or when any of the Scala sources the target is built from has changed.
+#   GEN_TARGET=<name>   Generation target of the test. Defaults to TOPLEVEL
+###############################################################################
+GEN_TARGET ?= $(TOPLEVEL)
+SBT ?= sbt
+
+ifeq ($(filter clean,$(MAKECMDGOALS)),)
+-include $(GEN_DIR)/$(GEN_TARGET).mk
+# The dependency rule in the included file must not become the default goal
+.DEFAULT_GOAL :=
+endif
+
+# Test directories run in parallel may all find their targets stale at once, e.g. after a change to a shared
+# source. Their sbt runs would compete for the same project, so they are serialized with a lock where flock exists
+GEN_LOCK := $(if $(shell command -v flock 2>/dev/null),flock $(GEN_DIR)/.lock)
+
+# Variants are regenerated with the arguments recorded in their makefile (GEN_ARGS)
+$(GEN_DIR)/%.mk:
+	mkdir -p $(GEN_DIR)
+	cd $(WORKDIR) && $(GEN_LOCK) $(SBT) "runMain Generate $(or $(GEN_ARGS),$*)"
+
+###############################################################################
+# Shared simulation builds. Unless SIM_BUILD is set, simulations are compiled in
+# $(SIM_CACHE)/<hash>, where the hash covers the Verilog sources and all compile settings.
+# Test directories simulating the same design share the build, and a rerun where nothing
+# changed skips compilation. See click_tb/simcache.py.
+###############################################################################
+SIM_CACHE ?= $(WORKDIR)/sim_cache
+PYTHON ?= python3
+
+ifeq ($(origin SIM_BUILD),undefined)
+ifneq ($(strip $(VERILOG_SOURCES)),)
+SIM_SETTINGS := $(SIM) $(TOPLEVEL_LANG) $(TOPLEVEL) $(COMPILE_ARGS) $(EXTRA_ARGS) $(COCOTB_HDL_TIMEUNIT) $(COCOTB_HDL_TIMEPRECISION)
+SIM_BUILD := $(shell $(PYTHON) $(TESTBENCH_DIR)/click_tb/simcache.py $(SIM_CACHE) "$(SIM_SETTINGS)" $(VERILOG_SOURCES))
+VERILOG_SOURCES := $(addprefix $(SIM_BUILD)/src/,$(notdir $(VERILOG_SOURCES)))
+endif
+endif
+SIM_BUILD ?= sim_build
+
+include $(shell cocotb-config --makefiles)/Makefile.sim
@@ -1,6 +1,13 @@
 import cocotb
 from cocotb.triggers import Timer
 from cocotb.triggers import Edge
+from click_tb.soak import ArbiterPort, ArbiterSink, ContentionStats, soak
+import os
+import random
+
+# Number of grants made by the contention soak. Raise to millions for long soaks, e.g. SOAK_EVENTS=1000000
+SOAK_EVENTS = int(os.environ.get("SOAK_EVENTS", 2000))
+SEED = int(os.environ.get("SEED", 1))
 
 
 @cocotb.test()
@@ -52,3 +59,13 @@ async def arbiter_test(dut):
     assert dut.io_in2_ack.value == 1
     assert dut.io_out_req.value == 1
     assert dut.io_out_data.value == 43
+
+
+@cocotb.test()
+async def arbiter_soak(dut):
+    """It should forward the tokens of both producers one at a time under random contention"""
+    rng = random.Random(SEED)
+    stats = ContentionStats()
+    ports = [ArbiterPort(dut, stats, port, rng) for port in (0, 1)]
+    ArbiterSink(dut, stats, ports, rng)
+    await soak(dut, ports, SOAK_EVENTS, rng)
@@ -0,0 +1,49 @@
+import cocotb
+from cocotb.triggers import Timer
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+import os
+import random
+
+# Number of tokens sent by every producer in the contention test
+TOKENS = int(os.environ.get("TOKENS", 50))
+SEED = int(os.environ.get("SEED", 1))
+
+
+def ports(dut):
+    """A source on every input of the arbiter, and a sink on its output"""
+    n = 0
+    while hasattr(dut, f"io_in_{n}_req"):
+        n += 1
+    return [HandshakeSource(dut, f"io_in_{i}") for i in range(n)], HandshakeSink(dut, "io_out")
+
+
+@cocotb.test()
+async def each_input(dut):
+    """It should forward a token from every input on its own"""
+    srcs, sink = ports(dut)
+    await reset(dut, *srcs, sink)
+
+    for i, src in enumerate(srcs):
+        send = cocotb.start_soon(src.send(i))
+        await sink.receive_expect(i)
+        await send
+
+
+@cocotb.test()
+async def contention(dut):
+    """It should forward every token exactly once when all producers request at nearly the same time"""
+    rng = random.Random(SEED)
+    srcs, sink = ports(dut)
+    await reset(dut, *srcs, sink)
+
+    async def produce(i, src):
+        for _ in range(TOKENS):
+            # The zero-delay mutexes cannot resolve requests made in the same simulator step
+            await Timer(rng.randint(1, 500), "ps")
+            await src.send(i)
+
+    for i, src in enumerate(srcs):
+        cocotb.start_soon(produce(i, src))
+    received = await sink.receive_many(TOKENS * len(srcs))
+    counts = [received.count(i) for i in range(len(srcs))]
+    assert counts == [TOKENS] * len(srcs), f"Tokens received from each input: {counts}"
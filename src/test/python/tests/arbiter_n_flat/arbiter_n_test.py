@@ -0,0 +1 @@
+../arbiter_n/arbiter_n_test.py
\ No newline at end of file
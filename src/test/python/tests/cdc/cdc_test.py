@@ -1,7 +1,21 @@
 import cocotb
 from cocotb.triggers import Timer
 from cocotb.clock import Clock
-from cocotb.triggers import Edge
+from cocotb.triggers import Edge, ReadOnly, RisingEdge
+
+
+async def send_byte(dut, byte):
+    """Waits for the producer to be ready, then hands it a byte"""
+    await RisingEdge(dut.clock)
+    while not dut.io_ready.value:
+        await RisingEdge(dut.clock)
+    dut.io_din.value = byte
+    dut.io_valid.value = 1
+    await RisingEdge(dut.clock)
+    dut.io_valid.value = 0
+    # The producer stays ready until the valid signal has passed its synchronizer
+    while dut.io_ready.value:
+        await RisingEdge(dut.clock)
 
 
 @cocotb.test()
@@ -15,18 +29,38 @@ async def cross_clock_domain(dut):
     # First values to transmit
     await Timer(15, "ns")
     dut.reset.value = 0
-    dut.io_din.value = 0xab
-    dut.io_valid.value = 1
-    await Timer(10, "ns")
-    dut.io_valid.value = 0
-    await Timer(2000, "ns")
+    await send_byte(dut, 0xab)
+    await Edge(dut.io_done)
+    await ReadOnly()
     assert dut.io_dout.value == 0xab
 
     # Second set of values to transmit
-    dut.io_din.value = 0xf7
-    dut.io_valid.value = 1
-    await Timer(10, "ns")
-    dut.io_valid.value = 0
-    await Timer(2000, "ns")
+    await send_byte(dut, 0xf7)
+    await Edge(dut.io_done)
+    await ReadOnly()
     assert dut.io_dout.value == 0xf7
 
+
+@cocotb.test()
+async def back_to_back(dut):
+    """It should deliver every byte when the producer is handed a new byte as soon as it is ready"""
+    cocotb.start_soon(Clock(dut.clock, 10, "ns").start())
+    dut.reset.value = 1
+    dut.io_valid.value = 0
+    await Timer(15, "ns")
+    dut.reset.value = 0
+
+    data = [0x00, 0xff, 0x5a, 0xa5, 0x01, 0x80]
+    received = []
+
+    async def receive():
+        for _ in data:
+            await Edge(dut.io_done)
+            await ReadOnly()
+            received.append(int(dut.io_dout.value))
+
+    consumer = cocotb.start_soon(receive())
+    for byte in data:
+        await send_byte(dut, byte)
+    await consumer
+    assert received == data
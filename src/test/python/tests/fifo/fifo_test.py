@@ -1,6 +1,12 @@
 import cocotb
 from cocotb.triggers import Timer
 from cocotb.triggers import RisingEdge, FallingEdge
+from click_tb.handshake import HandshakeSource, HandshakeSink
+import os
+import random
+
+# Number of tokens pushed through the FIFO by the streaming tests
+TOKENS = int(os.environ.get("TOKENS", 1000))
 
 
 @cocotb.test()
@@ -48,3 +54,37 @@ async def req_low_no_ack(dut):
     dut.io_in_req.value = 0
     await Timer(15, "ns")
     assert dut.io_out_req.value == 1
+
+
+@cocotb.test()
+async def stream(dut):
+    """It should pass a long stream of back-to-back tokens through in order"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out")
+    dut.reset.value = 1
+    src.reset()
+    sink.reset()
+    await Timer(1, units="ns")
+    dut.reset.value = 0
+    await Timer(1, units="ns")
+
+    tokens = [random.randrange(256) for _ in range(TOKENS)]
+    cocotb.start_soon(src.send_stream(tokens))
+    await sink.receive_stream(tokens)
+
+
+@cocotb.test()
+async def stream_slow_consumer(dut):
+    """It should not lose or duplicate tokens when the consumer is slower than the producer"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out", delay=25)
+    dut.reset.value = 1
+    src.reset()
+    sink.reset()
+    await Timer(1, units="ns")
+    dut.reset.value = 0
+    await Timer(1, units="ns")
+
+    tokens = [random.randrange(256) for _ in range(TOKENS // 10)]
+    cocotb.start_soon(src.send_stream(tokens))
+    await sink.receive_stream(tokens)
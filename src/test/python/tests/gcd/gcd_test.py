@@ -1,5 +1,20 @@
 import cocotb
 from cocotb.triggers import Timer, Edge
+from click_tb.handshake import HandshakeSource, HandshakeSink
+from click_tb.trace import HandshakeTracer, load_trace
+from click_tb.trace_analysis import analyze, latency_histograms
+import math
+import numpy as np
+import os
+import random
+
+# Number of operand pairs pushed through the circuit by the streaming test
+TOKENS = int(os.environ.get("TOKENS", 200))
+# Number of random operand pairs checked by the randomized regression, and the seed they are drawn with
+GCD_PAIRS = int(os.environ.get("GCD_PAIRS", 2000))
+SEED = int(os.environ.get("SEED", 1))
+# Set GCD_EXHAUSTIVE=1 to check every pair of nonzero operands (65025 pairs at 8 bits)
+GCD_EXHAUSTIVE = os.environ.get("GCD_EXHAUSTIVE", "0") == "1"
 
 
 def gcd(a: int, b: int) -> int:
@@ -11,6 +26,46 @@ def gcd(a: int, b: int) -> int:
     return a
 
 
+def iterations(a, b):
+    """
+    Number of times the GCD loop subtracts for each pair of operands. This is the sum of the quotients of Euclid's
+    algorithm minus one, computed for all pairs at once
+    """
+    a, b = a.astype(np.int64), b.astype(np.int64)
+    count = np.full(a.shape, -1, dtype=np.int64)
+    while np.any(b):
+        nz = b != 0
+        count[nz] += a[nz] // b[nz]
+        a[nz], b[nz] = b[nz], a[nz] % b[nz]
+    return count
+
+
+def directed_pairs(width):
+    """Pairs (1, 2**k) taking 2**k - 1 iterations, covering every power-of-two bucket of the iteration count"""
+    k = np.arange(width, dtype=np.int64)
+    return np.ones(width, dtype=np.int64), 2 ** k
+
+
+async def check_pairs(dut, a, b):
+    """
+    Streams operand pairs through the circuit, checking the outputs against golden values computed up front.
+    Logs how many pairs fell into each power-of-two bucket of the loop iteration count
+    """
+    expected = np.gcd(a, b)
+    iters = iterations(a, b)
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out")
+    await reset(dut)
+
+    cocotb.start_soon(src.send_stream(zip(a.tolist(), b.tolist())))
+    await sink.receive_stream((g, g) for g in expected.tolist())
+
+    buckets = np.bincount(np.floor(np.log2(iters + 1)).astype(np.int64))
+    for k, n in enumerate(buckets):
+        dut._log.info(f"iterations {2 ** k - 1:>6} - {2 ** (k + 1) - 2:<6}: {n} pairs")
+    dut._log.info(f"{len(a)} pairs checked, up to {iters.max()} iterations")
+
+
 async def toggle(signal):
     """Flips the value of binary signal wire"""
     if signal.value == 0:
@@ -126,3 +181,56 @@ async def await_completion(dut):
     assert dut.io_out_data_b == gcd(6, 4)
     await Timer(2, "ns")
 
+
+@cocotb.test()
+async def stream(dut):
+    """It should compute the GCD of a long stream of operand pairs, with producer and consumer running concurrently"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out")
+    await reset(dut)
+
+    pairs = [(random.randrange(1, 256), random.randrange(1, 256)) for _ in range(TOKENS)]
+    expected = [(math.gcd(a, b),) * 2 for a, b in pairs]
+    cocotb.start_soon(src.send_stream(pairs))
+    await sink.receive_stream(expected)
+
+
+@cocotb.test()
+async def random_pairs(dut):
+    """It should compute the GCD of random operand pairs spanning the full input range"""
+    width = len(dut.io_in_data_a)
+    rng = np.random.default_rng(SEED)
+    a, b = rng.integers(1, 2 ** width, size=(2, GCD_PAIRS), dtype=np.int64)
+    da, db = directed_pairs(width)
+    await check_pairs(dut, np.concatenate([da, db, a]), np.concatenate([db, da, b]))
+
+
+@cocotb.test(skip=not GCD_EXHAUSTIVE)
+async def exhaustive(dut):
+    """It should compute the GCD of every pair of nonzero operands"""
+    width = len(dut.io_in_data_a)
+    assert width <= 12, f"Exhaustive testing of {width}-bit operands is not feasible"
+    a, b = np.meshgrid(np.arange(1, 2 ** width, dtype=np.int64), np.arange(1, 2 ** width, dtype=np.int64))
+    await check_pairs(dut, a.ravel(), b.ravel())
+
+
+@cocotb.test()
+async def trace(dut):
+    """The tracer should record one transition per token on each signal, and a latency for every stage"""
+    src = HandshakeSource(dut, "io_in")
+    sink = HandshakeSink(dut, "io_out")
+    await reset(dut)
+
+    stages = ["R0", "RF0", "RF1", "F0", "MX0", "DX0", "DX1", "ME0", "CL0", "CL1", "CL2", "CL3"]
+    tracer = HandshakeTracer(dut, "trace.npy", channels=["io_in", "io_out"], instances=stages)
+    pairs = [(random.randrange(1, 256), random.randrange(1, 256)) for _ in range(50)]
+    cocotb.start_soon(src.send_stream(pairs))
+    await sink.receive_stream([(math.gcd(a, b),) * 2 for a, b in pairs])
+    await Timer(1, "ns")
+    tracer.close()
+
+    events, channels = load_trace("trace.npy")
+    assert len(events) == tracer.count
+    for signal in range(4):
+        assert (events["signal"] == signal).sum() == len(pairs), f"{channels[signal // 2]} did not see every token"
+    assert set(latency_histograms(analyze(events, channels))) == set(stages)
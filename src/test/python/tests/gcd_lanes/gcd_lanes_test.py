@@ -0,0 +1,39 @@
+import cocotb
+from click_tb.bench import interval_stats
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+import math
+import os
+import random
+
+# Number of operand pairs streamed through both designs
+GCD_PAIRS = int(os.environ.get("GCD_PAIRS", 2000))
+SEED = int(os.environ.get("SEED", 1))
+
+
+@cocotb.test()
+async def speedup(dut):
+    """
+    The multi-lane GCD should compute a long stream of pairs and return the results in order, at a shorter cycle time
+    than the single-lane GCD computing the same pairs
+    """
+    rng = random.Random(SEED)
+    ports = {name: (HandshakeSource(dut, f"io_{name}_in"), HandshakeSink(dut, f"io_{name}_out", timestamps=True))
+             for name in ("lanes", "single")}
+    await reset(dut, *(port for pair in ports.values() for port in pair), duration=5)
+
+    top = 2 ** len(dut.io_lanes_in_data_a)
+    pairs = [(rng.randrange(1, top), rng.randrange(1, top)) for _ in range(GCD_PAIRS)]
+    expected = [(math.gcd(a, b),) * 2 for a, b in pairs]
+    receivers = []
+    for src, sink in ports.values():
+        cocotb.start_soon(src.send_stream(pairs))
+        receivers.append(cocotb.start_soon(sink.receive_stream(expected)))
+    for receiver in receivers:
+        await receiver
+
+    lanes, single = (interval_stats(sink.times, warmup=0) for _, sink in ports.values())
+    speedup = single["cycle_time_ns"] / lanes["cycle_time_ns"]
+    dut._log.info(f"{GCD_PAIRS} pairs: {lanes['throughput_tokens_per_ns'] * 1000:.2f} pairs/us with lanes, "
+                  f"{single['throughput_tokens_per_ns'] * 1000:.2f} pairs/us with a single lane, speedup {speedup:.2f}")
+    assert speedup > 1, f"The lanes are no faster than a single lane: {lanes['cycle_time_ns']:.2f} ns cycle time " \
+                        f"against {single['cycle_time_ns']:.2f} ns"
@@ -1,6 +1,12 @@
 import cocotb
 from cocotb.triggers import Timer
 from cocotb.triggers import Edge
+from click_tb.handshake import HandshakeSource, HandshakeSink
+import os
+import random
+
+# Number of tokens pushed through the join by the streaming test
+TOKENS = int(os.environ.get("TOKENS", 1000))
 
 
 @cocotb.test()
@@ -35,3 +41,24 @@ async def join_data(dut):
     await Timer(1)
     assert dut.io_out_req.value == 1
     assert dut.io_out_data.value == (84 << 8) | 42
+
+
+@cocotb.test()
+async def stream(dut):
+    """It should join two concurrent streams token by token"""
+    src1 = HandshakeSource(dut, "io_in1")
+    src2 = HandshakeSource(dut, "io_in2", gap=2)
+    sink = HandshakeSink(dut, "io_out")
+    dut.reset.value = 1
+    src1.reset()
+    src2.reset()
+    sink.reset()
+    await Timer(1, "ns")
+    dut.reset.value = 0
+    await Timer(5, "ns")
+
+    in1 = [random.randrange(256) for _ in range(TOKENS)]
+    in2 = [random.randrange(256) for _ in range(TOKENS)]
+    cocotb.start_soon(src1.send_stream(in1))
+    cocotb.start_soon(src2.send_stream(in2))
+    await sink.receive_stream([(b << 8) | a for a, b in zip(in1, in2)])
@@ -0,0 +1,31 @@
+import cocotb
+from click_tb.handshake import HandshakeSource, HandshakeSink, reset
+import os
+import random
+
+# Number of tokens merged by the streaming test
+TOKENS = int(os.environ.get("TOKENS", 500))
+SEED = int(os.environ.get("SEED", 1))
+
+
+@cocotb.test()
+async def merge_stream(dut):
+    """It should forward the tokens of a producer which sends each token on a random input, one at a time"""
+    rng = random.Random(SEED)
+    n = 0
+    while hasattr(dut, f"io_in_{n}_req"):
+        n += 1
+    srcs = [HandshakeSource(dut, f"io_in_{i}") for i in range(n)]
+    sink = HandshakeSink(dut, "io_out")
+    await reset(dut, *srcs, sink)
+
+    tokens = [rng.randrange(2 ** len(dut.io_in_0_data)) for _ in range(TOKENS)]
+    # Every input is used at least once
+    inputs = list(range(n)) + [rng.randrange(n) for _ in range(TOKENS - n)]
+
+    async def produce():
+        for token, i in zip(tokens, inputs):
+            await srcs[i].send(token)
+
+    cocotb.start_soon(produce())
+    await sink.receive_stream(tokens)
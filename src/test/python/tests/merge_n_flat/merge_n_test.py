@@ -0,0 +1 @@
+../merge_n/merge_n_test.py
\ No newline at end of file
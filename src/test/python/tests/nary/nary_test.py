@@ -0,0 +1,26 @@
+import cocotb
+from click_tb.handshake import reset
+from click_tb.nary import design_ports, expected
+import os
+import random
+
+# Number of tokens passed through every design
+TOKENS = int(os.environ.get("TOKENS", 200))
+
+
+@cocotb.test()
+async def nary_stream(dut):
+    """Every join, fork and join-reg-fork should produce the expected tokens, built as a tree or as a chain"""
+    ports = design_ports(dut)
+    await reset(dut, *(port for srcs, sinks in ports.values() for port in srcs + sinks))
+
+    receivers = []
+    for name, (srcs, sinks) in ports.items():
+        width = len(srcs[0].data[0])
+        inputs = [[random.randrange(2 ** width) for _ in range(TOKENS)] for _ in srcs]
+        for src, tokens in zip(srcs, inputs):
+            cocotb.start_soon(src.send_stream(tokens))
+        out = expected(name, inputs, width)
+        receivers += [cocotb.start_soon(sink.receive_stream(out)) for sink in sinks]
+    for receiver in receivers:
+        await receiver
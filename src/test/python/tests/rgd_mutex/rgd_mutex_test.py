@@ -1,6 +1,13 @@
 import cocotb
 from cocotb.triggers import Timer
 from cocotb.triggers import Edge
+from click_tb.soak import RGDMutexPort, ContentionStats, soak
+import os
+import random
+
+# Number of grants made by the contention soak. Raise to millions for long soaks, e.g. SOAK_EVENTS=1000000
+SOAK_EVENTS = int(os.environ.get("SOAK_EVENTS", 2000))
+SEED = int(os.environ.get("SEED", 1))
 
 
 @cocotb.test()
@@ -54,4 +61,13 @@ async def rgd_mutex_test(dut):
     dut.io_D2.value = 1
     await Timer(1, "ns")
     assert dut.io_G1.value == 0
-    assert dut.io_G2.value == 1
\ No newline at end of file
+    assert dut.io_G2.value == 1
+
+
+@cocotb.test()
+async def rgd_mutex_soak(dut):
+    """It should grant both producers, never at the same time, under random contention"""
+    rng = random.Random(SEED)
+    stats = ContentionStats()
+    ports = [RGDMutexPort(dut, stats, port, rng) for port in (0, 1)]
+    await soak(dut, ports, SOAK_EVENTS, rng)
@@ -0,0 +1,77 @@
+import cocotb
+from cocotb.triggers import Edge, ReadOnly, Timer
+from cocotb.utils import get_sim_time
+from click_tb.bench import click_config
+from click_tb.cycletime import analyze
+import os
+
+# The stages and tokens of the ring, the defaults of the Ring target in Generate.scala
+STAGES = 8
+TOKENS = 3
+
+
+async def start(dut):
+    """Resets the ring and starts it. Reset is held until any transitions still in the delay elements have passed"""
+    dut.reset.value = 1
+    dut.io_go.value = 0
+    await Timer(100, "ns")
+    dut.reset.value = 0
+    await Timer(1, "ns")
+    dut.io_go.value = 1
+
+
+@cocotb.test()
+async def circulate(dut):
+    """It should keep its tokens circulating, passing them in the order they were placed"""
+    await start(dut)
+
+    async def next_token():
+        await Edge(dut.io_req)
+        await ReadOnly()
+        return int(dut.io_data.value)
+
+    # Every token holds the index of the stage it started in, so the first token returns once all tokens have passed.
+    # The indices fit in the data, which bounds the number of tokens
+    values = [await next_token()]
+    while len(values) <= 2 ** len(dut.io_data) and (len(values) == 1 or values[-1] != values[0]):
+        values.append(await next_token())
+    assert values[-1] == values[0], f"The first token never returned: {values}"
+    tokens = len(values) - 1
+    # Watch three more rounds of the ring
+    for _ in range(3 * tokens):
+        values.append(await next_token())
+
+    # The tokens pass the tap in descending order of stage
+    period = values[:tokens]
+    assert len(set(period)) == tokens, f"Tokens were lost or duplicated: {values}"
+    first = period.index(max(period))
+    assert period[first:] + period[:first] == sorted(period, reverse=True), f"Tokens overtook each other: {values}"
+    assert values == [period[i % tokens] for i in range(len(values))], f"Tokens were lost or duplicated: {values}"
+
+
+@cocotb.test()
+async def cycle_time(dut):
+    """
+    The static cycle-time analysis should find the loop of all stages as the critical cycle. Every stage adds its
+    register delay and the delay on its output channel, and the tokens share the loop, so the cycle time is
+    2 * REG_DELAY * STAGES / TOKENS. The simulated ring should pass its tokens at that rate
+    """
+    reg_delay = click_config()["REG_DELAY"]
+    result = analyze(os.path.join(os.environ["GEN_DIR"], "Ring.fir"))[0]
+    expected = 2 * reg_delay * STAGES / TOKENS
+    assert abs(result["cycle_time_ns"] - expected) < 1e-6, f"Cycle time {result['cycle_time_ns']}, expected {expected}"
+    assert result["tokens"] == TOKENS
+    cycle = result["critical_cycle"]
+    clicks = {step["event"] for step in cycle if step["event"].endswith(" click")}
+    assert len(cycle) == 2 * STAGES and len(clicks) == STAGES, f"Not the loop of all stages: {cycle}"
+
+    # Measure whole rounds of the ring once it has settled, so the uneven spacing of the tokens averages out
+    await start(dut)
+    for _ in range(4 * TOKENS):
+        await Edge(dut.io_req)
+    first, rounds = get_sim_time("ns"), 20
+    for _ in range(rounds * TOKENS):
+        await Edge(dut.io_req)
+    measured = (get_sim_time("ns") - first) / (rounds * TOKENS)
+    dut._log.info(f"Cycle time {measured:.3f} ns simulated, {result['cycle_time_ns']:.3f} ns analyzed")
+    assert abs(measured - expected) < 0.01 * expected, f"Simulated cycle time {measured}, expected {expected}"
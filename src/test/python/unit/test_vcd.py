@@ -0,0 +1,62 @@
+import pytest
+from click_tb.vcd import analyze
+
+# A channel passing three tokens, in steps of 100 ps. Requests at 1, 5.5 and 10 ns are acknowledged after 2, 1.5 and
+# 1.5 ns. Another signal changes at 20 ns, so the dump ends with 8.5 ns of idle time after the last handshake
+DUMP = """$timescale 100ps $end
+$scope module top $end
+$var wire 1 ! io_in_req $end
+$var wire 1 " io_in_ack $end
+$var wire 1 # io_go $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+0!
+0"
+0#
+$end
+#10
+1!
+#30
+1"
+#55
+0!
+#70
+0"
+#100
+1!
+#115
+1"
+#200
+1#
+"""
+
+
+def test_handshake_statistics(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    [channel] = analyze(str(path))
+    assert channel["channel"] == "io_in"
+    assert channel["requests"] == 3
+    assert channel["handshakes"] == 3
+    assert channel["interval_ns"] == pytest.approx(4.5)
+    assert channel["interval_min_ns"] == pytest.approx(4.5)
+    assert channel["interval_max_ns"] == pytest.approx(4.5)
+    assert channel["stall_ns"] == pytest.approx(5.0)
+    # The idle time runs up to the end of the dump, not to the last handshake
+    assert channel["idle_ns"] == pytest.approx(15.0)
+    assert channel["utilization"] == pytest.approx(0.25)
+    assert channel["throughput_tokens_per_ns"] == pytest.approx(3 / 20)
+
+
+def test_start(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    # From 5 ns on, only the last two tokens are counted, and only the time from 5 ns on
+    [channel] = analyze(str(path), start=5.0)
+    assert channel["requests"] == 2
+    assert channel["handshakes"] == 2
+    assert channel["interval_ns"] == pytest.approx(4.5)
+    assert channel["stall_ns"] == pytest.approx(3.0)
+    assert channel["idle_ns"] == pytest.approx(12.0)
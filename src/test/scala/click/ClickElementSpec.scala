@@ -2,10 +2,25 @@ package click
 
 import chisel3._
 import chiseltest._
+import click.HandshakeTesting.{HandshakeDriver, simAnnotations}
 import org.scalatest.flatspec.AnyFlatSpec
 
+import scala.util.Random
+
 class ClickElementSpec extends AnyFlatSpec with ChiselScalatestTester {
   behavior of "Click element"
 
-  //No tests to run: Treadle does not like simulating async. circuits
+  //Treadle does not like simulating async. circuits, so the tests run on an event-driven simulator
+
+  it should "pass tokens through a handshake register" in {
+    val tokens = Seq.fill(1000)(Random.nextInt(256).U(8.W))
+    test(new HandshakeRegister(0.U(8.W))(ClickConfig())).withAnnotations(simAnnotations) { dut =>
+      dut.io.in.initSource(dut.clock).withTimeout(100)
+      dut.io.out.initSink(dut.clock).withTimeout(100)
+
+      val sender = dut.io.in.sendAll(tokens)
+      dut.io.out.receiveExpectAll(tokens).join()
+      sender.join()
+    }
+  }
 }
@@ -3,7 +3,7 @@ package click
 import chisel3._
 import chisel3.experimental.BundleLiterals.AddBundleLiteralConstructor
 import chiseltest._
-import click.HandshakeTesting.HandshakeDriver
+import click.HandshakeTesting.{HandshakeDriver, simAnnotations}
 import examples.GCD
 import org.scalatest.flatspec.AnyFlatSpec
 
@@ -14,15 +14,17 @@ class GCDSpec extends AnyFlatSpec with ChiselScalatestTester {
 
   "GCD" should "determine greatest common divisor" in {
     val width = 5
+    // number of operand pairs, e.g. GCD_PAIRS=10000 sbt "testOnly click.GCDSpec"
+    val pairs = sys.env.getOrElse("GCD_PAIRS", "100").toInt
     test(new GCD(width)(ClickConfig(SIMULATION = true)))
-      .withAnnotations(Seq(IcarusBackendAnnotation, WriteVcdAnnotation)) { dut =>
+      .withAnnotations(simAnnotations) { dut =>
 
-      // initialize handshake port drivers
-      dut.io.in.initSource(dut.clock)
-      dut.io.out.initSink(dut.clock)
+      // initialize handshake port drivers, failing if the circuit stops responding
+      dut.io.in.initSource(dut.clock).withTimeout(1000)
+      dut.io.out.initSink(dut.clock).withTimeout(1000)
 
       // generate test operand pairs
-      val tests = Seq.fill(100) {
+      val tests = Seq.fill(pairs) {
         (Random.between(1, pow(2, width).toInt),
           Random.between(1, pow(2, width).toInt))
       }
@@ -34,16 +36,10 @@ class GCDSpec extends AnyFlatSpec with ChiselScalatestTester {
       def pair(a: Int, b: Int) =
         new Bundle2(UInt(width.W), UInt(width.W)).Lit(_.a -> a.U, _.b -> b.U)
 
-      fork { // operand sending thread
-        for ((a,b) <- tests) {
-          dut.io.in.send(pair(a,b))
-        }
-      }.fork { // result receiving thread
-        for ((a, b) <- tests) {
-          val res = gcd(a, b)
-          dut.io.out.receiveExpect(pair(res, res))
-        }
-      }.join()
+      // send operands and check results concurrently
+      val s = dut.io.in.sendAll(tests.map { case (a, b) => pair(a, b) })
+      dut.io.out.receiveExpectAll(tests.map { case (a, b) => pair(gcd(a, b), gcd(a, b)) }).join()
+      s.join()
     }
   }
 }
@@ -2,8 +2,28 @@ package click
 
 import chisel3._
 import chiseltest._
+import chiseltest.simulator.VerilatorFlags
+import firrtl.AnnotationSeq
+
+import java.util.concurrent.TimeoutException
+import scala.collection.mutable
 
 object HandshakeTesting {
+  /**
+   * Simulator annotations for the specs. Click circuits depend on delays, so they are simulated with Icarus Verilog
+   * by default. Like the cocotb tests, `SIM=verilator` selects Verilator 5 instead, compiling with `--timing`,
+   * and `DUMP=1` writes a VCD file. Dumping slows down long simulations considerably, so it is off by default
+   */
+  def simAnnotations: AnnotationSeq = {
+    val backend = sys.env.getOrElse("SIM", "icarus") match {
+      case "icarus" => Seq(IcarusBackendAnnotation)
+      case "verilator" => Seq(VerilatorBackendAnnotation, VerilatorFlags(Seq("--timing")))
+      case sim => throw new IllegalArgumentException(s"Unsupported simulator '$sim', use icarus or verilator")
+    }
+    val dump = if (sys.env.get("DUMP").contains("1")) Seq(WriteVcdAnnotation) else Seq()
+    backend ++ dump
+  }
+
   /**
     Implicit classes allow adding additional functionality to existing classes.
     The [[HandshakeDriver]] extends the [[ReqAck]] bundle with send and receive
@@ -12,6 +32,52 @@ object HandshakeTesting {
    */
   implicit class HandshakeDriver[T <: Data](x: ReqAck[T]) {
 
+    /**
+     * Sets the number of ticks waited for the other side of this channel to respond before failing with a
+     * [[TimeoutException]]. 0 disables the timeout. Note that the clock's own timeout, set with
+     * `Clock.setTimeout`, still fails the test if no inputs are poked for that many ticks
+     * @param ticks maximum number of ticks to wait for a handshake
+     * @return this
+     */
+    def withTimeout(ticks: Int): this.type = {
+      require(ticks >= 0, "The timeout cannot be negative")
+      HandshakeDriver.settings(x) = settings.copy(timeout = ticks)
+      this
+    }
+
+    /**
+     * Sets the number of ticks stepped between checks of the other side of this channel. Checking less often
+     * saves calls into the simulator on slow circuits, but delays each handshake by up to `ticks - 1` ticks
+     * @param ticks number of ticks stepped between checks
+     * @return this
+     */
+    def withPollInterval(ticks: Int): this.type = {
+      require(ticks > 0, "The poll interval must be at least 1")
+      HandshakeDriver.settings(x) = settings.copy(pollInterval = ticks)
+      this
+    }
+
+    private def settings: HandshakeDriver.Settings = HandshakeDriver.settings.getOrElse(x, HandshakeDriver.Settings())
+
+    /**
+     * Steps the given clock until the signal differs from `old`, checking it every poll interval
+     * @param signal the signal driven by the other side of the channel
+     * @param old the value of the signal before the handshake
+     * @param clock clock object marking simulation ticks
+     * @param what description of the awaited event, used when timing out
+     */
+    private def waitForToggle(signal: Bool, old: Boolean, clock: Clock, what: String): Unit = {
+      val limits = settings
+      var waited = 0
+      while (old == signal.peekBoolean()) {
+        if (limits.timeout > 0 && waited >= limits.timeout) {
+          throw new TimeoutException(s"No $what on ${x.pathName} within ${limits.timeout} ticks")
+        }
+        clock.step(limits.pollInterval)
+        waited += limits.pollInterval
+      }
+    }
+
     ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
     // source functions
 
@@ -48,9 +114,7 @@ object HandshakeTesting {
       x.data.poke(token) // setup data
       x.req.poke((!x.req.peekBoolean()).B) // toggle request
       val old = x.ack.peekBoolean() // remember current ack state
-      while (old == x.ack.peekBoolean()) { // wait for ack to toggle
-        getSourceClock.step(1)
-      }
+      waitForToggle(x.ack, old, getSourceClock, "acknowledge") // wait for ack to toggle
       getSourceClock.step(1)
     }
 
@@ -74,6 +138,16 @@ object HandshakeTesting {
      */
     def send(token: T, tokens: T*): Unit = send(token +: tokens)
 
+    /**
+     * Sends the given sequence of tokens from a new thread, so a sink can run concurrently.
+     * Join the returned thread to wait for all tokens to be sent.
+     * @param tokens sequence of tokens
+     * @return the sending thread
+     */
+    def sendAll(tokens: Seq[T]) = fork {
+      send(tokens)
+    }
+
 
     ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
     // sink functions
@@ -108,9 +182,7 @@ object HandshakeTesting {
     def waitForToken(): Unit = {
       val old = x.req.peekBoolean()
       getSinkClock.step(1)
-      while (old == x.req.peekBoolean()) {
-        getSinkClock.step(1)
-      }
+      waitForToggle(x.req, old, getSinkClock, "request")
     }
 
     /**
@@ -165,6 +237,16 @@ object HandshakeTesting {
      */
     def receiveExpect(token: T, tokens: T*): Unit = receiveExpect(token +: tokens)
 
+    /**
+     * Receives and checks the given sequence of tokens from a new thread, so a source can run concurrently.
+     * Join the returned thread to wait for all tokens to be received.
+     * @param tokens the expected tokens
+     * @return the receiving thread
+     */
+    def receiveExpectAll(tokens: Seq[T]) = fork {
+      receiveExpect(tokens)
+    }
+
   }
 
   /**
@@ -174,6 +256,16 @@ object HandshakeTesting {
   object HandshakeDriver {
     protected val handshakeSourceKey = new Object()
     protected val handshakeSinkKey = new Object()
+
+    /**
+     * Timeout and poll interval of a channel, both in ticks
+     */
+    private[HandshakeTesting] case class Settings(timeout: Int = 0, pollInterval: Int = 1)
+
+    /**
+     * Settings of the channels which have been configured, looked up by channel like their clocks
+     */
+    private[HandshakeTesting] val settings = mutable.WeakHashMap[ReqAck[_ <: Data], Settings]()
   }
 
 }